@@ -21,6 +21,15 @@ class Action:
             "metadata": {}
         }
 
+        if action_type == "check_ticket_status" and decision.get("ticket_id"):
+            ticket_id = decision["ticket_id"]
+            ticket = self.ticket_creator.get_ticket(ticket_id)
+            if ticket:
+                response["text"] = f"Ticket #{ticket_id} ({ticket['subject']}) is {ticket['status']}, priority {ticket['priority']}."
+            else:
+                response["text"] = f"I couldn't find ticket #{ticket_id}. Please check the ID and try again."
+            response["metadata"]["ticket_found"] = ticket is not None
+
         if action_type == "create_ticket":
             # In a real multi-turn agent, we would extract slots here.
             # For baseline, we might just return the prompt or execute if details exist.
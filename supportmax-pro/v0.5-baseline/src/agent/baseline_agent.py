@@ -1,20 +1,80 @@
-from typing import Dict, Any
+import threading
+import time
+from typing import Dict, Any, Optional
+from agent.perception import Perception
+from agent.reasoning import Reasoning
+from agent.action import Action
 from agent.crew_agent import SupportCrew
+from agent.crew_pool import CrewPool
+from agent.deadline import Deadline, DeadlineExceeded, deadline_scope, run_stage
+from knowledge.faq_store import get_faq_store
+from config.settings import settings
+from config.constraints import FALLBACK_MIN_CONFIDENCE, FALLBACK_RESERVE_SECONDS, MAX_RESPONSE_TIME_SECONDS
+
+TIERS = ("fast_path", "crew", "fallback")
 
 class BaselineAgent:
     """
-    Orchestrates the agent using CrewAI.
+    Orchestrates the agent as a tiered router.
+
+    Every message first goes through the rule-based Perception -> Reasoning
+    -> Action pipeline (no LLM calls). Confident FAQ hits and clear ticket
+    intents are answered there; anything ambiguous is escalated to CrewAI.
+
+    With DEADLINE_ENFORCED, the crew only gets the time left until the
+    request's deadline (see agent/deadline.py); when it runs out the answer
+    degrades to what the crew's tools already did, or an FAQ match.
     """
-    def __init__(self):
-        self.crew = SupportCrew()
+    def __init__(self, pool_size: Optional[int] = None, fast_path: Optional[bool] = None):
+        self.perception = Perception()
+        self.reasoning = Reasoning(get_faq_store())
+        self.action = Action()
+        self.fast_path = settings.FAST_PATH_ENABLED if fast_path is None else fast_path
+        # Pre-built crews, one per concurrent worker
+        self.crews = CrewPool(SupportCrew, size=pool_size or settings.CREW_MAX_WORKERS)
+
+        self._stats_lock = threading.Lock()
+        self._tier_stats = {tier: {"requests": 0, "within_sla": 0, "total_seconds": 0.0} for tier in TIERS}
 
-    def process_message(self, message: str, user_id: str = None) -> Dict[str, Any]:
+    def process_message(self, message: str, user_id: str = None, on_event=None, deadline: Optional[Deadline] = None) -> Dict[str, Any]:
         """
         Main entry point for processing a user message.
+        Pass `on_event` to receive live agent events while the crew runs, and
+        `deadline` to count time spent before this call (e.g. queueing); by
+        default the deadline starts now.
+        The response metadata reports which tier served it and how long it took.
         """
+        if deadline is None and settings.DEADLINE_ENFORCED:
+            deadline = Deadline(MAX_RESPONSE_TIME_SECONDS)
+        started = deadline.started if deadline is not None else time.monotonic()
+        decision = None
+        if self.fast_path:
+            decision = self.reasoning.route(self.perception.process_input(message))
+
+        if decision is not None:
+            tier = "fast_path"
+            response = self.action.execute(decision)
+            response["metadata"].update(engine="rules", source=decision.get("source"), confidence=decision.get("confidence"))
+        else:
+            tier = "crew"
+            with deadline_scope(deadline):
+                try:
+                    response = run_stage("crew", self._run_crew, message, on_event, reserve=FALLBACK_RESERVE_SECONDS)
+                except DeadlineExceeded as e:
+                    tier = "fallback"
+                    response = self._fallback(message, deadline, e.stage)
+
+        elapsed = time.monotonic() - started
+        within_sla = elapsed <= MAX_RESPONSE_TIME_SECONDS
+        response["metadata"].update(tier=tier, latency_ms=round(elapsed * 1000, 1), within_sla=within_sla)
+        self._record(tier, elapsed, within_sla)
+        return response
+
+    def _run_crew(self, message: str, on_event=None) -> Dict[str, Any]:
         # Execute Crew
         try:
-            result, steps = self.crew.run(message)
+            with self.crews.checkout() as crew:
+                result, steps = crew.run(message, on_event=on_event)
             
             # CrewAI returns a string result. We need to structure it for our API.
             # In a real app, we might parse the output or have the agent return JSON.
@@ -35,9 +95,62 @@ class BaselineAgent:
                     "steps": steps
                 }
             }
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             return {
                 "text": f"Error processing request: {str(e)}",
                 "action_taken": "error",
                 "metadata": {"error": str(e)}
-            }
\ No newline at end of file
+            }
+
+    def _fallback(self, message: str, deadline: Deadline, stage: str) -> Dict[str, Any]:
+        """
+        Best answer available once the deadline is gone: a ticket the crew
+        already created or looked up, else the best FAQ match, else an offer
+        to open a ticket.
+        """
+        metadata = {"engine": "fallback", "degraded": True, "timed_out_stage": stage}
+        for tool, output in reversed(deadline.results):
+            if tool in ("create_ticket", "check_ticket_status"):
+                return {"text": output, "action_taken": tool, "metadata": metadata}
+
+        faq_results = self.reasoning.faq_store.search(message, min_score=FALLBACK_MIN_CONFIDENCE)
+        if faq_results:
+            best_match = faq_results[0]
+            metadata.update(source="knowledge_base", confidence=best_match["score"])
+            return {"text": best_match["answer"], "action_taken": "answer_faq", "metadata": metadata}
+        return {
+            "text": "Sorry, this is taking longer than expected. Would you like me to create a support ticket so our team can follow up?",
+            "action_taken": "general_response",
+            "metadata": metadata
+        }
+
+    def _record(self, tier: str, elapsed: float, within_sla: bool):
+        with self._stats_lock:
+            stats = self._tier_stats[tier]
+            stats["requests"] += 1
+            stats["within_sla"] += int(within_sla)
+            stats["total_seconds"] += elapsed
+
+    def router_stats(self) -> Dict[str, Any]:
+        """Per-tier traffic and the share of all requests answered within MAX_RESPONSE_TIME_SECONDS."""
+        with self._stats_lock:
+            total = sum(s["requests"] for s in self._tier_stats.values())
+            within_sla = sum(s["within_sla"] for s in self._tier_stats.values())
+            tiers = {
+                tier: {
+                    "requests": s["requests"],
+                    "share": round(s["requests"] / total, 4) if total else 0.0,
+                    "within_sla": s["within_sla"],
+                    "avg_latency_ms": round(s["total_seconds"] / s["requests"] * 1000, 1) if s["requests"] else 0.0
+                }
+                for tier, s in self._tier_stats.items()
+            }
+        return {
+            "fast_path_enabled": self.fast_path,
+            "sla_seconds": MAX_RESPONSE_TIME_SECONDS,
+            "requests": total,
+            "within_sla_ratio": round(within_sla / total, 4) if total else 0.0,
+            "tiers": tiers
+        }
@@ -1,43 +1,46 @@
 import os
 from crewai import Agent, Task, Crew, Process
-from langchain_openai import ChatOpenAI
+from agent.crew_pool import reset_run_state
+from agent.events import forward_step, relay_events
+from agent.llm_gateway import GatewayChatModel, get_llm_gateway
 from tools.crew_tools import CrewTools
-from config.settings import settings
 
 class SupportCrew:
-    def __init__(self):
+    """
+    Agent and Crew are built once and reused across runs; each run only
+    creates its Task. An instance must not run two messages at once, so
+    concurrent callers borrow instances from a CrewPool.
+    """
+    def __init__(self, llm=None):
         # Initialize LLM
-        # CrewAI uses LangChain LLMs. We need to configure it based on settings.
-        # For v0.5 baseline, we default to OpenAI if key is present, otherwise we might fail or need a mock.
-        
-        self.llm = None
-        if settings.OPENAI_API_KEY:
-            self.llm = ChatOpenAI(
-                model=settings.OPENAI_MODEL,
-                api_key=settings.OPENAI_API_KEY,
-                temperature=0
-            )
-        # Note: Anthropic support in CrewAI/LangChain requires different setup, 
-        # keeping it simple for OpenAI first as per typical CrewAI usage.
+        # CrewAI uses LangChain LLMs: the gateway is wrapped as one, so the
+        # crew gets pooled clients, retries and OpenAI/Anthropic failover.
+        # It streams, so the final answer reaches /chat/stream token by token.
+        self.llm = llm
+        if self.llm is None:
+            gateway = get_llm_gateway()
+            if gateway is not None:
+                self.llm = GatewayChatModel(gateway=gateway, streaming=True)
 
-    def run(self, message: str):
-        if not self.llm:
-            return "Error: LLM not configured. Please set OPENAI_API_KEY.", []
+        self._steps = []
+        self.support_agent = None
+        self.crew = None
+        if self.llm:
+            self._build_crew()
 
-        steps = []
-        
-        def step_callback(step_output):
-            # Capture the step output
-            # step_output is usually a tuple or object representing the thought/action
-            # We convert to string for display safety
-            steps.append(str(step_output))
+    def _record_step(self, step_output):
+        # step_output is usually a tuple or object representing the thought/action
+        # We convert to string for display safety
+        self._steps.append(str(step_output))
+        forward_step(step_output)
 
+    def _build_crew(self):
         # Define Agent
-        support_agent = Agent(
+        self.support_agent = Agent(
             role='Senior Support Representative',
             goal='Resolve user queries efficiently using FAQs or by creating tickets.',
-            backstory="""You are an expert support agent for SupportMax Pro. 
-            You are helpful, concise, and professional. 
+            backstory="""You are an expert support agent for SupportMax Pro.
+            You are helpful, concise, and professional.
             You always check the FAQ first. If the answer is there, you provide it.
             If the user has a problem that requires a ticket (like "create ticket", "broken", "error"), you create one.
             If you can't help, you politely say so.""",
@@ -45,31 +48,48 @@ class SupportCrew:
             allow_delegation=False,
             tools=[CrewTools.search_faq, CrewTools.create_ticket, CrewTools.check_ticket_status],
             llm=self.llm,
-            step_callback=step_callback
+            step_callback=self._record_step
         )
 
-        # Define Task
-        task = Task(
+        # Define Crew (tasks are bound per run)
+        self.crew = Crew(
+            agents=[self.support_agent],
+            tasks=[],
+            verbose=2,
+            process=Process.sequential
+        )
+
+    def build_task(self, message: str) -> Task:
+        return Task(
             description=f"""Analyze the following user message: "{message}"
-            
+
             1. If it's a question, use the 'Search FAQs' tool to find an answer.
             2. If it's a request to create a ticket or report a bug/issue, use the 'Create Support Ticket' tool.
             3. If the user asks about an existing ticket (status, details), use 'Check Ticket Status'.
             4. If it's general chit-chat, respond politely.
-            
+
             Provide the final answer to the user.""",
-            agent=support_agent,
+            agent=self.support_agent,
             expected_output="A helpful response to the user, either answering their question, providing ticket details, or confirming ticket creation."
         )
 
-        # Define Crew
-        crew = Crew(
-            agents=[support_agent],
-            tasks=[task],
-            verbose=2,
-            process=Process.sequential
-        )
+    def bind(self, message: str):
+        """Attaches the per-request task to the pre-built crew."""
+        self._steps = []
+        reset_run_state(self.crew)
+        self.crew.tasks = [self.build_task(message)]
+
+    def run(self, message: str, on_event=None):
+        """
+        Runs the crew on `message`. `on_event(event, data)`, if given, receives
+        live step/tool/token events (see agent/events.py) while it runs.
+        """
+        if not self.llm:
+            return "Error: LLM not configured. Please set OPENAI_API_KEY or ANTHROPIC_API_KEY.", []
+
+        self.bind(message)
 
         # Execute
-        result = crew.kickoff()
-        return result, steps
+        with relay_events(on_event):
+            result = self.crew.kickoff()
+        return result, self._steps
@@ -0,0 +1,99 @@
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator
+from crewai.agents.cache import CacheHandler
+
+
+class CrewPool:
+    """
+    Warm pool of reusable crew instances.
+
+    Agents, LLM wrappers and the Crew itself are built once per instance;
+    a run only binds its per-request Task. Each instance is used by one
+    thread at a time, so size the pool to the number of crew workers.
+    """
+    def __init__(self, factory: Callable[[], Any], size: int = 4):
+        self.factory = factory
+        self.size = size
+        self._idle: "queue.LifoQueue[Any]" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._checkouts = 0
+        self._waits = 0
+
+    def warm(self) -> int:
+        """Builds instances up to `size` ahead of the first request. Returns how many were built."""
+        built = 0
+        while True:
+            with self._lock:
+                if self._created >= self.size:
+                    return built
+                self._created += 1
+            try:
+                self._idle.put(self.factory())
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+            built += 1
+
+    def _acquire(self) -> Any:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            can_create = self._created < self.size
+            if can_create:
+                self._created += 1
+            else:
+                self._waits += 1
+        if not can_create:
+            return self._idle.get()
+        try:
+            return self.factory()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+
+    @contextmanager
+    def checkout(self) -> Iterator[Any]:
+        """Borrows an instance for one run and returns it to the pool afterwards."""
+        instance = self._acquire()
+        with self._lock:
+            self._checkouts += 1
+        try:
+            yield instance
+        finally:
+            self._idle.put(instance)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": self.size,
+                "created": self._created,
+                "idle": self._idle.qsize(),
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+            }
+
+
+def reset_run_state(crew) -> None:
+    """
+    Clears what a CrewAI Crew carries from one kickoff to the next: the tool
+    result cache, which would answer a repeated tool input (a second "create
+    ticket" with the same description, a status check) with an earlier
+    run's output, and the per-agent token counters behind usage_metrics.
+    Call it when binding a pooled crew to a new request.
+    """
+    cache = CacheHandler()
+    crew._cache_handler = cache
+    for agent in crew.agents:
+        agent.set_cache_handler(cache)
+        # Reset in place: the agent's LLM callback holds this object
+        counters = agent._token_process
+        counters.total_tokens = counters.prompt_tokens = counters.completion_tokens = 0
+        counters.successful_requests = 0
+    crew.usage_metrics = None
@@ -0,0 +1,96 @@
+"""
+Live crew events for streaming responses.
+
+While `relay_events(emit)` is active in a thread, every LangChain callback
+raised by the crew in that thread (including the hierarchical manager,
+which CrewAI builds per run) reaches a CrewEventRelay, which calls
+`emit(event, data)` with:
+
+- "tool_call":    {"tool", "input"}        an agent decided to use a tool
+- "tool_result":  {"tool", "output"}       the tool returned (via step_callback)
+- "step":         {"agent_step"}           one thought/action/observation step
+- "answer_start": {}                       a "Final Answer:" began streaming
+- "token":        {"text"}                 final answer text as it is generated
+
+A crew can run several final answers (e.g. a draft then a review); each
+starts with "answer_start", so clients should reset their answer buffer on it.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, Optional
+from langchain_core.agents import AgentAction, AgentFinish
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.tracers.context import register_configure_hook
+
+FINAL_ANSWER_MARKER = "Final Answer:"
+
+EmitFn = Callable[[str, Dict[str, Any]], None]
+
+
+class CrewEventRelay(BaseCallbackHandler):
+    """Translates LangChain/CrewAI callbacks of one run into stream events."""
+    def __init__(self, emit: EmitFn):
+        self.emit = emit
+        self._generation = ""
+        self._in_answer = False
+
+    def _reset_generation(self):
+        self._generation = ""
+        self._in_answer = False
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self._reset_generation()
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self._reset_generation()
+
+    def on_llm_new_token(self, token: str, **kwargs):
+        if self._in_answer:
+            self.emit("token", {"text": token})
+            return
+        self._generation += token
+        index = self._generation.find(FINAL_ANSWER_MARKER)
+        if index >= 0:
+            self._in_answer = True
+            self.emit("answer_start", {})
+            head = self._generation[index + len(FINAL_ANSWER_MARKER):].lstrip()
+            if head:
+                self.emit("token", {"text": head})
+
+    def on_agent_action(self, action: AgentAction, **kwargs):
+        if action.tool != "_Exception":
+            self.emit("tool_call", {"tool": action.tool, "input": str(action.tool_input)})
+
+    def on_step(self, step_output: Any):
+        if isinstance(step_output, AgentFinish):
+            self.emit("step", {"agent_step": step_output.log.strip()})
+            return
+        for action, observation in step_output:
+            self.emit("step", {"agent_step": action.log.strip()})
+            if action.tool != "_Exception":
+                self.emit("tool_result", {"tool": action.tool, "output": str(observation)})
+
+
+_current_relay: ContextVar[Optional[CrewEventRelay]] = ContextVar("crew_event_relay", default=None)
+# LangChain adds the active relay to every callback manager configured in this context
+register_configure_hook(_current_relay, inheritable=True)
+
+
+@contextmanager
+def relay_events(emit: Optional[EmitFn]) -> Iterator[None]:
+    """Routes crew events raised in the current thread to `emit` (no-op when None)."""
+    if emit is None:
+        yield
+        return
+    token = _current_relay.set(CrewEventRelay(emit))
+    try:
+        yield
+    finally:
+        _current_relay.reset(token)
+
+
+def forward_step(step_output: Any):
+    """step_callback target: hands an agent step to the active relay, if any."""
+    relay = _current_relay.get()
+    if relay is not None:
+        relay.on_step(step_output)
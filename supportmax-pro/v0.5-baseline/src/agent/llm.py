@@ -0,0 +1,96 @@
+"""
+Process-wide LLM clients.
+
+Building a ChatOpenAI per request also builds a new openai client and a new
+HTTP connection pool, so every request pays a fresh TLS handshake. Here the
+OpenAI clients (and their keep-alive pools) are created once and every
+ChatOpenAI wrapper is bound to them; the Anthropic client is shared the
+same way. Calls go through the provider gateway (agent/llm_gateway.py).
+"""
+import threading
+from typing import Optional
+import httpx
+import openai
+from langchain_openai import ChatOpenAI
+from config.constraints import MAX_RETRIES, TIMEOUT_SECONDS
+from config.settings import settings
+
+_clients = None
+_clients_lock = threading.Lock()
+_anthropic_client = None
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.LLM_MAX_CONNECTIONS,
+        keepalive_expiry=settings.LLM_KEEPALIVE_SECONDS
+    )
+
+
+def get_openai_clients():
+    """Returns the shared (sync, async) OpenAI clients, creating them on first use."""
+    global _clients
+    if _clients is None:
+        with _clients_lock:
+            if _clients is None:
+                _clients = (
+                    openai.OpenAI(
+                        api_key=settings.OPENAI_API_KEY,
+                        timeout=TIMEOUT_SECONDS,
+                        max_retries=MAX_RETRIES,
+                        http_client=httpx.Client(limits=_limits())
+                    ),
+                    openai.AsyncOpenAI(
+                        api_key=settings.OPENAI_API_KEY,
+                        timeout=TIMEOUT_SECONDS,
+                        max_retries=MAX_RETRIES,
+                        http_client=httpx.AsyncClient(limits=_limits())
+                    )
+                )
+    return _clients
+
+
+def get_anthropic_client():
+    """Returns the shared Anthropic client, creating it on first use."""
+    global _anthropic_client
+    if _anthropic_client is None:
+        with _clients_lock:
+            if _anthropic_client is None:
+                import anthropic
+                _anthropic_client = anthropic.Anthropic(
+                    api_key=settings.ANTHROPIC_API_KEY,
+                    timeout=TIMEOUT_SECONDS,
+                    max_retries=0,
+                    http_client=httpx.Client(limits=_limits())
+                )
+    return _anthropic_client
+
+
+def build_llm(model: Optional[str] = None, temperature: float = 0) -> ChatOpenAI:
+    """
+    Returns a ChatOpenAI bound to the shared clients. The wrapper itself is
+    cheap; give each pooled crew its own so CrewAI's per-agent token
+    callbacks don't collide. It streams, so the final answer reaches the
+    event relay (agent/events.py) token by token.
+    """
+    client, async_client = get_openai_clients()
+    return ChatOpenAI(
+        model=model or settings.OPENAI_MODEL,
+        api_key=settings.OPENAI_API_KEY,
+        temperature=temperature,
+        client=client.chat.completions,
+        async_client=async_client.chat.completions,
+        streaming=True
+    )
+
+
+def close_openai_clients():
+    global _clients, _anthropic_client
+    with _clients_lock:
+        if _clients is not None:
+            _clients[0].close()
+            _clients = None
+        if _anthropic_client is not None:
+            _anthropic_client.close()
+            _anthropic_client = None
@@ -1,4 +1,17 @@
-from typing import Dict, Any
+import re
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+# Ticket ids are the first 8 hex chars of a UUID (see tools/ticket_creator.py)
+_TICKET_ID = re.compile(r"(?:#|\bticket\s+(?:id\s+)?)([0-9a-f]{8})\b", re.IGNORECASE)
+_TICKET_STATUS = re.compile(r"\b(status|progress|updates? on)\b.*\bticket\b|\bticket\b.*\b(status|progress)\b", re.IGNORECASE)
+_TICKET_REQUEST = re.compile(r"\b(create|open|raise|file|submit|log|start|need|want)\b.*\b(ticket|case)\b", re.IGNORECASE)
+# Words that only express "I want a ticket" and carry no problem details
+_REQUEST_FILLER = {
+    "i", "we", "a", "an", "the", "to", "me", "my", "please", "can", "could", "you", "would", "like",
+    "need", "want", "create", "open", "raise", "file", "submit", "log", "start", "new", "support",
+    "ticket", "case", "help", "for", "with", "hi", "hello", "hey", "thanks", "id", "just"
+}
 
 class Perception:
     """
@@ -7,19 +20,37 @@ class Perception:
     def process_input(self, user_input: str) -> Dict[str, Any]:
         """
         Analyzes the user input to extract intent and entities.
-        For the baseline agent, this is a simple pass-through or basic keyword extraction.
+        Rule-based and LLM-free, so it is cheap enough to run on every request.
+
+        Intents: "ticket_status" (asks about an existing ticket),
+        "support_request" (mentions tickets or support) and "query".
         """
         # Basic normalization
-        cleaned_input = user_input.strip()
-        
-        # Simple heuristic for intent (in a real system, use an LLM or classifier)
+        cleaned_input = " ".join(user_input.split())
+        lowered = cleaned_input.lower()
+
+        ticket_id_match = _TICKET_ID.search(cleaned_input)
+        ticket_id: Optional[str] = ticket_id_match.group(1).lower() if ticket_id_match else None
+
         intent = "query"
-        if "ticket" in cleaned_input.lower() or "support" in cleaned_input.lower():
+        if _TICKET_STATUS.search(cleaned_input) or (ticket_id and "ticket" in lowered):
+            intent = "ticket_status"
+        elif "ticket" in lowered or "support" in lowered:
             intent = "support_request"
-            
+
+        # A bare "please open a ticket" with nothing to put in it
+        words = re.findall(r"[a-z']+", lowered)
+        bare_ticket_request = (
+            intent == "support_request"
+            and bool(_TICKET_REQUEST.search(cleaned_input))
+            and all(word in _REQUEST_FILLER for word in words)
+        )
+
         return {
             "raw_input": user_input,
             "cleaned_input": cleaned_input,
             "intent": intent,
-            "timestamp": "now" # In real app, use actual timestamp
-        }
\ No newline at end of file
+            "entities": {"ticket_id": ticket_id},
+            "bare_ticket_request": bare_ticket_request,
+            "timestamp": datetime.now().isoformat()
+        }
@@ -1,7 +1,7 @@
-from typing import Dict, Any, List
-import os
+from typing import Dict, Any, List, Optional
+from agent.llm_gateway import LLMUnavailable, get_llm_gateway
 from knowledge.faq_store import FAQStore
-from config.settings import settings
+from config.constraints import MIN_CONFIDENCE_SCORE, FAST_PATH_MIN_MARGIN
 
 # Mock LLM for baseline if no key provided, or use actual API
 class Reasoning:
@@ -11,6 +11,47 @@ class Reasoning:
     def __init__(self, faq_store: FAQStore):
         self.faq_store = faq_store
 
+    def route(self, perception_output: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Deterministic tier: decisions that need no LLM call. Returns None when
+        the query is ambiguous and should be escalated to the crew.
+        """
+        if perception_output["intent"] == "ticket_status":
+            ticket_id = perception_output["entities"].get("ticket_id")
+            if ticket_id:
+                return {
+                    "action_type": "check_ticket_status",
+                    "ticket_id": ticket_id,
+                    "confidence": 1.0,
+                    "source": "ticket_store"
+                }
+            return {
+                "action_type": "check_ticket_status",
+                "content": "I can look that up for you. What is your ticket ID?",
+                "confidence": 0.9
+            }
+
+        if perception_output.get("bare_ticket_request"):
+            return {
+                "action_type": "create_ticket",
+                "content": "I can help you create a support ticket. Please provide the details.",
+                "confidence": 0.9
+            }
+
+        faq_results = self.faq_store.search(perception_output["cleaned_input"], min_score=MIN_CONFIDENCE_SCORE)
+        if not faq_results:
+            return None
+        best_match = faq_results[0]
+        # Two FAQs matching about equally well is a question for the crew
+        if len(faq_results) > 1 and best_match["score"] - faq_results[1]["score"] < FAST_PATH_MIN_MARGIN:
+            return None
+        return {
+            "action_type": "answer_faq",
+            "content": best_match["answer"],
+            "confidence": best_match["score"],
+            "source": "knowledge_base"
+        }
+
     def decide_action(self, perception_output: Dict[str, Any]) -> Dict[str, Any]:
         """
         Decides the next action based on perception and knowledge.
@@ -26,7 +67,7 @@ class Reasoning:
             return {
                 "action_type": "answer_faq",
                 "content": best_match["answer"],
-                "confidence": 0.9,
+                "confidence": best_match["score"],
                 "source": "knowledge_base"
             }
             
@@ -39,14 +80,12 @@ class Reasoning:
             }
 
         # 3. Fallback to LLM
-        # Try to use actual LLM if configured
-        try:
-            if settings.OPENAI_API_KEY and settings.LLM_PROVIDER == "openai":
-                from openai import OpenAI
-                client = OpenAI(api_key=settings.OPENAI_API_KEY)
-                response = client.chat.completions.create(
-                    model=settings.OPENAI_MODEL,
-                    messages=[
+        # Through the shared gateway: pooled clients, retries and provider failover
+        gateway = get_llm_gateway()
+        if gateway is not None:
+            try:
+                completion = gateway.complete(
+                    [
                         {"role": "system", "content": "You are a helpful support assistant for SupportMax Pro. Answer the user's question concisely."},
                         {"role": "user", "content": user_query}
                     ],
@@ -54,28 +93,13 @@ class Reasoning:
                 )
                 return {
                     "action_type": "general_response",
-                    "content": response.choices[0].message.content,
-                    "confidence": 0.7,
-                    "source": "llm"
-                }
-            elif settings.ANTHROPIC_API_KEY and settings.LLM_PROVIDER == "anthropic":
-                import anthropic
-                client = anthropic.Anthropic(api_key=settings.ANTHROPIC_API_KEY)
-                response = client.messages.create(
-                    model=settings.ANTHROPIC_MODEL,
-                    max_tokens=150,
-                    messages=[
-                        {"role": "user", "content": user_query}
-                    ]
-                )
-                return {
-                    "action_type": "general_response",
-                    "content": response.content[0].text,
+                    "content": completion.text,
                     "confidence": 0.7,
-                    "source": "llm"
+                    "source": "llm",
+                    "provider": completion.provider
                 }
-        except Exception as e:
-            print(f"LLM Error: {e}")
+            except LLMUnavailable as e:
+                print(f"Warning: no LLM provider available: {e}")
 
         # Default fallback if no LLM or error
         return {
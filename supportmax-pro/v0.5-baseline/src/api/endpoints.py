@@ -6,14 +6,21 @@ import uvicorn
 # This must happen BEFORE importing from agent or config
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks, Request
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Request, Query, Depends
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Dict, Any, Optional
-from fastapi import FastAPI, HTTPException, BackgroundTasks
-from pydantic import BaseModel
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
+import json
 from agent.baseline_agent import BaselineAgent
+from agent.deadline import Deadline
+from config.constraints import MAX_RESPONSE_TIME_SECONDS
 from config.settings import settings
+from knowledge.faq_store import get_faq_store
+from tools.ticket_creator import TicketCreator
+from api.executor import CrewExecutor, ExecutorSaturated
+from api.streaming import EventChannel, format_sse
+from agent.llm import close_openai_clients
+from agent.llm_gateway import close_llm_gateway, get_llm_gateway
 import logging
 import sys
 import os
@@ -41,6 +48,8 @@ app = FastAPI(
 
 # Initialize agent
 agent = BaselineAgent()
+ticket_creator = TicketCreator()
+crew_executor = CrewExecutor(max_workers=settings.CREW_MAX_WORKERS, max_queue=settings.CREW_MAX_QUEUE)
 
 class ChatRequest(BaseModel):
     message: str
@@ -51,6 +60,30 @@ class ChatResponse(BaseModel):
     action_taken: str
     metadata: Dict[str, Any]
 
+def request_deadline() -> Optional[Deadline]:
+    """Deadline of a request, started on arrival so queueing time counts against it."""
+    return Deadline(MAX_RESPONSE_TIME_SECONDS) if settings.DEADLINE_ENFORCED else None
+
+class TicketListResponse(BaseModel):
+    tickets: List[Dict[str, Any]]
+    next_cursor: Optional[str] = None
+
+def ticket_filters(
+    status: Optional[str] = None,
+    priority: Optional[str] = None,
+    email: Optional[str] = None,
+    created_from: Optional[str] = Query(None, description="ISO 8601 lower bound (inclusive)"),
+    created_to: Optional[str] = Query(None, description="ISO 8601 upper bound (exclusive)")
+) -> Dict[str, Optional[str]]:
+    """Query parameters shared by the ticket list and export endpoints."""
+    return {
+        "status": status,
+        "priority": priority,
+        "contact_email": email,
+        "created_from": created_from,
+        "created_to": created_to
+    }
+
 @app.get("/")
 async def root():
     return {"message": "SupportMax Pro v0.5 Baseline Agent is running"}
@@ -60,21 +93,129 @@ async def chat_endpoint(request: ChatRequest):
     """
     Main chat endpoint.
     """
+    deadline = request_deadline()
     try:
-        result = agent.process_message(request.message, request.user_id)
+        # The crew blocks on LLM calls: run it on the worker pool, not the event loop
+        result = await crew_executor.run(agent.process_message, request.message, request.user_id, deadline=deadline)
+        if result["metadata"].get("degraded"):
+            logger.warning(f"Deadline exceeded during {result['metadata']['timed_out_stage']}, answered with a fallback")
         
         return ChatResponse(
             response=result["text"],
             action_taken=result["action_taken"],
             metadata=result.get("metadata", {})
         )
+    except ExecutorSaturated as e:
+        logger.warning(str(e))
+        raise HTTPException(
+            status_code=503,
+            detail="All agents are busy. Please retry shortly.",
+            headers={"Retry-After": str(e.retry_after)}
+        )
     except Exception as e:
         logger.error(f"Error processing request: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post(f"{settings.API_V1_STR}/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest):
+    """
+    Streaming chat over server-sent events. Emits "start" immediately, then
+    live agent events (step, tool_call, tool_result, answer_start, token) as
+    the crew works, and finally "final" with the same fields as /chat
+    (or "error").
+    """
+    channel = EventChannel()
+    deadline = request_deadline()
+
+    def job():
+        try:
+            result = agent.process_message(request.message, request.user_id, on_event=channel.emit, deadline=deadline)
+            channel.emit("final", {
+                "response": result["text"],
+                "action_taken": result["action_taken"],
+                "metadata": result.get("metadata", {})
+            })
+        except Exception as e:
+            logger.error(f"Error processing streamed request: {e}")
+            channel.emit("error", {"detail": str(e)})
+        finally:
+            channel.close()
+
+    try:
+        # Admission happens before the response starts, so overload is still a plain 503
+        crew_executor.submit(job)
+    except ExecutorSaturated as e:
+        logger.warning(str(e))
+        raise HTTPException(
+            status_code=503,
+            detail="All agents are busy. Please retry shortly.",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+    async def events():
+        yield format_sse("start", {"status": "accepted"})
+        async for chunk in channel.stream():
+            yield chunk
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Ticket endpoints are sync handlers: FastAPI runs them in its threadpool,
+# and each thread reuses its own pooled SQLite connection.
+@app.get(f"{settings.API_V1_STR}/tickets", response_model=TicketListResponse)
+def list_tickets(
+    filters: Dict[str, Optional[str]] = Depends(ticket_filters),
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500)
+):
+    """
+    Filtered ticket listing with keyset (cursor) pagination.
+    Pass `next_cursor` from the previous page as `cursor` to continue.
+    """
+    try:
+        tickets, next_cursor = ticket_creator.query_tickets(cursor=cursor, limit=limit, **filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return TicketListResponse(tickets=tickets, next_cursor=next_cursor)
+
+@app.get(f"{settings.API_V1_STR}/tickets/export")
+def export_tickets(filters: Dict[str, Optional[str]] = Depends(ticket_filters)):
+    """
+    Streams matching tickets as NDJSON (one JSON object per line).
+    """
+    lines = (json.dumps(ticket) + "\n" for ticket in ticket_creator.export_tickets(**filters))
+    return StreamingResponse(lines, media_type="application/x-ndjson")
+
 @app.get(f"{settings.API_V1_STR}/health")
 async def health_check():
-    return {"status": "healthy"}
+    return {"status": "healthy", "faq_index": get_faq_store().stats()}
+
+@app.get(f"{settings.API_V1_STR}/metrics")
+async def metrics():
+    gateway = get_llm_gateway()
+    return {
+        "crew_executor": crew_executor.stats(),
+        "crew_pool": agent.crews.stats(),
+        "router": agent.router_stats(),
+        "llm": gateway.stats() if gateway else None
+    }
+
+@app.on_event("startup")
+def warm_crews():
+    # Build the pooled crews before the first request rather than during it
+    try:
+        agent.crews.warm()
+    except Exception as e:
+        logger.warning(f"Could not pre-build crews, they will be built on first use: {e}")
+
+@app.on_event("shutdown")
+def shutdown_executor():
+    crew_executor.shutdown()
+    close_llm_gateway()
+    close_openai_clients()
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
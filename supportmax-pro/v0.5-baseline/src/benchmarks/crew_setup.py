@@ -0,0 +1,162 @@
+"""
+Per-request crew setup overhead: rebuilding everything vs. the warm CrewPool.
+
+"before" rebuilds what SupportCrew.run used to build on every call (OpenAI
+clients with their own HTTP pools, ChatOpenAI, Agent, Task, Crew).
+"after" borrows a pre-built SupportCrew and only binds the Task.
+
+The LLM is stubbed at the HTTP layer (httpx.MockTransport returning a
+canned "Final Answer"), so no network calls or API key are needed and the
+end-to-end numbers isolate framework overhead.
+
+Usage (from src/):
+    python -m benchmarks.crew_setup [--requests 200] [--pool-size 4]
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import statistics
+import time
+from typing import Callable, Dict, List, Tuple
+import httpx
+import openai
+from crewai import Agent, Task, Crew, Process
+from langchain_openai import ChatOpenAI
+from agent.crew_agent import SupportCrew
+from agent.crew_pool import CrewPool
+from tools.crew_tools import CrewTools
+
+STUB_ANSWER = "Thought: I now know the final answer\nFinal Answer: Go to Settings > Security to reset your password."
+MESSAGE = "How do I reset my password?"
+
+
+def _stub_completion(request: httpx.Request) -> httpx.Response:
+    if json.loads(request.content).get("stream"):
+        # CrewAI's executor streams; answer with a single-chunk SSE stream
+        chunk = {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": "stub",
+            "choices": [{"index": 0, "delta": {"role": "assistant", "content": STUB_ANSWER}, "finish_reason": "stop"}],
+        }
+        body = f"data: {json.dumps(chunk)}\n\ndata: [DONE]\n\n"
+        return httpx.Response(200, content=body.encode("utf-8"), headers={"content-type": "text/event-stream"})
+    return httpx.Response(200, json={
+        "id": "chatcmpl-stub",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": "stub",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": STUB_ANSWER}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+    })
+
+
+async def _stub_completion_async(request: httpx.Request) -> httpx.Response:
+    return _stub_completion(request)
+
+
+def _stub_clients() -> Tuple[openai.OpenAI, openai.AsyncOpenAI]:
+    """A fresh pair of OpenAI clients (and HTTP pools) backed by the stub."""
+    return (
+        openai.OpenAI(api_key="stub", http_client=httpx.Client(transport=httpx.MockTransport(_stub_completion))),
+        openai.AsyncOpenAI(api_key="stub", http_client=httpx.AsyncClient(transport=httpx.MockTransport(_stub_completion_async)))
+    )
+
+
+def _stub_llm(clients: Tuple[openai.OpenAI, openai.AsyncOpenAI]) -> ChatOpenAI:
+    return ChatOpenAI(
+        model="gpt-4-turbo-preview",
+        api_key="stub",
+        temperature=0,
+        client=clients[0].chat.completions,
+        async_client=clients[1].chat.completions
+    )
+
+
+def run_before(message: str) -> Tuple[float, float]:
+    """The old per-request path. Returns (setup seconds, total seconds)."""
+    started = time.perf_counter()
+    llm = _stub_llm(_stub_clients())
+    steps = []
+    support_agent = Agent(
+        role='Senior Support Representative',
+        goal='Resolve user queries efficiently using FAQs or by creating tickets.',
+        backstory="You are an expert support agent for SupportMax Pro.",
+        verbose=True,
+        allow_delegation=False,
+        tools=[CrewTools.search_faq, CrewTools.create_ticket, CrewTools.check_ticket_status],
+        llm=llm,
+        step_callback=lambda step: steps.append(str(step))
+    )
+    task = Task(
+        description=f'Analyze the following user message: "{message}"',
+        agent=support_agent,
+        expected_output="A helpful response to the user."
+    )
+    crew = Crew(agents=[support_agent], tasks=[task], verbose=2, process=Process.sequential)
+    setup = time.perf_counter() - started
+    crew.kickoff()
+    return setup, time.perf_counter() - started
+
+
+def make_run_after(pool: CrewPool) -> Callable[[str], Tuple[float, float]]:
+    def run_after(message: str) -> Tuple[float, float]:
+        started = time.perf_counter()
+        with pool.checkout() as crew:
+            crew.bind(message)
+            setup = time.perf_counter() - started
+            crew.crew.kickoff()
+        return setup, time.perf_counter() - started
+    return run_after
+
+
+def measure(run: Callable[[str], Tuple[float, float]], requests: int) -> Dict[str, float]:
+    setups: List[float] = []
+    totals: List[float] = []
+    # CrewAI and LangChain print every step when verbose; keep the report readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        run(MESSAGE)  # warm-up (imports, first-use caches)
+        for _ in range(requests):
+            setup, total = run(MESSAGE)
+            setups.append(setup * 1000)
+            totals.append(total * 1000)
+    setups.sort()
+    totals.sort()
+    return {
+        "setup_mean_ms": round(statistics.mean(setups), 3),
+        "setup_p95_ms": round(setups[int(0.95 * (len(setups) - 1))], 3),
+        "total_mean_ms": round(statistics.mean(totals), 3),
+        "total_p95_ms": round(totals[int(0.95 * (len(totals) - 1))], 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crew setup overhead benchmark (stub LLM)")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--pool-size", type=int, default=4)
+    args = parser.parse_args()
+    # CrewAI's telemetry exporter retries loudly when it can't reach its endpoint
+    logging.getLogger("opentelemetry").setLevel(logging.CRITICAL)
+
+    shared_clients = _stub_clients()
+    pool = CrewPool(lambda: SupportCrew(llm=_stub_llm(shared_clients)), size=args.pool_size)
+    warm_started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        pool.warm()
+    warm_ms = (time.perf_counter() - warm_started) * 1000
+
+    report = {
+        "requests": args.requests,
+        "before": measure(run_before, args.requests),
+        "after": measure(make_run_after(pool), args.requests),
+        "pool_warm_ms": round(warm_ms, 3),
+        "pool": pool.stats(),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -5,15 +5,25 @@ These constraints are enforced to ensure the agent meets production standards.
 
 # Latency Constraints (in seconds)
 MAX_RESPONSE_TIME_SECONDS = 2.0
+# Time kept back from the crew for answering with a fallback instead
+FALLBACK_RESERVE_SECONDS = 0.1
 
 # Cost Constraints
 MAX_TOKENS_PER_QUERY = 1000
 MAX_DAILY_COST_USD = 5.0
 
 # Reliability Constraints
+# Retries of a failed LLM call, and the longest any one stage (a crew run,
+# an LLM call) may take, even when the request deadline leaves more
 MAX_RETRIES = 3
 TIMEOUT_SECONDS = 5.0
 
 # Knowledge Constraints
 MIN_CONFIDENCE_SCORE = 0.7
 MAX_FAQ_RESULTS = 3
+# Looser FAQ match accepted when the deadline leaves no time for the crew
+FALLBACK_MIN_CONFIDENCE = 0.5
+
+# Routing Constraints
+# A confident FAQ hit must beat the runner-up by this much to skip the crew
+FAST_PATH_MIN_MARGIN = 0.2
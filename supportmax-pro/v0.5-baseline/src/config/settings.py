@@ -15,11 +15,42 @@ class Settings(BaseSettings):
     ANTHROPIC_API_KEY: Optional[str] = os.getenv("ANTHROPIC_API_KEY")
     
     # Model Selection
-    # Options: "openai" or "anthropic"
+    # Options: "openai", "anthropic" or "fake" (local canned replies, for tests)
     LLM_PROVIDER: str = os.getenv("LLM_PROVIDER", "openai")
     OPENAI_MODEL: str = "gpt-4-turbo-preview"
     ANTHROPIC_MODEL: str = "claude-3-sonnet-20240229"
     
+    # LLM Gateway (agent/llm_gateway.py)
+    # Providers tried, in order, when LLM_PROVIDER fails or its circuit is open
+    LLM_FALLBACK_PROVIDERS: str = os.getenv("LLM_FALLBACK_PROVIDERS", "openai,anthropic")
+    # Send a duplicate request when a call exceeds the provider's p95 latency
+    LLM_HEDGE_ENABLED: bool = os.getenv("LLM_HEDGE_ENABLED", "false").lower() == "true"
+    # Consecutive failures that open a provider's circuit, and how long it stays open
+    LLM_BREAKER_FAILURES: int = 5
+    LLM_BREAKER_RESET_SECONDS: float = 30.0
+    FAKE_LLM_LATENCY_MS: int = int(os.getenv("FAKE_LLM_LATENCY_MS", "0"))
+    FAKE_LLM_FAILURE_RATE: float = float(os.getenv("FAKE_LLM_FAILURE_RATE", "0"))
+    
+    # Crew Execution (off the event loop)
+    # Worker threads running crews, and how many requests may wait for one
+    # before /chat answers 503 with Retry-After
+    CREW_MAX_WORKERS: int = int(os.getenv("CREW_MAX_WORKERS", "4"))
+    CREW_MAX_QUEUE: int = int(os.getenv("CREW_MAX_QUEUE", "16"))
+    # Shared OpenAI HTTP pool: connections are kept alive and reused across
+    # requests instead of opening a new pool per crew
+    LLM_MAX_CONNECTIONS: int = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+    LLM_KEEPALIVE_SECONDS: float = 30.0
+    
+    # Routing
+    # Answer confident FAQ hits and clear ticket intents without the crew
+    FAST_PATH_ENABLED: bool = os.getenv("FAST_PATH_ENABLED", "true").lower() == "true"
+    # Stop crew runs at MAX_RESPONSE_TIME_SECONDS and answer with a fallback
+    DEADLINE_ENFORCED: bool = os.getenv("DEADLINE_ENFORCED", "true").lower() == "true"
+    
+    # Ticket Storage
+    # Options: "sqlite" (multi-worker safe) or "jsonl" (single-process append-only log)
+    TICKET_STORE_BACKEND: str = os.getenv("TICKET_STORE_BACKEND", "sqlite")
+    
     # Logging
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
 
@@ -5,6 +5,7 @@ import json
 
 # Configuration
 API_URL = "http://localhost:8000/api/v1/chat"
+STREAM_URL = f"{API_URL}/stream"
 
 st.set_page_config(
     page_title="SupportMax Pro v0.5", 
@@ -19,6 +20,56 @@ This is the baseline agent for Chapter 1. It demonstrates:
 - **Ticket Creation**: Detects intent to create support tickets.
 """)
 
+def iter_sse(response):
+    """Yields (event, data) pairs from a server-sent events response."""
+    event, data_lines = "message", []
+    for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+        if line is None:
+            continue
+        if line == "":
+            if data_lines:
+                yield event, json.loads("\n".join(data_lines))
+            event, data_lines = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data_lines.append(line[len("data:"):].strip())
+
+def stream_chat(payload, message_placeholder, status_label):
+    """
+    Calls the streaming endpoint and renders agent events as they arrive:
+    steps and tool calls in a status panel, answer tokens in the placeholder.
+    Returns (full_response, action_metadata).
+    """
+    full_response, answer, action_metadata = "", "", {}
+    with st.status(status_label, expanded=False) as status:
+        with requests.post(STREAM_URL, json=payload, stream=True, timeout=300) as response:
+            if response.status_code != 200:
+                status.update(label="Request failed", state="error")
+                return f"❌ Error: {response.status_code} - {response.text}", {}
+            for event, data in iter_sse(response):
+                if event == "tool_call":
+                    status.write(f"🔧 **{data['tool']}** ← `{data['input']}`")
+                elif event == "tool_result":
+                    status.write(f"📄 {data['output'][:500]}")
+                elif event == "step":
+                    status.markdown(f"> {data['agent_step']}")
+                elif event == "answer_start":
+                    answer = ""
+                elif event == "token":
+                    answer += data["text"]
+                    message_placeholder.markdown(answer + "▌")
+                elif event == "final":
+                    full_response = data["response"]
+                    action_metadata = {
+                        "action_taken": data.get("action_taken"),
+                        "details": data.get("metadata", {})
+                    }
+                elif event == "error":
+                    full_response = f"❌ Error: {data['detail']}"
+        status.update(label="Done", state="complete" if action_metadata else "error")
+    return full_response, action_metadata
+
 # Initialize session state
 if "messages" not in st.session_state:
     st.session_state.messages = []
@@ -100,29 +151,16 @@ if prompt:
         full_response = ""
         action_metadata = {}
         
-        with st.spinner("Agent is thinking..."):
-            try:
-                payload = {
-                    "message": prompt,
-                    "user_id": st.session_state.user_id
-                }
-                
-                response = requests.post(API_URL, json=payload)
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    full_response = data["response"]
-                    
-                    # Prepare metadata for display
-                    action_metadata = {
-                        "action_taken": data.get("action_taken"),
-                        "details": data.get("metadata", {})
-                    }
-                else:
-                    full_response = f"❌ Error: {response.status_code} - {response.text}"
-                    
-            except Exception as e:
-                full_response = f"❌ Connection Error: {str(e)}. Ensure API is running at {API_URL}"
+        try:
+            payload = {
+                "message": prompt,
+                "user_id": st.session_state.user_id
+            }
+            
+            # Stream agent steps and the answer as they are produced
+            full_response, action_metadata = stream_chat(payload, message_placeholder, "Agent is thinking...")
+        except Exception as e:
+            full_response = f"❌ Connection Error: {str(e)}. Ensure API is running at {STREAM_URL}"
 
         message_placeholder.markdown(full_response)
         
@@ -1,4 +1,4 @@
 """Knowledge management module."""
-from .faq_store import FAQStore
+from .faq_store import FAQStore, SharedFAQStore, get_faq_store
 
-__all__ = ["FAQStore"]
\ No newline at end of file
+__all__ = ["FAQStore", "SharedFAQStore", "get_faq_store"]
\ No newline at end of file
@@ -1,14 +1,53 @@
+import heapq
 import json
+import math
 import os
-from typing import List, Dict, Optional
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import List, Dict, Optional, Tuple
 from config.constraints import MAX_FAQ_RESULTS, MIN_CONFIDENCE_SCORE
 
+# BM25 tuning parameters (standard Okapi defaults)
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Words that carry no signal for FAQ matching ("How do I ...?")
+_STOPWORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "could", "do", "does",
+    "for", "from", "have", "how", "i", "if", "in", "is", "it", "me", "my", "of",
+    "on", "or", "our", "please", "the", "this", "to", "was", "we", "what", "when",
+    "where", "which", "who", "why", "will", "with", "you", "your",
+})
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercases and splits text into index terms, dropping stopwords.
+    A trailing plural 's' is stripped so 'passwords' matches 'password'.
+    """
+    terms = []
+    for token in _TOKEN_PATTERN.findall(text.lower()):
+        if token in _STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        terms.append(token)
+    return terms
+
+
 class FAQStore:
     """
-    Simple in-memory FAQ store for the baseline agent.
+    In-memory FAQ store backed by an inverted index with BM25 ranking.
+    The index is built once at load time; searches only touch the postings
+    of the query terms instead of scanning every FAQ.
     """
     def __init__(self, faq_file_path: str = "src/v0.5-baseline/src/knowledge/sample_faqs.json"):
         self.faqs = self._load_faqs(faq_file_path)
+        self._build_index()
 
     def _load_faqs(self, file_path: str) -> List[Dict]:
         """Loads FAQs from a JSON file."""
@@ -18,31 +57,172 @@ class FAQStore:
                 # Try relative path if absolute/project-relative fails
                 # Fallback to looking relative to this file
                 file_path = os.path.join(os.path.dirname(__file__), "sample_faqs.json")
-            
+
+            self.file_path = file_path
             with open(file_path, 'r') as f:
                 return json.load(f)
         except FileNotFoundError:
+            self.file_path = file_path
             print(f"Warning: FAQ file not found at {file_path}. Starting with empty knowledge base.")
             return []
 
-    def search(self, query: str) -> List[Dict]:
+    def _build_index(self):
+        """
+        Builds the term -> [(faq position, term frequency)] postings,
+        document lengths and id lookup used by search.
+        """
+        self._postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self._doc_lengths: List[int] = []
+        self._by_id: Dict[str, Dict] = {}
+
+        for position, faq in enumerate(self.faqs):
+            terms = tokenize(f"{faq.get('question', '')} {faq.get('answer', '')}")
+            for term, freq in Counter(terms).items():
+                self._postings[term].append((position, freq))
+            self._doc_lengths.append(len(terms))
+            if "id" in faq:
+                self._by_id[faq["id"]] = faq
+
+        total_length = sum(self._doc_lengths)
+        self._avg_doc_length = total_length / len(self._doc_lengths) if self._doc_lengths else 0.0
+        self._postings = dict(self._postings)
+
+    def _idf(self, term: str) -> float:
+        """BM25 inverse document frequency (always positive)."""
+        doc_freq = len(self._postings.get(term, ()))
+        n_docs = len(self.faqs)
+        return math.log(1 + (n_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+
+    def search(
+        self,
+        query: str,
+        top_k: int = MAX_FAQ_RESULTS,
+        min_score: float = MIN_CONFIDENCE_SCORE
+    ) -> List[Dict]:
         """
-        Basic keyword search for FAQs.
-        In a real system, this would use vector embeddings.
+        Ranked BM25 search over FAQ questions and answers.
+
+        Each result is a copy of the FAQ with a `score` in [0, 1]: the share
+        of the query's (IDF-weighted) terms that the FAQ matches. Results
+        below `min_score` are dropped; ranking among the rest uses BM25.
         """
-        query = query.lower()
-        results = []
-        
-        for faq in self.faqs:
-            # Simple keyword matching
-            if query in faq['question'].lower() or query in faq['answer'].lower():
-                results.append(faq)
-                
-        return results[:MAX_FAQ_RESULTS]
+        query_terms = set(tokenize(query))
+        if not query_terms or not self.faqs:
+            return []
+
+        query_weight = 0.0
+        bm25_scores: Dict[int, float] = defaultdict(float)
+        matched_weight: Dict[int, float] = defaultdict(float)
+
+        for term in query_terms:
+            idf = self._idf(term)
+            query_weight += idf
+            for position, freq in self._postings.get(term, ()):
+                length_norm = 1 - BM25_B + BM25_B * self._doc_lengths[position] / self._avg_doc_length
+                bm25_scores[position] += idf * freq * (BM25_K1 + 1) / (freq + BM25_K1 * length_norm)
+                matched_weight[position] += idf
+
+        candidates = (
+            (bm25_scores[position], matched_weight[position] / query_weight, position)
+            for position in bm25_scores
+            if matched_weight[position] / query_weight >= min_score
+        )
+        top = heapq.nlargest(top_k, candidates)
+
+        return [dict(self.faqs[position], score=round(confidence, 3)) for _, confidence, position in top]
 
     def get_faq_by_id(self, faq_id: str) -> Optional[Dict]:
         """Retrieve a specific FAQ by ID."""
-        for faq in self.faqs:
-            if faq['id'] == faq_id:
-                return faq
-        return None
\ No newline at end of file
+        return self._by_id.get(faq_id)
+
+
+class SharedFAQStore:
+    """
+    Process-wide FAQ index shared across requests and threads.
+
+    The FAQ file's mtime is checked at most every `check_interval` seconds.
+    When it changes, one thread rebuilds a fresh FAQStore and swaps the
+    reference in; every other thread keeps searching the current index
+    and is never blocked by the reload.
+    """
+    def __init__(self, faq_file_path: str = "src/v0.5-baseline/src/knowledge/sample_faqs.json", check_interval: float = 2.0):
+        self.check_interval = check_interval
+        self._reload_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._loads = 0
+        self._lookups = 0
+        self._store = self._load(faq_file_path)
+        self._next_check = time.monotonic() + check_interval
+
+    def _load(self, file_path: str) -> FAQStore:
+        # Stat before reading so an edit racing with the load triggers another reload
+        mtime = self._file_mtime(file_path)
+        store = FAQStore(file_path)
+        self._mtime = mtime if store.file_path == file_path else self._file_mtime(store.file_path)
+        with self._stats_lock:
+            self._loads += 1
+        return store
+
+    @staticmethod
+    def _file_mtime(file_path: str) -> Optional[float]:
+        try:
+            return os.stat(file_path).st_mtime
+        except OSError:
+            return None
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        # Only one thread checks/rebuilds; the others carry on with the old index
+        if not self._reload_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_check = now + self.check_interval
+            current = self._store
+            if self._file_mtime(current.file_path) != self._mtime:
+                try:
+                    self._store = self._load(current.file_path)
+                except ValueError as e:
+                    # Half-written file: keep serving the previous index and retry later
+                    print(f"Warning: FAQ reload failed ({e}). Keeping previous index.")
+        finally:
+            self._reload_lock.release()
+
+    @property
+    def store(self) -> FAQStore:
+        """The current index snapshot (reloaded if the FAQ file changed)."""
+        self._maybe_reload()
+        return self._store
+
+    def search(self, query: str, **kwargs) -> List[Dict]:
+        store = self.store
+        with self._stats_lock:
+            self._lookups += 1
+        return store.search(query, **kwargs)
+
+    def get_faq_by_id(self, faq_id: str) -> Optional[Dict]:
+        return self.store.get_faq_by_id(faq_id)
+
+    def stats(self) -> Dict[str, int]:
+        """Number of index (re)loads versus lookups served."""
+        with self._stats_lock:
+            return {
+                "loads": self._loads,
+                "lookups": self._lookups,
+                "faq_count": len(self._store.faqs),
+            }
+
+
+_shared_store: Optional[SharedFAQStore] = None
+_shared_store_lock = threading.Lock()
+
+
+def get_faq_store() -> SharedFAQStore:
+    """Returns the process-wide SharedFAQStore, creating it on first use."""
+    global _shared_store
+    if _shared_store is None:
+        with _shared_store_lock:
+            if _shared_store is None:
+                _shared_store = SharedFAQStore()
+    return _shared_store
@@ -28,3 +28,215 @@ def test_agent_process_message_ticket():
     agent = BaselineAgent()
     response = agent.process_message("I need to create a support ticket")
     assert response["action_taken"] == "create_ticket"
+
+def test_agent_fast_path_reports_tier():
+    agent = BaselineAgent()
+    response = agent.process_message("How do I reset my password?")
+    assert response["metadata"]["tier"] == "fast_path"
+    assert response["metadata"]["within_sla"] is True
+    assert agent.router_stats()["tiers"]["fast_path"]["requests"] == 1
+
+def test_router_escalates_ambiguous_queries():
+    agent = BaselineAgent()
+    for message in ["What is the weather in Tokyo?", "I need a ticket about login failing after the update"]:
+        assert agent.reasoning.route(agent.perception.process_input(message)) is None
+
+def test_router_answers_ticket_status():
+    agent = BaselineAgent()
+    created = agent.action.ticket_creator.create_ticket("Login issue", "Cannot log in")
+    response = agent.process_message(f"What is the status of ticket #{created['ticket_id']}?")
+    assert response["action_taken"] == "check_ticket_status"
+    assert response["metadata"]["ticket_found"] is True
+    assert "Open" in response["text"]
+
+def test_event_relay_streams_only_final_answer_tokens():
+    from agent.events import CrewEventRelay
+    events = []
+    relay = CrewEventRelay(lambda event, data: events.append((event, data)))
+    relay.on_llm_start({}, ["prompt"])
+    for token in ["Thought: done\nFinal ", "Answer: Reset ", "it in ", "Settings."]:
+        relay.on_llm_new_token(token)
+    assert events[0] == ("answer_start", {})
+    assert "".join(data["text"] for event, data in events if event == "token") == "Reset it in Settings."
+
+def test_build_llm_streams_final_answer_tokens_to_relay(monkeypatch):
+    from types import SimpleNamespace
+    from agent import llm as llm_module
+    from agent.events import relay_events
+
+    def create(**kwargs):
+        # A streaming chat completions endpoint: one delta per chunk
+        assert kwargs.get("stream") is True
+        for text in ["Thought: done\nFinal ", "Answer: Reset ", "it in ", "Settings."]:
+            yield {"choices": [{"delta": {"role": "assistant", "content": text}, "finish_reason": None}]}
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(llm_module, "get_openai_clients", lambda: (client, client))
+    monkeypatch.setattr(llm_module.settings, "OPENAI_API_KEY", "sk-test")
+    events = []
+    with relay_events(lambda event, data: events.append((event, data))):
+        reply = llm_module.build_llm().invoke("How do I reset my password?")
+    assert reply.content == "Thought: done\nFinal Answer: Reset it in Settings."
+    assert events[0] == ("answer_start", {})
+    assert "".join(data["text"] for event, data in events if event == "token") == "Reset it in Settings."
+
+def test_gateway_chat_model_streams_and_honours_stop_sequences():
+    from agent.events import relay_events
+    from agent.llm_gateway import FakeProvider, GatewayChatModel, LLMGateway
+    provider = FakeProvider(reply="Reset it in Settings.\nObservation: ignored")
+    model = GatewayChatModel(gateway=LLMGateway([provider]), streaming=True)
+    events = []
+    with relay_events(lambda event, data: events.append((event, data))):
+        reply = model.invoke("Give your Final Answer:", stop=["\nObservation"])
+    assert reply.content == "Thought: I now know the final answer\nFinal Answer: Reset it in Settings."
+    tokens = [data["text"] for event, data in events if event == "token"]
+    assert len(tokens) > 1
+    assert "".join(tokens) == "Reset it in Settings."
+
+def test_crew_past_deadline_degrades_to_fallback(monkeypatch):
+    import time
+    from agent.deadline import Deadline, record_result
+    agent = BaselineAgent()
+
+    def slow_crew(message, on_event=None):
+        record_result("create_ticket", "Ticket created successfully. ID: TKT-1")
+        time.sleep(1.0)
+
+    monkeypatch.setattr(agent, "_run_crew", slow_crew)
+    started = time.monotonic()
+    response = agent.process_message("I need a ticket about login failing after the update", deadline=Deadline(0.3))
+    assert time.monotonic() - started < 0.8
+    assert response["metadata"]["tier"] == "fallback"
+    assert response["metadata"]["degraded"] is True
+    assert response["action_taken"] == "create_ticket"
+    assert "TKT-1" in response["text"]
+
+def test_default_deadline_answers_slow_crew_within_sla(monkeypatch):
+    import time
+    from config.constraints import MAX_RESPONSE_TIME_SECONDS
+    agent = BaselineAgent(fast_path=False)
+    monkeypatch.setattr(agent, "_run_crew", lambda message, on_event=None: time.sleep(MAX_RESPONSE_TIME_SECONDS + 1))
+    response = agent.process_message("How do I reset my password?")
+    assert response["metadata"]["tier"] == "fallback"
+    assert response["metadata"]["within_sla"] is True
+    assert response["action_taken"] == "answer_faq"
+
+def test_abandoned_crew_returns_to_pool_at_next_token(monkeypatch):
+    import time
+    from agent.crew_agent import SupportCrew
+    from agent.crew_pool import CrewPool
+    from agent.deadline import Deadline
+    from agent.llm_gateway import FakeProvider, GatewayChatModel, LLMGateway
+    monkeypatch.setenv("OTEL_SDK_DISABLED", "true")
+
+    class SlowStreamingProvider(FakeProvider):
+        # Streams for 3 seconds, far past the deadline
+        def stream(self, messages, max_tokens, timeout, stop=None):
+            for _ in range(60):
+                time.sleep(0.05)
+                yield "thinking "
+
+    agent = BaselineAgent(pool_size=1, fast_path=False)
+    llm = GatewayChatModel(gateway=LLMGateway([SlowStreamingProvider()]), streaming=True)
+    agent.crews = CrewPool(lambda: SupportCrew(llm=llm), size=1)
+    response = agent.process_message("Something odd happened with my account", deadline=Deadline(0.5))
+    assert response["metadata"]["tier"] == "fallback"
+    # The given-up crew stops mid-stream and is ready for the next request
+    returned_by = time.monotonic() + 1.0
+    while agent.crews.stats()["idle"] == 0 and time.monotonic() < returned_by:
+        time.sleep(0.02)
+    assert agent.crews.stats()["idle"] == 1
+
+def test_deadline_guard_blocks_llm_calls_after_expiry():
+    from agent.deadline import Deadline, DeadlineExceeded, DeadlineGuard, check_deadline, deadline_scope
+    deadline = Deadline(5.0)
+    guard = DeadlineGuard(deadline)
+    guard.on_llm_start({}, ["prompt"])
+    deadline.cancel()
+    with pytest.raises(DeadlineExceeded):
+        guard.on_chat_model_start({}, [[]])
+    with deadline_scope(deadline), pytest.raises(DeadlineExceeded):
+        check_deadline("FAQ search")
+
+def test_llm_gateway_fails_over_when_circuit_opens():
+    from agent.llm_gateway import FakeProvider, GatewayChatModel, LLMGateway
+    primary, backup = FakeProvider(failure_rate=1.0), FakeProvider(reply="From the backup provider.")
+    primary.name, backup.name = "primary", "backup"
+    gateway = LLMGateway([primary, backup], max_retries=1, breaker_failures=2)
+    messages = [{"role": "user", "content": "Hello"}]
+    assert gateway.complete(messages).provider == "backup"
+    assert gateway.stats()["providers"]["primary"]["circuit"] == "open"
+    # With the circuit open the primary is not tried again
+    assert gateway.complete(messages).text == "From the backup provider."
+    assert gateway.stats()["providers"]["primary"]["calls"] == 2
+    assert gateway.stats()["failovers"] == 2
+    assert GatewayChatModel(gateway=gateway).invoke("Hi").content == "From the backup provider."
+
+def test_deadline_during_half_open_trial_releases_the_breaker():
+    import time
+    from agent.deadline import Deadline, DeadlineExceeded, deadline_scope
+    from agent.llm_gateway import FakeProvider, LLMGateway
+    provider = FakeProvider(failure_rate=1.0)
+    gateway = LLMGateway([provider], max_retries=0, breaker_failures=1, breaker_reset_seconds=0.05)
+    messages = [{"role": "user", "content": "Hello"}]
+    with pytest.raises(Exception):
+        gateway.complete(messages)
+    time.sleep(0.1)
+    assert gateway.stats()["providers"]["fake"]["circuit"] == "half_open"
+    # The trial call runs out of time before reaching the provider
+    deadline = Deadline(1.0)
+    deadline.cancel()
+    with deadline_scope(deadline), pytest.raises(DeadlineExceeded):
+        next(gateway.stream(messages))
+    provider.failure_rate = 0.0
+    assert gateway.complete(messages).provider == "fake"
+    assert gateway.stats()["providers"]["fake"]["circuit"] == "closed"
+
+def test_llm_gateway_hedges_slow_calls():
+    import time
+    from agent.llm_gateway import FakeProvider, HEDGE_MIN_SAMPLES, LLMGateway
+
+    class StallingProvider(FakeProvider):
+        # Fast, except for the call numbered `stall_on`
+        def __init__(self, stall_on):
+            super().__init__(latency=0.005)
+            self.calls, self.stall_on = 0, stall_on
+        def complete(self, messages, max_tokens, timeout, stop=None):
+            self.calls += 1
+            if self.calls == self.stall_on:
+                time.sleep(1.0)
+            return super().complete(messages, max_tokens, timeout, stop)
+
+    gateway = LLMGateway([StallingProvider(stall_on=HEDGE_MIN_SAMPLES + 1)], hedge=True)
+    messages = [{"role": "user", "content": "Hello"}]
+    for _ in range(HEDGE_MIN_SAMPLES):
+        gateway.complete(messages)
+    # The duplicate sent after the p95 delay answers long before the stalled call
+    started = time.monotonic()
+    gateway.complete(messages)
+    assert time.monotonic() - started < 0.5
+    assert gateway.stats()["providers"]["fake"]["hedge_wins"] == 1
+    gateway.close()
+
+def test_pooled_crew_does_not_replay_tool_results_across_runs(monkeypatch):
+    import re
+    from langchain_community.chat_models.fake import FakeListChatModel
+    from agent.crew_agent import SupportCrew
+    from agent.crew_pool import CrewPool
+    llm = FakeListChatModel(responses=[
+        'Thought: The user reports a bug.\nAction: Create Support Ticket\nAction Input: {"description": "Login fails after the update"}',
+        "Thought: I now know the final answer\nFinal Answer: I created a ticket for you.",
+    ])
+    monkeypatch.setenv("OTEL_SDK_DISABLED", "true")  # no telemetry export from the test crew
+    pool = CrewPool(lambda: SupportCrew(llm=llm), size=1)
+
+    ticket_ids = []
+    for _ in range(2):
+        with pool.checkout() as crew:
+            crew.support_agent._token_process.total_tokens = 99
+            _, steps = crew.run("Login fails after the update")
+            assert crew.support_agent._token_process.total_tokens == 0
+            ticket_ids += re.findall(r"ID: (\w+)", " ".join(steps))
+    assert pool.stats()["created"] == 1
+    # Same tool input on the same pooled crew: two tickets, not a cached id
+    assert len(ticket_ids) == 2 and ticket_ids[0] != ticket_ids[1]
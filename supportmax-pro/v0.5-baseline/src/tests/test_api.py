@@ -0,0 +1,34 @@
+import asyncio
+import threading
+import pytest
+from api.executor import CrewExecutor, ExecutorSaturated
+
+def test_executor_returns_slot_of_cancelled_queued_job():
+    async def scenario():
+        executor = CrewExecutor(max_workers=1, max_queue=1)
+        release = threading.Event()
+        ran = []
+        running = executor.submit(release.wait)
+        try:
+            queued = executor.submit(ran.append, "queued")
+            with pytest.raises(ExecutorSaturated):
+                executor.submit(ran.append, "rejected")
+
+            # The client goes away while its job is still waiting for a worker
+            queued.cancel()
+            await asyncio.sleep(0.05)
+            assert executor.stats()["queue_depth"] == 0
+            assert executor.stats()["cancelled"] == 1
+
+            # Its slot is free again
+            again = executor.submit(ran.append, "again")
+        finally:
+            release.set()
+        await running
+        await again
+        executor.shutdown()
+        return ran, executor.stats()
+
+    ran, stats = asyncio.run(scenario())
+    assert ran == ["again"]
+    assert stats["queue_depth"] == 0 and stats["running"] == 0
@@ -1,5 +1,13 @@
+import json
+import os
+import threading
+import time
 import pytest
 from tools.ticket_creator import TicketCreator
+from tools.ticket_log import TicketLog
+from tools.ticket_store import SQLiteTicketStore, export_json_tickets
+from knowledge.faq_store import FAQStore, SharedFAQStore
+from config.constraints import MAX_FAQ_RESULTS, MIN_CONFIDENCE_SCORE
 
 def test_ticket_creation():
     creator = TicketCreator()
@@ -12,3 +20,147 @@ def test_ticket_creation():
     assert result["success"] is True
     assert "ticket_id" in result
     assert len(result["ticket_id"]) > 0
+
+
+def test_faq_search_ranks_best_match_first():
+    store = FAQStore()
+    results = store.search("How do I reset my passwords?")
+    assert results[0]["id"] == "faq_001"
+    assert results[0]["score"] >= MIN_CONFIDENCE_SCORE
+    assert len(results) <= MAX_FAQ_RESULTS
+
+def test_faq_search_filters_low_confidence():
+    store = FAQStore()
+    assert store.search("xyzabc123nonexistent") == []
+    # Only one of three query terms matches, so confidence stays below threshold
+    assert store.search("password quantum teleportation") == []
+    assert store.search("password quantum teleportation", min_score=0.0)[0]["id"] == "faq_001"
+
+def test_shared_faq_store_hot_reload(tmp_path):
+    faq_file = tmp_path / "faqs.json"
+    faq_file.write_text(json.dumps([{"id": "faq_a", "question": "How do I reset my password?", "answer": "Use the login page."}]))
+    shared = SharedFAQStore(str(faq_file), check_interval=0)
+
+    assert shared.search("reset password")[0]["id"] == "faq_a"
+
+    faq_file.write_text(json.dumps([{"id": "faq_b", "question": "Where is my invoice?", "answer": "Under billing."}]))
+    os.utime(faq_file, (time.time() + 10, time.time() + 10))
+
+    assert shared.search("invoice")[0]["id"] == "faq_b"
+    assert shared.stats()["loads"] == 2
+    assert shared.stats()["lookups"] == 2
+
+@pytest.mark.parametrize("backend", ["sqlite", "jsonl"])
+def test_ticket_store_lookup_and_legacy_import(tmp_path, backend):
+    (tmp_path / "tickets.json").write_text(json.dumps([{"id": "legacy01", "subject": "Old", "status": "Open"}]))
+    creator = TicketCreator(data_dir=str(tmp_path), backend=backend)
+
+    assert creator.get_ticket("legacy01")["subject"] == "Old"
+    result = creator.create_ticket(subject="New", description="Fresh ticket")
+    assert creator.get_ticket(result["ticket_id"])["description"] == "Fresh ticket"
+    assert creator.get_ticket("missing") is None
+
+def test_ticket_log_recovers_torn_tail_and_compacts(tmp_path):
+    log_dir = str(tmp_path / "log")
+    log = TicketLog(log_dir)
+    log.append({"id": "t1", "status": "Open"})
+    log.append({"id": "t1", "status": "Closed"})
+    log.append({"id": "t2", "status": "Open"})
+    log.close()
+
+    # Simulate a crash halfway through writing a record
+    segment = os.path.join(log_dir, "segment-000001.jsonl")
+    with open(segment, "ab") as f:
+        f.write(b'{"id": "t3", "sta')
+
+    log = TicketLog(log_dir)
+    assert len(log) == 2
+    assert log.get("t1")["status"] == "Closed"
+    assert "t3" not in log
+
+    stats = log.compact()
+    assert stats["tickets"] == 2
+    assert stats["bytes_after"] < stats["bytes_before"]
+    log.append({"id": "t4", "status": "Open"})
+    log.close()
+
+    log = TicketLog(log_dir)
+    assert [t["id"] for t in log.iter_tickets()] == ["t1", "t2", "t4"]
+    log.close()
+
+def test_sqlite_store_concurrent_writers_and_json_export(tmp_path):
+    db_path = str(tmp_path / "tickets.db")
+    stores = [SQLiteTicketStore(db_path), SQLiteTicketStore(db_path)]
+
+    def write(worker):
+        for i in range(50):
+            stores[worker % 2].append({"id": f"w{worker}-{i}", "status": "Open", "priority": "High", "note": i})
+
+    threads = [threading.Thread(target=write, args=(worker,)) for worker in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(stores[0]) == 200
+    assert stores[1].get("w3-7")["note"] == 7
+
+    export_path = str(tmp_path / "export.json")
+    assert export_json_tickets(stores[0], export_path) == 200
+    with open(export_path) as f:
+        assert len(json.load(f)) == 200
+    for store in stores:
+        store.close()
+
+@pytest.mark.parametrize("backend", ["sqlite", "jsonl"])
+def test_ticket_query_filters_and_cursor_pagination(tmp_path, backend):
+    creator = TicketCreator(data_dir=str(tmp_path), backend=backend)
+    for i in range(7):
+        creator.store.append({
+            "id": f"t{i}",
+            "status": "Open" if i % 2 == 0 else "Closed",
+            "priority": "High",
+            "created_at": f"2025-01-0{i + 1}T10:00:00",
+            "contact_email": "a@example.com" if i < 5 else "b@example.com"
+        })
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = creator.query_tickets(status="Open", cursor=cursor, limit=2)
+        seen.extend(t["id"] for t in page)
+        if cursor is None:
+            break
+    assert seen == ["t0", "t2", "t4", "t6"]
+
+    page, _ = creator.query_tickets(contact_email="a@example.com", created_from="2025-01-02", created_to="2025-01-04")
+    assert [t["id"] for t in page] == ["t1", "t2"]
+    assert [t["id"] for t in creator.export_tickets(priority="High")] == [f"t{i}" for i in range(7)]
+
+def test_sqlite_store_upgrades_legacy_indexes_and_pages_undated_tickets(tmp_path):
+    import sqlite3
+    db_path = str(tmp_path / "tickets.db")
+    # A database written before pagination: single-column indexes, undated legacy rows
+    conn = sqlite3.connect(db_path)
+    conn.executescript("""
+        CREATE TABLE tickets (id TEXT PRIMARY KEY, subject TEXT, description TEXT, priority TEXT,
+                              status TEXT, created_at TEXT, contact_email TEXT, extra TEXT);
+        CREATE INDEX idx_tickets_status ON tickets(status);
+        CREATE INDEX idx_tickets_created_at ON tickets(created_at);
+    """)
+    conn.executemany("INSERT INTO tickets (id, status, created_at) VALUES (?, 'Open', ?)",
+                     [("a", None), ("b", None), ("c", None), ("d", "2025-01-01T10:00:00")])
+    conn.commit()
+    conn.close()
+
+    store = SQLiteTicketStore(db_path)
+    indexes = {row["name"] for row in store._connection().execute("PRAGMA index_list(tickets)")}
+    assert "idx_tickets_status_page" in indexes and "idx_tickets_status" not in indexes
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = store.query(status="Open", cursor=cursor, limit=2)
+        seen.extend(t["id"] for t in page)
+        if cursor is None:
+            break
+    assert seen == ["a", "b", "c", "d"]
+    store.close()
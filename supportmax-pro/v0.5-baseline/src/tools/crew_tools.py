@@ -1,5 +1,6 @@
 from langchain.tools import tool
-from knowledge.faq_store import FAQStore
+from agent.deadline import check_deadline, record_result
+from knowledge.faq_store import get_faq_store
 from tools.ticket_creator import TicketCreator
 
 class CrewTools:
@@ -7,8 +8,8 @@ class CrewTools:
     def search_faq(query: str):
         """Useful to answer questions about passwords, billing, support hours, etc. 
         Input should be a search query string."""
-        store = FAQStore()
-        results = store.search(query)
+        check_deadline("FAQ search")
+        results = get_faq_store().search(query)
         if not results:
             return "No relevant FAQ found."
         
@@ -16,22 +17,27 @@ class CrewTools:
         response = "Found the following FAQs:\n"
         for faq in results:
             response += f"- Q: {faq['question']}\n  A: {faq['answer']}\n"
+        record_result("search_faq", response)
         return response
 
     @tool("Create Support Ticket")
     def create_ticket(description: str):
         """Useful to create a support ticket when the user has an issue that cannot be solved by FAQs.
         Input should be a detailed description of the issue."""
+        check_deadline("ticket creation")
         creator = TicketCreator()
         # For simplicity in this baseline, we infer subject from description
         subject = description[:50] + "..." if len(description) > 50 else description
         result = creator.create_ticket(subject=subject, description=description)
-        return f"Ticket created successfully. ID: {result['ticket_id']}"
+        response = f"Ticket created successfully. ID: {result['ticket_id']}"
+        record_result("create_ticket", response)
+        return response
 
     @tool("Check Ticket Status")
     def check_ticket_status(query: str):
         """Useful to check the status or details of a specific ticket.
         Input should be the ticket ID or a string containing the ticket ID."""
+        check_deadline("ticket lookup")
         creator = TicketCreator()
         
         # Simple extraction - assume query might contain just the ID or "ticket ID"
@@ -43,6 +49,8 @@ class CrewTools:
         
         ticket = creator.get_ticket(ticket_id)
         if ticket:
-            return f"Ticket Details:\nID: {ticket['id']}\nStatus: {ticket['status']}\nSubject: {ticket['subject']}\nDescription: {ticket['description']}"
+            response = f"Ticket Details:\nID: {ticket['id']}\nStatus: {ticket['status']}\nSubject: {ticket['subject']}\nDescription: {ticket['description']}"
+            record_result("check_ticket_status", response)
+            return response
         else:
             return f"Ticket ID '{ticket_id}' not found. Please double check the ID."
@@ -0,0 +1,63 @@
+"""
+Offline maintenance commands for the ticket store.
+
+Usage (from src/):
+    python -m tools.ticket_admin stats [--backend sqlite|jsonl]
+    python -m tools.ticket_admin compact                      # jsonl log only
+    python -m tools.ticket_admin import-json --file ../data/tickets.json
+    python -m tools.ticket_admin export-json --file ../data/tickets_export.json
+    python -m tools.ticket_admin migrate-log                  # jsonl log -> sqlite
+"""
+import argparse
+import os
+from tools.ticket_log import TicketLog
+from tools.ticket_store import SQLiteTicketStore, export_json_tickets, import_json_tickets
+
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data")
+
+
+def _open(backend: str, data_dir: str):
+    if backend == "jsonl":
+        return TicketLog(os.path.join(data_dir, "ticket_log"))
+    return SQLiteTicketStore(os.path.join(data_dir, "tickets.db"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SupportMax ticket store maintenance")
+    parser.add_argument("command", choices=["stats", "compact", "import-json", "export-json", "migrate-log"])
+    parser.add_argument("--backend", choices=["sqlite", "jsonl"], default="sqlite")
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR)
+    parser.add_argument("--file", help="JSON file for import-json/export-json")
+    args = parser.parse_args()
+
+    if args.command == "compact":
+        args.backend = "jsonl"
+    elif args.command == "migrate-log":
+        args.backend = "sqlite"
+    json_path = args.file or os.path.join(args.data_dir, "tickets.json")
+
+    # The jsonl log assumes a single writer: run this while the API is stopped
+    store = _open(args.backend, args.data_dir)
+    try:
+        if args.command == "stats":
+            print(f"{len(store)} tickets in {args.backend} store at {args.data_dir}")
+        elif args.command == "compact":
+            result = store.compact()
+            print(f"Compacted {result['tickets']} tickets: {result['bytes_before']} -> {result['bytes_after']} bytes")
+        elif args.command == "import-json":
+            print(f"Imported {import_json_tickets(store, json_path)} tickets from {json_path}")
+        elif args.command == "export-json":
+            print(f"Exported {export_json_tickets(store, json_path)} tickets to {json_path}")
+        elif args.command == "migrate-log":
+            log = TicketLog(os.path.join(args.data_dir, "ticket_log"))
+            try:
+                written = store.append_many(log.iter_tickets(), replace=False)
+            finally:
+                log.close()
+            print(f"Migrated {written} tickets from the jsonl log into sqlite")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
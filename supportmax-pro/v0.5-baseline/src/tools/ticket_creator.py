@@ -1,34 +1,26 @@
-from typing import Dict, Optional, List
+from typing import Dict, Iterator, List, Optional, Tuple
 import uuid
-import json
 import os
 from datetime import datetime
+from config.settings import settings
+from tools.ticket_store import iter_query, open_ticket_store
 
 class TicketCreator:
     """
-    Tool for creating and managing support tickets with JSON persistence.
+    Tool for creating and managing support tickets.
+    Storage is pluggable (see tools/ticket_store.py); the legacy
+    data/tickets.json is migrated once when a store is first created.
     """
-    def __init__(self):
-        self.data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data")
+    def __init__(self, data_dir: Optional[str] = None, backend: Optional[str] = None):
+        self.data_dir = data_dir or os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data")
         self.tickets_file = os.path.join(self.data_dir, "tickets.json")
         os.makedirs(self.data_dir, exist_ok=True)
-        
-    def _load_tickets(self) -> List[Dict]:
-        if not os.path.exists(self.tickets_file):
-            return []
-        try:
-            with open(self.tickets_file, 'r') as f:
-                return json.load(f)
-        except:
-            return []
-            
-    def _save_tickets(self, tickets: List[Dict]):
-        with open(self.tickets_file, 'w') as f:
-            json.dump(tickets, f, indent=2)
+
+        self.store = open_ticket_store(self.data_dir, backend or settings.TICKET_STORE_BACKEND)
 
     def create_ticket(self, subject: str, description: str, priority: str = "Normal", email: Optional[str] = None) -> Dict:
         """
-        Creates a new support ticket and saves it to JSON.
+        Creates a new support ticket and writes it to the ticket store.
         """
         ticket_id = str(uuid.uuid4())[:8]
         ticket = {
@@ -41,10 +33,8 @@ class TicketCreator:
             "contact_email": email
         }
         
-        # Save to JSON
-        tickets = self._load_tickets()
-        tickets.append(ticket)
-        self._save_tickets(tickets)
+        # Single-record write instead of rewriting the whole history
+        self.store.append(ticket)
         
         print(f"Ticket created: {ticket}")
         
@@ -58,8 +48,18 @@ class TicketCreator:
         """
         Retrieves a ticket by ID.
         """
-        tickets = self._load_tickets()
-        for ticket in tickets:
-            if ticket["id"] == ticket_id:
-                return ticket
-        return None
\ No newline at end of file
+        return self.store.get(ticket_id)
+
+
+    def query_tickets(self, cursor: Optional[str] = None, limit: int = 50, **filters) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Lists tickets matching status/priority/contact_email/created_from/created_to,
+        one keyset page at a time. Returns (tickets, next_cursor).
+        """
+        return self.store.query(cursor=cursor, limit=limit, **filters)
+
+    def export_tickets(self, **filters) -> Iterator[Dict]:
+        """
+        Streams all matching tickets page by page.
+        """
+        return iter_query(self.store, **filters)
@@ -0,0 +1,245 @@
+"""
+Append-only, segmented JSONL ticket log.
+
+Every ticket write appends one JSON line to the active segment file and
+records its (segment, byte offset) in an in-memory index, so creation is
+O(1) and lookups seek straight to the record instead of re-parsing the
+whole history. The index is rebuilt by scanning the segments on startup.
+
+Crash safety: existing bytes are never rewritten. A torn final line left by
+a crash mid-append is truncated during recovery, and compaction writes new
+segments before deleting the old ones (the later copy of a record wins).
+
+Offline compaction (from src/):
+    python -m tools.ticket_admin compact
+"""
+import atexit
+import json
+import os
+import re
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+SEGMENT_PATTERN = re.compile(r"^segment-(\d{6})\.jsonl$")
+
+
+class TicketLog:
+    """
+    Thread-safe append-only ticket store with an id -> (segment, offset) index.
+    Re-appending a ticket with an existing id supersedes the older record.
+    """
+    def __init__(
+        self,
+        log_dir: str,
+        max_segment_bytes: int = 64 * 1024 * 1024,
+        fsync_every: int = 32,
+        fsync_interval: float = 1.0
+    ):
+        self.log_dir = log_dir
+        self.max_segment_bytes = max_segment_bytes
+        # Writes are flushed to the OS immediately (they survive a process
+        # crash); fsync to disk is batched by count or elapsed time.
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+
+        os.makedirs(log_dir, exist_ok=True)
+        self._lock = threading.RLock()
+        self._index: Dict[str, Tuple[int, int]] = {}
+        self._readers: Dict[int, object] = {}
+        self._segments: List[int] = self._list_segments()
+        if not self._segments:
+            self._segments = [1]
+        self._recover()
+
+        self._writer = open(self._segment_path(self._segments[-1]), "ab")
+        self._pending_fsync = 0
+        self._last_fsync = time.monotonic()
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.log_dir, f"segment-{segment:06d}.jsonl")
+
+    def _list_segments(self) -> List[int]:
+        segments = []
+        for name in os.listdir(self.log_dir):
+            match = SEGMENT_PATTERN.match(name)
+            if match:
+                segments.append(int(match.group(1)))
+        return sorted(segments)
+
+    def _recover(self):
+        """Rebuilds the index and truncates a torn tail on the active segment."""
+        for segment in self._segments:
+            path = self._segment_path(segment)
+            if not os.path.exists(path):
+                continue
+            offset = 0
+            valid_end = 0
+            with open(path, "rb") as f:
+                for line in f:
+                    try:
+                        if not line.endswith(b"\n"):
+                            raise ValueError("incomplete record")
+                        record = json.loads(line)
+                    except ValueError:
+                        print(f"Warning: discarding corrupt ticket record in {path} at offset {offset}")
+                        break
+                    self._index[record["id"]] = (segment, offset)
+                    offset += len(line)
+                    valid_end = offset
+            if valid_end < os.path.getsize(path) and segment == self._segments[-1]:
+                with open(path, "r+b") as f:
+                    f.truncate(valid_end)
+
+    def _maybe_fsync(self):
+        self._pending_fsync += 1
+        if (self._pending_fsync >= self.fsync_every
+                or time.monotonic() - self._last_fsync >= self.fsync_interval):
+            self.sync()
+
+    def _roll_segment(self):
+        self.sync()
+        self._writer.close()
+        self._segments.append(self._segments[-1] + 1)
+        self._writer = open(self._segment_path(self._segments[-1]), "ab")
+
+    def append(self, ticket: Dict) -> None:
+        """Appends a ticket record and indexes it by id."""
+        line = json.dumps(ticket, separators=(",", ":")).encode("utf-8") + b"\n"
+        with self._lock:
+            if self._writer.tell() and self._writer.tell() + len(line) > self.max_segment_bytes:
+                self._roll_segment()
+            offset = self._writer.tell()
+            self._writer.write(line)
+            self._writer.flush()
+            self._index[ticket["id"]] = (self._segments[-1], offset)
+            self._maybe_fsync()
+
+    def sync(self) -> None:
+        """Forces buffered appends to disk."""
+        with self._lock:
+            os.fsync(self._writer.fileno())
+            self._pending_fsync = 0
+            self._last_fsync = time.monotonic()
+
+    def _read_at(self, segment: int, offset: int) -> Dict:
+        reader = self._readers.get(segment)
+        if reader is None:
+            reader = open(self._segment_path(segment), "rb")
+            self._readers[segment] = reader
+        reader.seek(offset)
+        return json.loads(reader.readline())
+
+    def get(self, ticket_id: str) -> Optional[Dict]:
+        """Looks up the latest record for a ticket id via the offset index."""
+        with self._lock:
+            location = self._index.get(ticket_id)
+            if location is None:
+                return None
+            return self._read_at(*location)
+
+    def iter_tickets(self) -> Iterator[Dict]:
+        """Yields the latest version of every ticket in write order."""
+        with self._lock:
+            locations = sorted(self._index.values())
+        for segment, offset in locations:
+            with self._lock:
+                yield self._read_at(segment, offset)
+
+    def query(
+        self,
+        status: Optional[str] = None,
+        priority: Optional[str] = None,
+        contact_email: Optional[str] = None,
+        created_from: Optional[str] = None,
+        created_to: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: int = 50
+    ) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Same contract as SQLiteTicketStore.query. The log has no secondary
+        indexes, so this scans every ticket; use the sqlite backend for dashboards.
+        """
+        from tools.ticket_store import QUERY_FILTERS, decode_cursor, encode_cursor, matches_filters
+
+        filters = dict(zip(QUERY_FILTERS, (status, priority, contact_email)))
+        after = decode_cursor(cursor) if cursor is not None else None
+        matches = sorted(
+            (
+                ticket for ticket in self.iter_tickets()
+                if matches_filters(ticket, filters, created_from, created_to)
+                and (after is None or (ticket.get("created_at") or "", ticket["id"]) > after)
+            ),
+            key=lambda ticket: (ticket.get("created_at") or "", ticket["id"])
+        )
+        page = matches[:limit]
+        next_cursor = encode_cursor(page[-1]) if len(matches) > limit else None
+        return page, next_cursor
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, ticket_id: str) -> bool:
+        return ticket_id in self._index
+
+    def compact(self) -> Dict[str, int]:
+        """
+        Rewrites live records into fresh segments, dropping superseded ones.
+        New segments are fully written and fsynced before old ones are removed,
+        so a crash at any point leaves a readable log.
+        """
+        with self._lock:
+            self.sync()
+            self._writer.close()
+            old_segments = list(self._segments)
+            old_bytes = sum(os.path.getsize(self._segment_path(s)) for s in old_segments)
+            locations = sorted(self._index.values())
+
+            # Stream live records from the old segments into new ones
+            self._segments = [old_segments[-1] + 1]
+            self._index = {}
+            self._writer = open(self._segment_path(self._segments[-1]), "ab")
+            for segment, offset in locations:
+                self.append(self._read_at(segment, offset))
+            self.sync()
+
+            for segment in old_segments:
+                reader = self._readers.pop(segment, None)
+                if reader is not None:
+                    reader.close()
+                os.remove(self._segment_path(segment))
+
+            new_bytes = sum(os.path.getsize(self._segment_path(s)) for s in self._segments)
+            return {"tickets": len(locations), "bytes_before": old_bytes, "bytes_after": new_bytes}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._writer.closed:
+                return
+            self.sync()
+            self._writer.close()
+            for reader in self._readers.values():
+                reader.close()
+            self._readers.clear()
+
+
+_logs: Dict[str, TicketLog] = {}
+_logs_lock = threading.Lock()
+
+
+def get_ticket_log(log_dir: str) -> TicketLog:
+    """Returns the process-wide TicketLog for a directory (one writer per log)."""
+    key = os.path.abspath(log_dir)
+    with _logs_lock:
+        log = _logs.get(key)
+        if log is None:
+            log = TicketLog(key)
+            _logs[key] = log
+        return log
+
+
+@atexit.register
+def _close_logs():
+    for log in _logs.values():
+        log.close()
+
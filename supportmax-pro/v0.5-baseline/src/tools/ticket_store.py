@@ -0,0 +1,301 @@
+"""
+Pluggable ticket storage backends.
+
+- "sqlite": SQLite in WAL mode. Safe for several uvicorn workers writing at
+  once (each write is its own IMMEDIATE transaction) with secondary indexes
+  for status/priority/email/date lookups.
+- "jsonl": the single-process append-only log from tools/ticket_log.py.
+
+Both expose the same interface (append/get/iter_tickets/query/__len__/
+__contains__/sync/close). The legacy tickets.json format stays available through
+import_json_tickets/export_json_tickets.
+"""
+import base64
+import json
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from tools.ticket_log import get_ticket_log
+
+TICKET_COLUMNS = ("id", "subject", "description", "priority", "status", "created_at", "contact_email")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tickets (
+    id TEXT PRIMARY KEY,
+    subject TEXT,
+    description TEXT,
+    priority TEXT,
+    status TEXT,
+    created_at TEXT,
+    contact_email TEXT,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_tickets_status_page ON tickets(status, COALESCE(created_at, ''), id);
+CREATE INDEX IF NOT EXISTS idx_tickets_priority_page ON tickets(priority, COALESCE(created_at, ''), id);
+CREATE INDEX IF NOT EXISTS idx_tickets_contact_email_page ON tickets(contact_email, COALESCE(created_at, ''), id);
+CREATE INDEX IF NOT EXISTS idx_tickets_created_page ON tickets(COALESCE(created_at, ''), id);
+"""
+# PRAGMA user_version of the schema above. Version 0 databases (written before
+# pagination) carry single-column indexes that the page queries can't use.
+SCHEMA_VERSION = 2
+_LEGACY_INDEXES = ("idx_tickets_status", "idx_tickets_priority", "idx_tickets_contact_email", "idx_tickets_created_at")
+
+# Sort key of the listing: legacy tickets without created_at sort first, as in
+# the cursor and in the Python backends. The expression matches the indexes.
+_CREATED = "COALESCE(created_at, '')"
+
+# Filterable columns accepted by query(); the indexes above are composite on
+# (column, created, id) so each filter + keyset page is a single index range scan.
+QUERY_FILTERS = ("status", "priority", "contact_email")
+
+
+def encode_cursor(ticket: Dict) -> str:
+    """Opaque keyset cursor: the (created_at, id) of the last ticket on a page."""
+    raw = json.dumps([ticket.get("created_at") or "", ticket["id"]]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        created_at, ticket_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return created_at, ticket_id
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def matches_filters(ticket: Dict, filters: Dict[str, Optional[str]], created_from: Optional[str], created_to: Optional[str]) -> bool:
+    """Python equivalent of the SQL filter, used by backends without indexes."""
+    for column, value in filters.items():
+        if value is not None and ticket.get(column) != value:
+            return False
+    created_at = ticket.get("created_at") or ""
+    if created_from is not None and created_at < created_from:
+        return False
+    if created_to is not None and created_at >= created_to:
+        return False
+    return True
+
+
+class SQLiteTicketStore:
+    """
+    SQLite (WAL) ticket store. Each thread gets its own pooled connection;
+    readers never block the writer and writers serialize across processes
+    through SQLite's file lock (waiting up to `busy_timeout` seconds).
+    """
+    def __init__(self, db_path: str, busy_timeout: float = 5.0):
+        self.db_path = db_path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        self._migrate(conn)
+
+    @staticmethod
+    def _migrate(conn: sqlite3.Connection):
+        """Brings the schema and its indexes to SCHEMA_VERSION."""
+        if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for index in _LEGACY_INDEXES:
+                conn.execute(f"DROP INDEX IF EXISTS {index}")
+            for statement in _SCHEMA.split(";"):
+                if statement.strip():
+                    conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # isolation_level=None: transactions are managed explicitly below
+            conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    @staticmethod
+    def _to_row(ticket: Dict) -> tuple:
+        extra = {k: v for k, v in ticket.items() if k not in TICKET_COLUMNS}
+        return tuple(ticket.get(column) for column in TICKET_COLUMNS) + (json.dumps(extra) if extra else None,)
+
+    @staticmethod
+    def _from_row(row: sqlite3.Row) -> Dict:
+        ticket = {column: row[column] for column in TICKET_COLUMNS}
+        if row["extra"]:
+            ticket.update(json.loads(row["extra"]))
+        return ticket
+
+    def append(self, ticket: Dict) -> None:
+        """Inserts a ticket, replacing any existing record with the same id."""
+        self.append_many([ticket])
+
+    def append_many(self, tickets: Iterable[Dict], replace: bool = True) -> int:
+        """Writes several tickets in a single transaction. Returns rows written."""
+        verb = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
+        placeholders = ", ".join("?" * (len(TICKET_COLUMNS) + 1))
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = conn.executemany(
+                f"{verb} INTO tickets ({', '.join(TICKET_COLUMNS)}, extra) VALUES ({placeholders})",
+                (self._to_row(ticket) for ticket in tickets)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return cursor.rowcount
+
+    def get(self, ticket_id: str) -> Optional[Dict]:
+        row = self._connection().execute("SELECT * FROM tickets WHERE id = ?", (ticket_id,)).fetchone()
+        return self._from_row(row) if row else None
+
+    def iter_tickets(self) -> Iterator[Dict]:
+        """Yields all tickets in creation order without materializing them."""
+        cursor = self._connection().execute(f"SELECT * FROM tickets ORDER BY {_CREATED}, id")
+        for row in cursor:
+            yield self._from_row(row)
+
+    def query(
+        self,
+        status: Optional[str] = None,
+        priority: Optional[str] = None,
+        contact_email: Optional[str] = None,
+        created_from: Optional[str] = None,
+        created_to: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: int = 50
+    ) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Filtered, keyset-paginated ticket listing ordered by (created_at, id).
+        `created_from` is inclusive and `created_to` exclusive (ISO 8601 strings).
+        Returns the page and the cursor for the next page (None on the last page).
+        """
+        clauses, params = [], []
+        for column, value in zip(QUERY_FILTERS, (status, priority, contact_email)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if created_from is not None:
+            clauses.append(f"{_CREATED} >= ?")
+            params.append(created_from)
+        if created_to is not None:
+            clauses.append(f"{_CREATED} < ?")
+            params.append(created_to)
+        if cursor is not None:
+            clauses.append(f"({_CREATED}, id) > (?, ?)")
+            params.extend(decode_cursor(cursor))
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._connection().execute(
+            f"SELECT * FROM tickets {where} ORDER BY {_CREATED}, id LIMIT ?",
+            params + [limit + 1]
+        ).fetchall()
+
+        tickets = [self._from_row(row) for row in rows[:limit]]
+        next_cursor = encode_cursor(tickets[-1]) if len(rows) > limit else None
+        return tickets, next_cursor
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM tickets").fetchone()[0]
+
+    def __contains__(self, ticket_id: str) -> bool:
+        return self._connection().execute("SELECT 1 FROM tickets WHERE id = ?", (ticket_id,)).fetchone() is not None
+
+    def sync(self) -> None:
+        """Commits are durable once they return; nothing is buffered."""
+
+    def close(self) -> None:
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+
+def iter_query(store, page_size: int = 500, **filters) -> Iterator[Dict]:
+    """
+    Streams every ticket matching `filters` page by page, so exports never
+    hold more than `page_size` tickets in memory.
+    """
+    cursor = None
+    while True:
+        tickets, cursor = store.query(cursor=cursor, limit=page_size, **filters)
+        yield from tickets
+        if cursor is None:
+            return
+
+
+def import_json_tickets(store, json_path: str) -> int:
+    """
+    Imports a legacy tickets.json array into a store. Tickets whose id is
+    already present are skipped, so re-running the import is harmless.
+    """
+    if not os.path.exists(json_path):
+        return 0
+    with open(json_path, "r") as f:
+        tickets = json.load(f)
+    if isinstance(store, SQLiteTicketStore):
+        return store.append_many(tickets, replace=False)
+    imported = 0
+    for ticket in tickets:
+        if ticket.get("id") not in store:
+            store.append(ticket)
+            imported += 1
+    store.sync()
+    return imported
+
+
+def export_json_tickets(store, json_path: str) -> int:
+    """Writes every ticket to a tickets.json-style array. Returns the count."""
+    count = 0
+    tmp_path = json_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write("[")
+        for ticket in store.iter_tickets():
+            f.write(",\n  " if count else "\n  ")
+            json.dump(ticket, f)
+            count += 1
+        f.write("\n]\n" if count else "]\n")
+    os.replace(tmp_path, json_path)
+    return count
+
+
+_stores: Dict[str, SQLiteTicketStore] = {}
+_stores_lock = threading.Lock()
+
+
+def open_ticket_store(data_dir: str, backend: str = "sqlite"):
+    """
+    Returns the process-wide ticket store for `data_dir`. When the store is
+    created for the first time, the legacy tickets.json is migrated into it.
+    """
+    if backend == "jsonl":
+        log_dir = os.path.join(data_dir, "ticket_log")
+        is_new = not os.path.exists(log_dir)
+        store = get_ticket_log(log_dir)
+    elif backend == "sqlite":
+        db_path = os.path.abspath(os.path.join(data_dir, "tickets.db"))
+        with _stores_lock:
+            store = _stores.get(db_path)
+            is_new = store is None and not os.path.exists(db_path)
+            if store is None:
+                store = SQLiteTicketStore(db_path)
+                _stores[db_path] = store
+    else:
+        raise ValueError(f"Unknown ticket store backend: {backend}")
+
+    if is_new:
+        import_json_tickets(store, os.path.join(data_dir, "tickets.json"))
+    return store
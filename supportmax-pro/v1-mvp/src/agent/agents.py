@@ -1,16 +1,12 @@
 from crewai import Agent
-from langchain_openai import ChatOpenAI
-from config.settings import settings
+from agent.llm import build_llm
 from tools.rag_tool import RAGTool
 from tools.ticket_creator import TicketTools
 
 class SupportAgents:
     def __init__(self):
-        self.llm = ChatOpenAI(
-            model=settings.OPENAI_MODEL,
-            api_key=settings.OPENAI_API_KEY,
-            temperature=0
-        )
+        # Per-crew wrapper over the LLM gateway (pooled clients, retries, failover)
+        self.llm = build_llm()
 
     def support_specialist(self):
         return Agent(
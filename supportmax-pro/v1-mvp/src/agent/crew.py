@@ -1,8 +1,16 @@
 from crewai import Crew, Process
+from typing import Optional
 from agent.agents import SupportAgents
+from agent.crew_pool import reset_run_state
+from agent.events import forward_step, relay_events
+from agent.run_trace import RunTrace, active_trace
 from agent.tasks import SupportTasks
 
 class SupportCrew:
+    """
+    Agents and the Crew are built once and reused; each run only binds its
+    task. Not safe for concurrent runs: borrow instances from a CrewPool.
+    """
     def __init__(self):
         agents = SupportAgents()
         self.support_specialist = agents.support_specialist()
@@ -10,18 +18,30 @@ class SupportCrew:
         
         self.tasks = SupportTasks()
 
-    def run(self, message: str):
-        # Define the primary task
-        triage_task = self.tasks.triage_and_resolve(self.support_specialist, message)
-
-        # Create the crew
-        crew = Crew(
+        # Create the crew (tasks are bound per run)
+        self.crew = Crew(
             agents=[self.support_specialist, self.technical_expert],
-            tasks=[triage_task],
+            tasks=[],
             verbose=2,
+            step_callback=forward_step, # Live step events for /chat/stream
             process=Process.hierarchical, # Enable delegation
             manager_llm=self.support_specialist.llm # Required for hierarchical process
         )
 
-        result = crew.kickoff()
+    def bind(self, message: str):
+        """Attaches the per-request task to the pre-built crew."""
+        reset_run_state(self.crew)
+        # Define the primary task
+        triage_task = self.tasks.triage_and_resolve(self.support_specialist, message)
+        self.crew.tasks = [triage_task]
+
+    def run(self, message: str, on_event=None, trace: Optional[RunTrace] = None):
+        """
+        Runs the crew on `message`. `on_event(event, data)`, if given, receives
+        live step/tool/token events (see agent/events.py) while it runs.
+        What the tools did (e.g. tickets created) is recorded in `trace`.
+        """
+        self.bind(message)
+        with active_trace(trace or RunTrace()), relay_events(on_event):
+            result = self.crew.kickoff()
         return result
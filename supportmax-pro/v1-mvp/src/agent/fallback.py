@@ -0,0 +1,40 @@
+"""
+Answers for requests whose crew run missed its deadline.
+
+The best answer still available, in order: a ticket the crew already
+created, the knowledge base passages it already found, a keyword-only
+knowledge base match (BM25, no embedding call), else an offer to open a
+ticket. Tools leave what they did on the Deadline (see agent/deadline.py).
+"""
+from typing import Any, Dict
+from agent.deadline import Deadline
+from knowledge.vector_store import get_vector_store
+
+
+def fallback_answer(message: str, deadline: Deadline, stage: str) -> Dict[str, Any]:
+    """{"text", "action_taken", "metadata"} of the degraded answer to `message`."""
+    metadata = {"degraded": True, "timed_out_stage": stage}
+    results = list(reversed(deadline.results))
+    for tool, output in results:
+        if tool == "create_ticket":
+            return {"text": output, "action_taken": "create_ticket", "metadata": metadata}
+    for tool, output in results:
+        if tool == "search_knowledge":
+            return {"text": output, "action_taken": "answer_rag", "metadata": metadata}
+
+    try:
+        passages = get_vector_store().keyword_search(message, n_results=1)
+    except Exception as e:
+        print(f"Warning: keyword fallback search failed: {e}")
+        passages = []
+    if passages:
+        return {
+            "text": f"Here is what our documentation says:\n{passages[0]}",
+            "action_taken": "answer_rag",
+            "metadata": dict(metadata, source="knowledge_base")
+        }
+    return {
+        "text": "Sorry, this is taking longer than expected. Would you like me to create a support ticket so our team can follow up?",
+        "action_taken": "general_response",
+        "metadata": metadata
+    }
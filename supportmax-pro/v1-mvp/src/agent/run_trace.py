@@ -0,0 +1,37 @@
+"""
+What the tools of one crew run actually did.
+
+The crew's final answer is free text: it may say "I've opened ticket ..."
+or anything else, so side effects are read from here instead. Tools report
+into the RunTrace made active for the run, found through a context variable
+like the event relay (see events.py).
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional
+
+
+class RunTrace:
+    """Side effects of one crew run."""
+    def __init__(self):
+        self.ticket_ids: List[str] = []
+
+    def record_ticket(self, ticket_id: str):
+        self.ticket_ids.append(ticket_id)
+
+
+_current_trace: ContextVar[Optional[RunTrace]] = ContextVar("run_trace", default=None)
+
+
+@contextmanager
+def active_trace(trace: RunTrace) -> Iterator[RunTrace]:
+    """Makes `trace` visible to tools run by the crew in the current thread."""
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+def current_trace() -> Optional[RunTrace]:
+    return _current_trace.get()
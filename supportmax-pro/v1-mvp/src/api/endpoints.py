@@ -5,14 +5,30 @@ import os
 # This must happen BEFORE importing from agent or config
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import Dict, Any, Optional
 from agent.crew import SupportCrew
+from agent.crew_pool import CrewPool
+from agent.deadline import Deadline, DeadlineExceeded, deadline_scope, run_stage
+from agent.fallback import fallback_answer
+from agent.llm import close_openai_clients
+from agent.llm_gateway import close_llm_gateways, llm_gateway_stats
+from agent.run_trace import RunTrace
+from config.constraints import FALLBACK_RESERVE_SECONDS
 from config.settings import settings
 from api.middleware import SLAMonitorMiddleware, PIIRedactionMiddleware
+from api.executor import CrewExecutor, ExecutorSaturated
+from api.streaming import EventChannel, format_sse
+from api.response_cache import ResponseCache
+from api.singleflight import SingleFlight, flight_key
+from knowledge.vector_store import read_kb_version, vector_store_stats
+from knowledge.embeddings import close_embedder, get_embedder
 import uvicorn
 import logging
+import time
 
 # Configure logging
 log_dir = "../../../logs"
@@ -39,6 +55,21 @@ app = FastAPI(
 app.add_middleware(SLAMonitorMiddleware)
 app.add_middleware(PIIRedactionMiddleware)
 
+# Dedicated pool for blocking crew runs, with admission control
+crew_executor = CrewExecutor(max_workers=settings.CREW_MAX_WORKERS, max_queue=settings.CREW_MAX_QUEUE)
+# Pre-built crews reused across requests, one per worker
+crew_pool = CrewPool(SupportCrew, size=settings.CREW_MAX_WORKERS)
+# Repeated questions are answered from cache instead of re-running the crew
+response_cache = ResponseCache(
+    embed_fn=get_embedder().embed if settings.OPENAI_API_KEY or settings.EMBEDDING_PROVIDER == "local" else None,
+    similarity_threshold=settings.RESPONSE_CACHE_SIMILARITY,
+    max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.RESPONSE_CACHE_TTL_SECONDS,
+    version_fn=read_kb_version
+) if settings.RESPONSE_CACHE_ENABLED else None
+# Concurrent identical questions share one crew run
+singleflight = SingleFlight()
+
 class ChatRequest(BaseModel):
     message: str
     user_id: Optional[str] = None
@@ -52,29 +83,187 @@ class ChatResponse(BaseModel):
 async def health_check():
     return {"status": "healthy", "version": "v1.0"}
 
-@app.post(f"{settings.API_V1_STR}/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+@app.get(f"{settings.API_V1_STR}/metrics")
+async def metrics():
+    return {
+        "crew_executor": crew_executor.stats(),
+        "crew_pool": crew_pool.stats(),
+        "response_cache": response_cache.stats() if response_cache else None,
+        "singleflight": singleflight.stats(),
+        "embeddings": get_embedder().stats(),
+        "llm_gateway": llm_gateway_stats(),
+        "retrieval": vector_store_stats()
+    }
+
+@app.on_event("startup")
+def warm_crews():
+    # Build the pooled crews before the first request rather than during it
     try:
-        crew = SupportCrew()
-        result = crew.run(request.message)
+        crew_pool.warm()
+    except Exception as e:
+        logger.warning(f"Could not pre-build crews, they will be built on first use: {e}")
+
+@app.on_event("shutdown")
+def shutdown_executor():
+    crew_executor.shutdown()
+    close_embedder()
+    close_llm_gateways()
+    close_openai_clients()
+
+def run_pooled_crew(message: str, on_event=None, trace: Optional[RunTrace] = None):
+    with crew_pool.checkout() as crew:
+        return crew.run(message, on_event=on_event, trace=trace)
+
+def run_crew(message: str, on_event=None, trace: Optional[RunTrace] = None, deadline: Optional[Deadline] = None):
+    """
+    Runs a pooled crew within `deadline` (see agent/deadline.py), keeping
+    FALLBACK_RESERVE_SECONDS for the fallback. Raises DeadlineExceeded when
+    the crew can't finish in time.
+    """
+    with deadline_scope(deadline):
+        return run_stage("crew", run_pooled_crew, message, on_event, trace, reserve=FALLBACK_RESERVE_SECONDS)
+
+def build_response(result, trace: RunTrace) -> ChatResponse:
+    # Tickets come from what the tool did: the answer may word them any way
+    action_taken = "general_response"
+    result_str = str(result)
+    
+    if trace.ticket_ids or "Ticket created" in result_str:
+        action_taken = "create_ticket"
+    elif "Found relevant information" in result_str or "knowledge base" in result_str.lower():
+        action_taken = "answer_rag"
         
-        # Heuristic to determine action taken for UI
-        action_taken = "general_response"
-        result_str = str(result)
+    return ChatResponse(
+        response=result_str,
+        action_taken=action_taken,
+        metadata={"engine": "crewai-v1-hierarchical", "ticket_ids": list(trace.ticket_ids)}
+    )
+
+def fallback_response(message: str, deadline: Deadline, stage: str, trace: RunTrace) -> ChatResponse:
+    """Degraded answer for a request whose crew run missed the deadline."""
+    logger.warning(f"Deadline exceeded during {stage}, answered with a fallback")
+    answer = fallback_answer(message, deadline, stage)
+    return ChatResponse(
+        response=answer["text"],
+        action_taken=answer["action_taken"],
+        metadata=dict(answer["metadata"], engine="fallback", ticket_ids=list(trace.ticket_ids))
+    )
+
+def created_ticket(response: ChatResponse) -> bool:
+    """True when the run behind `response` created a ticket (a side effect for its requester only)."""
+    return bool(response.metadata.get("ticket_ids")) or response.action_taken == "create_ticket"
+
+def cached_response(message: str) -> Optional[ChatResponse]:
+    if response_cache is None:
+        return None
+    cached = response_cache.get(message)
+    return ChatResponse(**cached) if cached else None
+
+def cache_response(message: str, response: ChatResponse, compute_seconds: float):
+    # Ticket creation is a side effect and must happen on every request;
+    # degraded answers are only good enough for this once
+    if response_cache is None or created_ticket(response) or response.metadata.get("degraded"):
+        return
+    response_cache.put(message, response.model_dump(), compute_seconds)
+
+async def answer(message: str, deadline: Optional[Deadline] = None) -> ChatResponse:
+    # The crew blocks on LLM calls: run it on the worker pool, not the event loop
+    started = time.monotonic()
+    trace = RunTrace()
+    try:
+        result = await crew_executor.run(run_crew, message, trace=trace, deadline=deadline)
+    except DeadlineExceeded as e:
+        return await run_in_threadpool(fallback_response, message, deadline, e.stage, trace)
+    response = build_response(result, trace)
+    await run_in_threadpool(cache_response, message, response, time.monotonic() - started)
+    return response
+
+def saturated_error(e: ExecutorSaturated) -> HTTPException:
+    logger.warning(str(e))
+    return HTTPException(
+        status_code=503,
+        detail="All agents are busy. Please retry shortly.",
+        headers={"Retry-After": str(e.retry_after)}
+    )
+
+@app.post(f"{settings.API_V1_STR}/chat", response_model=ChatResponse)
+async def chat(request: ChatRequest, http_request: Request):
+    # Started on arrival by SLAMonitorMiddleware, so queueing counts against it
+    deadline = getattr(http_request.state, "deadline", None)
+    try:
+        # Lookups may call the embedding API: keep them off the event loop
+        cached = await run_in_threadpool(cached_response, request.message)
+        if cached:
+            return cached
         
-        if "Ticket created" in result_str:
-            action_taken = "create_ticket"
-        elif "Found relevant information" in result_str or "knowledge base" in result_str.lower():
-            action_taken = "answer_rag"
-            
-        return ChatResponse(
-            response=result_str,
-            action_taken=action_taken,
-            metadata={"engine": "crewai-v1-hierarchical"}
-        )
+        # Identical questions already in flight share one crew run
+        response, coalesced = await singleflight.do(flight_key(request.message), lambda: answer(request.message, deadline))
+        if not coalesced:
+            return response
+        if created_ticket(response):
+            # Every request gets its own ticket
+            return await answer(request.message, deadline)
+        response = response.model_copy(deep=True)
+        response.metadata["coalesced"] = True
+        return response
             
+    except ExecutorSaturated as e:
+        raise saturated_error(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post(f"{settings.API_V1_STR}/chat/stream")
+async def chat_stream(request: ChatRequest, http_request: Request):
+    """
+    Streaming chat over server-sent events. Emits "start" immediately, then
+    live agent events (step, tool_call, tool_result, answer_start, token) as
+    the crew works, and finally "final" with the same fields as /chat
+    (or "error").
+    """
+    cached = await run_in_threadpool(cached_response, request.message)
+    if cached:
+        async def cached_events():
+            yield format_sse("start", {"status": "accepted"})
+            yield format_sse("final", cached.model_dump())
+        return StreamingResponse(cached_events(), media_type="text/event-stream")
+
+    channel = EventChannel()
+    deadline = getattr(http_request.state, "deadline", None)
+
+    def job():
+        try:
+            started = time.monotonic()
+            trace = RunTrace()
+            try:
+                result = run_crew(request.message, on_event=channel.emit, trace=trace, deadline=deadline)
+            except DeadlineExceeded as e:
+                channel.emit("final", fallback_response(request.message, deadline, e.stage, trace).model_dump())
+                return
+            response = build_response(result, trace)
+            channel.emit("final", response.model_dump())
+            cache_response(request.message, response, time.monotonic() - started)
+        except Exception as e:
+            logger.error(f"Error processing streamed request: {e}")
+            channel.emit("error", {"detail": str(e)})
+        finally:
+            channel.close()
+
+    try:
+        # Admission happens before the response starts, so overload is still a plain 503
+        crew_executor.submit(job)
+    except ExecutorSaturated as e:
+        raise saturated_error(e)
+
+    async def events():
+        yield format_sse("start", {"status": "accepted"})
+        async for chunk in channel.stream():
+            yield chunk
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 if __name__ == "__main__":
     uvicorn.run("api.endpoints:app", host="0.0.0.0", port=8001, reload=True)
@@ -1,16 +1,38 @@
+import asyncio
 import time
 import logging
 import re
 from fastapi import Request
+from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
-from config.constraints import MAX_RESPONSE_TIME_SECONDS
+from agent.deadline import Deadline
+from config.constraints import MAX_RESPONSE_TIME_SECONDS, SLA_GRACE_SECONDS
+from config.settings import settings
 
 logger = logging.getLogger(__name__)
 
 class SLAMonitorMiddleware(BaseHTTPMiddleware):
+    """
+    Starts each request's Deadline of MAX_RESPONSE_TIME_SECONDS on arrival,
+    as `request.state.deadline` (None with DEADLINE_ENFORCED off). Handlers
+    pass it to the crew run, which answers with a fallback in time. As a
+    backstop, a request that has not started responding SLA_GRACE_SECONDS
+    after its deadline is cancelled and answered 504.
+    """
     async def dispatch(self, request: Request, call_next):
         start_time = time.time()
-        response = await call_next(request)
+        deadline = Deadline(MAX_RESPONSE_TIME_SECONDS) if settings.DEADLINE_ENFORCED else None
+        request.state.deadline = deadline
+        if deadline is None:
+            response = await call_next(request)
+        else:
+            try:
+                response = await asyncio.wait_for(call_next(request), timeout=deadline.remaining() + SLA_GRACE_SECONDS)
+            except asyncio.TimeoutError:
+                # Whatever is still running for it stops at its next check
+                deadline.cancel()
+                logger.warning(f"SLA VIOLATION: Request cancelled after {time.time() - start_time:.2f}s")
+                response = JSONResponse(status_code=504, content={"detail": "The request could not be answered in time."})
         process_time = time.time() - start_time
         
         # Log SLA warning if threshold exceeded
@@ -0,0 +1,226 @@
+"""
+Semantic response cache in front of the crew.
+
+Lookups try the normalized message text first (exact key), then embedding
+similarity against every live entry. Entries expire after a TTL, the least
+recently used entry is evicted beyond `max_entries`, and the whole cache is
+dropped whenever the knowledge base version changes (re-ingestion).
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import numpy as np
+
+_NON_WORD = re.compile(r"[^a-z0-9@.\-]+")
+
+EmbedFn = Callable[[List[str]], List[List[float]]]
+
+# Messages whose meaning depends on the conversation so far
+_SESSION_REFERENCE = re.compile(
+    r"\b(my name|who am i|what did i|did i (say|ask|tell)|i (said|told|asked|mentioned)|you (said|told|mentioned|suggested)|"
+    r"earlier|previous(ly)?|last time|before that|remember|as i said|that ticket|my (last|previous) (ticket|question|message))\b",
+    re.IGNORECASE
+)
+# Personal details that must never leak from one user's answer to another
+_PERSONAL_DETAIL = re.compile(r"\S+@\S+\.\w+|\b[A-Z]+-[A-Z0-9]{4,}\b|\b(?i:my name is|i am|i'm|call me)\s+([A-Z][a-z]+)")
+
+
+def normalize_message(text: str) -> str:
+    """Case, punctuation and whitespace-insensitive cache key."""
+    return " ".join(_NON_WORD.sub(" ", text.lower()).split()).strip(" .-")
+
+
+def references_session(message: str) -> bool:
+    """True when a message refers back to the conversation (never served from cache)."""
+    return bool(_SESSION_REFERENCE.search(message))
+
+
+def is_session_dependent(message: str, response_text: str, chat_history: str = "") -> bool:
+    """
+    True when an answer relies on this session rather than the knowledge base:
+    the message refers back to the conversation, or the answer repeats a
+    personal detail (email, ticket id, name) that only the history contains.
+    """
+    if references_session(message):
+        return True
+    for match in _PERSONAL_DETAIL.finditer(chat_history or ""):
+        detail = match.group(1) or match.group(0)
+        if detail in response_text and detail not in message:
+            return True
+    return False
+
+
+class _Entry:
+    __slots__ = ("response", "embedding", "created_at", "compute_seconds")
+
+    def __init__(self, response: Dict[str, Any], embedding: Optional[np.ndarray], compute_seconds: float):
+        self.response = response
+        self.embedding = embedding
+        self.created_at = time.monotonic()
+        self.compute_seconds = compute_seconds
+
+
+class ResponseCache:
+    """
+    Thread-safe response cache keyed by normalized message.
+
+    `embed_fn` maps a batch of texts to vectors; without it (or if it fails)
+    only exact matches are served. `version_fn` returns the current
+    knowledge base version and is polled every `check_interval` seconds.
+    """
+    def __init__(
+        self,
+        embed_fn: Optional[EmbedFn] = None,
+        similarity_threshold: float = 0.92,
+        max_entries: int = 1000,
+        ttl_seconds: float = 3600,
+        version_fn: Optional[Callable[[], str]] = None,
+        check_interval: float = 2.0
+    ):
+        self.embed_fn = embed_fn
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.version_fn = version_fn
+        self.check_interval = check_interval
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        # Stacked unit vectors of entries with embeddings, rebuilt lazily after changes
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_keys: List[str] = []
+        # Embeddings computed by a missed lookup, reused when the answer is stored
+        self._miss_embeddings: "OrderedDict[str, np.ndarray]" = OrderedDict()
+
+        self._version = version_fn() if version_fn else None
+        self._last_check = time.monotonic()
+        self._invalidated_at = float("-inf")
+
+        self._exact_hits = 0
+        self._semantic_hits = 0
+        self._misses = 0
+        self._invalidations = 0
+        self._latency_saved = 0.0
+
+    def _check_version(self):
+        if self.version_fn is None:
+            return
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return
+        self._last_check = now
+        version = self.version_fn()
+        if version != self._version:
+            self._version = version
+            self.invalidate()
+
+    def invalidate(self):
+        """Drops every entry, e.g. after the knowledge base was re-ingested."""
+        with self._lock:
+            self._entries.clear()
+            self._miss_embeddings.clear()
+            self._matrix = None
+            self._invalidations += 1
+            self._invalidated_at = time.monotonic()
+
+    def _embed(self, text: str) -> Optional[np.ndarray]:
+        if self.embed_fn is None:
+            return None
+        try:
+            vector = np.asarray(self.embed_fn([text])[0], dtype=np.float32)
+        except Exception as e:
+            print(f"Warning: response cache embedding failed, exact matching only: {e}")
+            return None
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    def _expire(self, key: str, entry: _Entry) -> bool:
+        if time.monotonic() - entry.created_at <= self.ttl_seconds:
+            return False
+        del self._entries[key]
+        self._matrix = None
+        return True
+
+    def _nearest(self, vector: np.ndarray) -> Tuple[Optional[str], float]:
+        if self._matrix is None:
+            self._matrix_keys = [k for k, e in self._entries.items() if e.embedding is not None]
+            self._matrix = (
+                np.stack([self._entries[k].embedding for k in self._matrix_keys])
+                if self._matrix_keys else np.empty((0, vector.shape[0]), dtype=np.float32)
+            )
+        if not self._matrix_keys:
+            return None, 0.0
+        scores = self._matrix @ vector
+        best = int(np.argmax(scores))
+        return self._matrix_keys[best], float(scores[best])
+
+    def _hit(self, key: str, entry: _Entry, kind: str, similarity: float) -> Dict[str, Any]:
+        self._entries.move_to_end(key)
+        self._latency_saved += entry.compute_seconds
+        if kind == "exact":
+            self._exact_hits += 1
+        else:
+            self._semantic_hits += 1
+        response = dict(entry.response)
+        response["metadata"] = dict(response.get("metadata", {}), cache=kind, cache_similarity=round(similarity, 4))
+        return response
+
+    def get(self, message: str) -> Optional[Dict[str, Any]]:
+        """Returns a cached response (with cache metadata added) or None."""
+        self._check_version()
+        key = normalize_message(message)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not self._expire(key, entry):
+                return self._hit(key, entry, "exact", 1.0)
+
+        # Embed outside the lock: it may be a network call
+        vector = self._embed(key)
+        with self._lock:
+            if vector is not None:
+                nearest, similarity = self._nearest(vector)
+                if nearest is not None and similarity >= self.similarity_threshold:
+                    entry = self._entries[nearest]
+                    if not self._expire(nearest, entry):
+                        return self._hit(nearest, entry, "semantic", similarity)
+                self._miss_embeddings[key] = vector
+                while len(self._miss_embeddings) > 256:
+                    self._miss_embeddings.popitem(last=False)
+            self._misses += 1
+        return None
+
+    def put(self, message: str, response: Dict[str, Any], compute_seconds: float):
+        """Caches a freshly computed response; `compute_seconds` is what a hit saves."""
+        key = normalize_message(message)
+        started_at = time.monotonic() - compute_seconds
+        with self._lock:
+            vector = self._miss_embeddings.pop(key, None)
+        if vector is None:
+            vector = self._embed(key)
+        with self._lock:
+            if started_at < self._invalidated_at:
+                # Computed against the knowledge base that was just replaced
+                return
+            self._entries[key] = _Entry(response, vector, compute_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self._exact_hits + self._semantic_hits
+            lookups = hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "exact_hits": self._exact_hits,
+                "semantic_hits": self._semantic_hits,
+                "misses": self._misses,
+                "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+                "latency_saved_seconds": round(self._latency_saved, 3),
+                "invalidations": self._invalidations,
+                "kb_version": self._version,
+            }
@@ -0,0 +1,72 @@
+"""
+In-flight request coalescing ("singleflight").
+
+When many users ask the same thing at once, only the first request (the
+leader) runs the crew; identical requests arriving while it runs wait for
+the same execution and all receive its result. Waiting followers don't
+take a worker or a queue slot, so a spike of one question costs one crew
+run instead of one per user.
+
+Keys are normalized messages (see response_cache.normalize_message), with
+a session part for messages whose answer depends on the conversation.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from api.response_cache import normalize_message
+
+
+def flight_key(message: str, session: Optional[str] = None) -> str:
+    """Coalescing key: the normalized message, scoped to `session` when given."""
+    key = normalize_message(message)
+    return key if session is None else f"{session}\x00{key}"
+
+
+class SingleFlight:
+    """
+    Shares one execution among concurrent calls with the same key.
+
+    Runs on the event loop only (no locking needed). The shared execution
+    is a task of its own, so it keeps running for the followers if the
+    leader's client goes away.
+    """
+    def __init__(self):
+        self._inflight: Dict[str, "asyncio.Task[Any]"] = {}
+        self._waiters: Dict[str, int] = {}
+        self._leaders = 0
+        self._coalesced = 0
+        self._max_waiters = 0
+
+    def _done(self, key: str, task: "asyncio.Task[Any]"):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+            del self._waiters[key]
+        # Mark the exception as retrieved even if every caller went away
+        if not task.cancelled():
+            task.exception()
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Awaits `fn()` or, if a call with `key` is already in flight, its
+        result. Returns (result, coalesced); exceptions reach every caller.
+        """
+        task = self._inflight.get(key)
+        if task is not None:
+            self._coalesced += 1
+            self._waiters[key] += 1
+            self._max_waiters = max(self._max_waiters, self._waiters[key])
+            return await asyncio.shield(task), True
+
+        task = asyncio.ensure_future(fn())
+        self._inflight[key] = task
+        self._waiters[key] = 0
+        self._leaders += 1
+        task.add_done_callback(lambda t: self._done(key, t))
+        return await asyncio.shield(task), False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._inflight),
+            "leaders": self._leaders,
+            "coalesced": self._coalesced,
+            "max_waiters": self._max_waiters,
+        }
@@ -5,12 +5,19 @@ These constraints are enforced to ensure the agent meets production standards.
 
 # Latency Constraints (in seconds)
 MAX_RESPONSE_TIME_SECONDS = 2.0
+# Time kept back from the crew for answering with a fallback instead
+FALLBACK_RESERVE_SECONDS = 0.2
+# How long past its deadline a request may go before SLAMonitorMiddleware
+# cancels it and answers 504
+SLA_GRACE_SECONDS = 0.5
 
 # Cost Constraints
 MAX_TOKENS_PER_QUERY = 1000
 MAX_DAILY_COST_USD = 5.0
 
 # Reliability Constraints
+# Retries of a failed LLM call, and the longest any one stage (a crew run,
+# an LLM call) may take, even when the request deadline leaves more
 MAX_RETRIES = 3
 TIMEOUT_SECONDS = 5.0
 
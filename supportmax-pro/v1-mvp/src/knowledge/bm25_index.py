@@ -0,0 +1,167 @@
+"""
+Lexical (BM25) index over knowledge base chunks.
+
+Dense embeddings blur exact identifiers: error codes, SKUs and product
+names. This index is kept next to the vector collection by ingestion
+(same chunk ids) and searched alongside it, see VectorStore.hybrid_search.
+"""
+import heapq
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# BM25 tuning parameters (standard Okapi defaults)
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Words, plus codes joined by - _ . / (e.g. ERR-1042, SKU_88.2)
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)*")
+_PART_PATTERN = re.compile(r"[a-z0-9]+")
+
+_STOPWORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "could", "do", "does",
+    "for", "from", "have", "how", "i", "if", "in", "is", "it", "me", "my", "of",
+    "on", "or", "our", "please", "the", "this", "to", "was", "we", "what", "when",
+    "where", "which", "who", "why", "will", "with", "you", "your",
+})
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercases and splits text into index terms, dropping stopwords.
+    Codes like 'err-1042' are kept whole and also indexed by their parts;
+    a trailing plural 's' is stripped from words.
+    """
+    terms = []
+    for token in _TOKEN_PATTERN.findall(text.lower()):
+        parts = _PART_PATTERN.findall(token)
+        if len(parts) > 1:
+            terms.append(token)
+        for part in parts:
+            if part in _STOPWORDS:
+                continue
+            if len(part) > 3 and part.endswith("s") and not part.endswith("ss") and not part.isdigit():
+                part = part[:-1]
+            terms.append(part)
+    return terms
+
+
+class BM25Index:
+    """
+    Incrementally updatable BM25 index keyed by chunk id. Saved to `path`
+    (JSON of per-chunk term frequencies) by `persist()` and re-read when
+    another process (ingestion) rewrites the file.
+    """
+    def __init__(self, path: Optional[str] = None, check_interval: float = 2.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._docs: Dict[str, Dict[str, int]] = {}
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._lengths: Dict[str, int] = {}
+        self._total_length = 0
+        self._dirty = False
+        self._loaded_mtime: Optional[float] = None
+        self._last_check = time.monotonic()
+        self._load()
+
+    def _index(self, doc_id: str, freqs: Dict[str, int]):
+        self._docs[doc_id] = freqs
+        self._lengths[doc_id] = sum(freqs.values())
+        self._total_length += self._lengths[doc_id]
+        for term, freq in freqs.items():
+            self._postings.setdefault(term, {})[doc_id] = freq
+
+    def _unindex(self, doc_id: str):
+        freqs = self._docs.pop(doc_id, None)
+        if freqs is None:
+            return
+        self._total_length -= self._lengths.pop(doc_id)
+        for term in freqs:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+
+    def _load(self):
+        if not self.path:
+            return
+        try:
+            mtime = os.path.getmtime(self.path)
+            with open(self.path, "r") as f:
+                docs = json.load(f)
+        except (OSError, ValueError):
+            return
+        self._docs, self._postings, self._lengths, self._total_length = {}, {}, {}, 0
+        for doc_id, freqs in docs.items():
+            self._index(doc_id, freqs)
+        self._loaded_mtime = mtime
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if not self.path or self._dirty or now - self._last_check < self.check_interval:
+            return
+        self._last_check = now
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime != self._loaded_mtime:
+            with self._lock:
+                self._load()
+
+    def count(self) -> int:
+        return len(self._docs)
+
+    def add(self, ids: Iterable[str], texts: Iterable[str]):
+        """Indexes (or re-indexes) chunks."""
+        with self._lock:
+            for doc_id, text in zip(ids, texts):
+                self._unindex(doc_id)
+                self._index(doc_id, dict(Counter(tokenize(text))))
+            self._dirty = True
+
+    def delete(self, ids: Iterable[str]):
+        with self._lock:
+            for doc_id in ids:
+                self._unindex(doc_id)
+            self._dirty = True
+
+    def search(self, query: str, top_k: int = 10) -> List[Tuple[str, float]]:
+        """(chunk id, BM25 score) of the best `top_k` matches, best first."""
+        self._maybe_reload()
+        query_terms = set(tokenize(query))
+        with self._lock:
+            n_docs = len(self._docs)
+            if not query_terms or not n_docs:
+                return []
+            avg_length = self._total_length / n_docs or 1.0
+            scores: Dict[str, float] = {}
+            for term in query_terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, freq in postings.items():
+                    length_norm = 1 - BM25_B + BM25_B * self._lengths[doc_id] / avg_length
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * freq * (BM25_K1 + 1) / (freq + BM25_K1 * length_norm)
+        return heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+
+    def persist(self):
+        """Writes the index to `path` atomically."""
+        if not self.path:
+            return
+        with self._lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self._docs, f)
+            os.replace(tmp_path, self.path)
+            self._loaded_mtime = os.path.getmtime(self.path)
+            self._dirty = False
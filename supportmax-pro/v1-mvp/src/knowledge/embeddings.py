@@ -0,0 +1,361 @@
+"""
+Embedding providers, cached and micro-batched.
+
+Providers turn texts into vectors: OpenAI over the shared client, or a
+deterministic local hashing provider that needs no network (CI, load tests,
+air-gapped installs, degraded mode). Every RAG lookup used to pay an
+embedding round-trip, even for a query seen a second ago. CachedEmbedder
+keys vectors by a hash of (provider, text) in an in-memory LRU, optionally
+backed by an SQLite file that survives restarts. Misses of remote providers
+go through an EmbeddingBatcher, which waits a few milliseconds so that
+concurrent requests share a single embeddings API call.
+"""
+import hashlib
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+from config.settings import settings
+
+EmbedFn = Callable[[List[str]], List[List[float]]]
+
+
+def content_key(model: str, text: str) -> str:
+    """Cache key: the same text embedded by another model is a different entry."""
+    return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Thread-safe LRU of float32 vectors keyed by content_key, with an
+    optional on-disk SQLite store behind it. Disk hits are promoted to memory.
+    """
+    def __init__(self, max_entries: int = 10000, path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._memory_hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+
+        self._db: Optional[sqlite3.Connection] = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            # One connection shared under self._lock
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+            self._db.commit()
+
+    def _remember(self, key: str, vector: np.ndarray):
+        self._entries[key] = vector
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        found: Dict[str, np.ndarray] = {}
+        with self._lock:
+            for key in keys:
+                vector = self._entries.get(key)
+                if vector is not None:
+                    self._entries.move_to_end(key)
+                    found[key] = vector
+            self._memory_hits += len(found)
+
+            missing = [key for key in dict.fromkeys(keys) if key not in found]
+            if missing and self._db is not None:
+                placeholders = ",".join("?" * len(missing))
+                rows = self._db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", missing
+                ).fetchall()
+                for key, blob in rows:
+                    vector = np.frombuffer(blob, dtype=np.float32)
+                    found[key] = vector
+                    self._remember(key, vector)
+                self._disk_hits += len(rows)
+            self._misses += len([key for key in missing if key not in found])
+        return found
+
+    def put_many(self, items: Dict[str, np.ndarray]):
+        with self._lock:
+            for key, vector in items.items():
+                self._remember(key, vector)
+            if self._db is not None and items:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    [(key, vector.tobytes()) for key, vector in items.items()]
+                )
+                self._db.commit()
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            lookups = self._memory_hits + self._disk_hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "disk": self.path,
+                "memory_hits": self._memory_hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+                "hit_ratio": round((lookups - self._misses) / lookups, 4) if lookups else 0.0,
+            }
+
+
+class EmbeddingBatcher:
+    """
+    Coalesces concurrent embed requests. The first request opens a window of
+    `window_seconds`; everything queued until it closes (or until
+    `max_batch` texts are waiting) is embedded together, duplicates once.
+    """
+    def __init__(self, embed_fn: EmbedFn, window_seconds: float = 0.005, max_batch: int = 128):
+        self.embed_fn = embed_fn
+        self.window_seconds = window_seconds
+        self.max_batch = max_batch
+        self._queue: "queue.Queue[Optional[Tuple[List[str], Future]]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._requests = 0
+        self._calls = 0
+        self._texts = 0
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                    self._thread.start()
+
+    def embed(self, texts: List[str]) -> List[np.ndarray]:
+        """Blocks until the batch containing `texts` has been embedded."""
+        if not texts:
+            return []
+        self._ensure_started()
+        future: Future = Future()
+        self._queue.put((texts, future))
+        return future.result()
+
+    def _collect(self, first: Tuple[List[str], Future]) -> Tuple[List[Tuple[List[str], Future]], bool]:
+        batch = [first]
+        pending = len(first[0])
+        deadline = time.monotonic() + self.window_seconds
+        while pending < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+            pending += len(item[0])
+        return batch, False
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch, stop = self._collect(first)
+            unique = list(dict.fromkeys(text for texts, _ in batch for text in texts))
+            try:
+                vectors: Dict[str, np.ndarray] = {}
+                for start in range(0, len(unique), self.max_batch):
+                    chunk = unique[start:start + self.max_batch]
+                    for text, vector in zip(chunk, self.embed_fn(chunk)):
+                        vectors[text] = np.asarray(vector, dtype=np.float32)
+                    with self._stats_lock:
+                        self._calls += 1
+                with self._stats_lock:
+                    self._requests += len(batch)
+                    self._texts += len(unique)
+                for texts, future in batch:
+                    future.set_result([vectors[text] for text in texts])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+            if stop:
+                return
+
+    def close(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+
+    def stats(self) -> Dict[str, object]:
+        with self._stats_lock:
+            return {
+                "requests": self._requests,
+                "api_calls": self._calls,
+                "texts_embedded": self._texts,
+                "requests_per_call": round(self._requests / self._calls, 2) if self._calls else 0.0,
+            }
+
+
+class EmbeddingProvider:
+    """
+    Maps a batch of texts to vectors. `name` identifies the vector space:
+    it keys the cache and the collection, so spaces are never mixed.
+    """
+    name = ""
+    # Remote providers are batched; local ones are called directly
+    remote = True
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        raise NotImplementedError
+
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    def __init__(self, model: str):
+        self.model = model
+        self.name = f"openai-{model}"
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        from agent.llm import embed_texts
+        return embed_texts(texts, model=self.model)
+
+
+_WORD = re.compile(r"\w+")
+# 64-bit multiplicative hashing constants (FNV prime, golden ratio)
+_PRIME = np.uint64(1099511628211)
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+
+class HashingEmbeddingProvider(EmbeddingProvider):
+    """
+    Deterministic, offline embeddings: words and character n-grams are
+    hashed into `dimensions` signed buckets and L2-normalised. Lexical
+    rather than semantic, but identical on every machine and run.
+    """
+    remote = False
+
+    def __init__(self, dimensions: int = 384, ngram_range: Tuple[int, int] = (3, 5)):
+        self.dimensions = dimensions
+        self.ngram_range = ngram_range
+        self.name = f"local-hash-{dimensions}"
+
+    def _vector(self, text: str) -> np.ndarray:
+        text = text.lower()
+        vector = np.zeros(self.dimensions, dtype=np.float64)
+        # Whole words (zlib.crc32 is stable across processes, unlike hash())
+        for word in _WORD.findall(text):
+            crc = zlib.crc32(word.encode("utf-8"))
+            vector[crc % self.dimensions] += 1.0 if crc >> 31 else -1.0
+        # Character n-grams, hashed for the whole text at once
+        data = np.frombuffer(f" {text} ".encode("utf-8"), dtype=np.uint8).astype(np.uint64)
+        for n in range(self.ngram_range[0], self.ngram_range[1] + 1):
+            count = len(data) - n + 1
+            if count <= 0:
+                continue
+            hashes = np.zeros(count, dtype=np.uint64)
+            for offset in range(n):
+                hashes = hashes * _PRIME + data[offset:offset + count]
+            hashes = hashes * _MIX
+            buckets = ((hashes >> np.uint64(32)) % np.uint64(self.dimensions)).astype(np.int64)
+            signs = np.where(hashes >> np.uint64(63), 0.5, -0.5)
+            vector += np.bincount(buckets, weights=signs, minlength=self.dimensions)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        return [self._vector(text).tolist() for text in texts]
+
+
+def get_embedding_provider(name: Optional[str] = None) -> EmbeddingProvider:
+    """Provider by name: "openai" (EMBEDDING_MODEL) or "local" (hashing); default EMBEDDING_PROVIDER."""
+    name = name or settings.EMBEDDING_PROVIDER
+    if name == "openai":
+        return OpenAIEmbeddingProvider(settings.EMBEDDING_MODEL)
+    if name == "local":
+        return HashingEmbeddingProvider(settings.LOCAL_EMBEDDING_DIMENSIONS)
+    raise ValueError(f"Unknown embedding provider: {name}")
+
+
+class CachedEmbedder:
+    """Embeds texts through the cache first and the provider (batched if remote) for the misses."""
+    def __init__(self, provider: EmbeddingProvider, cache: EmbeddingCache, batcher: Optional[EmbeddingBatcher] = None):
+        self.provider = provider
+        self.cache = cache
+        self.batcher = batcher
+
+    def _compute(self, texts: List[str]) -> List[np.ndarray]:
+        if self.batcher is not None:
+            return self.batcher.embed(texts)
+        return [np.asarray(vector, dtype=np.float32) for vector in self.provider.embed(texts)]
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        name = self.provider.name
+        keys = [content_key(name, text) for text in texts]
+        found = self.cache.get_many(keys)
+        missing = list(dict.fromkeys(text for text, key in zip(texts, keys) if key not in found))
+        if missing:
+            fresh = dict(zip(missing, self._compute(missing)))
+            self.cache.put_many({content_key(name, text): vector for text, vector in fresh.items()})
+            found.update((content_key(name, text), vector) for text, vector in fresh.items())
+        return [found[key].tolist() for key in keys]
+
+    def close(self):
+        if self.batcher is not None:
+            self.batcher.close()
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "provider": self.provider.name,
+            "cache": self.cache.stats(),
+            "batcher": self.batcher.stats() if self.batcher else None
+        }
+
+
+_embedders: Dict[str, CachedEmbedder] = {}
+_cache: Optional[EmbeddingCache] = None
+_embedder_lock = threading.Lock()
+
+
+def get_embedder(provider: Optional[str] = None) -> CachedEmbedder:
+    """Process-wide embedder per provider (default EMBEDDING_PROVIDER), sharing one cache."""
+    global _cache
+    name = provider or settings.EMBEDDING_PROVIDER
+    embedder = _embedders.get(name)
+    if embedder is None:
+        with _embedder_lock:
+            embedder = _embedders.get(name)
+            if embedder is None:
+                if _cache is None:
+                    _cache = EmbeddingCache(max_entries=settings.EMBEDDING_CACHE_SIZE, path=settings.EMBEDDING_CACHE_PATH)
+                embedding_provider = get_embedding_provider(name)
+                batcher = EmbeddingBatcher(
+                    embedding_provider.embed,
+                    window_seconds=settings.EMBEDDING_BATCH_WINDOW_MS / 1000,
+                    max_batch=settings.EMBEDDING_BATCH_MAX
+                ) if embedding_provider.remote else None
+                embedder = CachedEmbedder(embedding_provider, _cache, batcher)
+                _embedders[name] = embedder
+    return embedder
+
+
+def close_embedder():
+    global _cache
+    with _embedder_lock:
+        for embedder in _embedders.values():
+            embedder.close()
+        _embedders.clear()
+        if _cache is not None:
+            _cache.close()
+            _cache = None
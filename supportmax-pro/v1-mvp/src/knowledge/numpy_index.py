@@ -0,0 +1,278 @@
+"""
+Pure-NumPy vector index, and a Chroma-compatible collection on top of it.
+
+For CI and benchmark boxes or air-gapped installs where ChromaDB is not
+available. NumpyVectorIndex does exact ("flat") or inverted-file ("ivf")
+inner-product search over unit vectors stored as float32 or int8.
+NumpyCollection implements the part of the Chroma collection API that
+VectorStore uses (upsert/delete/get/query) and persists to two files.
+"""
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import numpy as np
+
+# Below this many vectors IVF falls back to an exact scan
+IVF_MIN_VECTORS = 1024
+# Rows scored per block, bounding the float32 copy made of int8 storage
+_SCORE_BLOCK = 8192
+
+
+def _unit(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32)
+
+
+def _spherical_kmeans(vectors: np.ndarray, k: int, iterations: int, rng: np.random.Generator) -> np.ndarray:
+    centroids = vectors[rng.choice(len(vectors), size=k, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        # Empty clusters keep their previous centroid
+        filled = np.bincount(assignments, minlength=k) > 0
+        centroids[filled] = _unit(sums[filled])
+    return centroids
+
+
+class NumpyVectorIndex:
+    """
+    Immutable index over unit vectors; rebuild it after the data changes.
+
+    kind:  "flat" scores every vector; "ivf" clusters them into `n_lists`
+           (default sqrt(n)) lists and only scores the `n_probe` closest
+           (default an eighth of the lists, at least 8).
+    dtype: "float32", or "int8" (per-vector scale, 4x less memory).
+    """
+    def __init__(self, kind: str = "flat", dtype: str = "float32", n_lists: Optional[int] = None, n_probe: Optional[int] = None, seed: int = 0):
+        if kind not in ("flat", "ivf"):
+            raise ValueError(f"Unknown index kind: {kind}")
+        if dtype not in ("float32", "int8"):
+            raise ValueError(f"Unknown index dtype: {dtype}")
+        self.kind = kind
+        self.dtype = dtype
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.seed = seed
+        self._data = np.empty((0, 0), dtype=np.float32)
+        self._scales: Optional[np.ndarray] = None
+        self._centroids: Optional[np.ndarray] = None
+        self._lists: List[np.ndarray] = []
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def build(self, vectors: np.ndarray):
+        vectors = _unit(np.asarray(vectors, dtype=np.float32))
+        if self.dtype == "int8":
+            scales = np.abs(vectors).max(axis=1) if len(vectors) else np.empty(0, dtype=np.float32)
+            scales[scales == 0] = 1.0
+            self._data = np.round(vectors / scales[:, None] * 127).astype(np.int8)
+            self._scales = (scales / 127).astype(np.float32)
+        else:
+            self._data = vectors
+            self._scales = None
+
+        self._centroids = None
+        self._lists = []
+        if self.kind == "ivf" and len(vectors) >= IVF_MIN_VECTORS:
+            rng = np.random.default_rng(self.seed)
+            n_lists = self.n_lists or int(np.sqrt(len(vectors)))
+            # Train on a sample, then assign everything
+            sample = vectors[rng.choice(len(vectors), size=min(len(vectors), n_lists * 64), replace=False)]
+            self._centroids = _spherical_kmeans(sample, n_lists, iterations=10, rng=rng)
+            assignments = np.argmax(vectors @ self._centroids.T, axis=1)
+            order = np.argsort(assignments, kind="stable")
+            bounds = np.searchsorted(assignments[order], np.arange(n_lists + 1))
+            self._lists = [order[bounds[i]:bounds[i + 1]] for i in range(n_lists)]
+
+    def _scores(self, rows: Optional[np.ndarray], query: np.ndarray) -> np.ndarray:
+        data = self._data if rows is None else self._data[rows]
+        if self._scales is None:
+            return data @ query
+        scales = self._scales if rows is None else self._scales[rows]
+        scores = np.empty(len(data), dtype=np.float32)
+        for start in range(0, len(data), _SCORE_BLOCK):
+            block = data[start:start + _SCORE_BLOCK].astype(np.float32)
+            scores[start:start + _SCORE_BLOCK] = block @ query
+        return scores * scales
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Row positions and cosine scores of the `k` best matches, best first."""
+        if not len(self._data):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        query = _unit(np.asarray(query, dtype=np.float32))
+        rows = None
+        if self._centroids is not None:
+            n_probe = self.n_probe or max(8, len(self._lists) // 8)
+            probe = np.argsort(-(self._centroids @ query))[:n_probe]
+            rows = np.concatenate([self._lists[i] for i in probe])
+        scores = self._scores(rows, query)
+        k = min(k, len(scores))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        positions = top if rows is None else rows[top]
+        return positions, scores[top]
+
+    def memory_bytes(self) -> int:
+        return self._data.nbytes + (self._scales.nbytes if self._scales is not None else 0)
+
+
+class NumpyCollection:
+    """
+    Chroma-like collection kept in memory and saved to `<path>.json`
+    (ids, documents, metadatas) plus `<path>.npy` (vectors) by `persist()`.
+    The index is rebuilt lazily on the first query after a change, and the
+    files are re-read when another process (ingestion) rewrites them.
+    """
+    def __init__(
+        self,
+        path: str,
+        embedding_function: Callable[[List[str]], List[List[float]]],
+        kind: str = "flat",
+        dtype: str = "float32",
+        check_interval: float = 2.0
+    ):
+        self.path = path
+        self.embedding_function = embedding_function
+        self.kind = kind
+        self.dtype = dtype
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        # id -> (document, metadata, unit vector), in insertion order
+        self._records: Dict[str, Tuple[str, Dict[str, Any], np.ndarray]] = {}
+        self._index: Optional[NumpyVectorIndex] = None
+        self._index_ids: List[str] = []
+        self._dirty = False
+        self._loaded_mtime: Optional[float] = None
+        self._last_check = 0.0
+        self._load()
+
+    @property
+    def _json_path(self) -> str:
+        return self.path + ".json"
+
+    @property
+    def _npy_path(self) -> str:
+        return self.path + ".npy"
+
+    def _load(self):
+        try:
+            mtime = os.path.getmtime(self._json_path)
+            with open(self._json_path, "r") as f:
+                data = json.load(f)
+            vectors = np.load(self._npy_path)
+        except (OSError, ValueError):
+            return
+        if len(vectors) != len(data["ids"]):
+            print(f"Warning: {self.path} vectors and records disagree, ignoring the saved index")
+            return
+        self._records = {
+            record_id: (document, metadata, vector)
+            for record_id, document, metadata, vector in zip(data["ids"], data["documents"], data["metadatas"], vectors)
+        }
+        self._index = None
+        self._loaded_mtime = mtime
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if self._dirty or now - self._last_check < self.check_interval:
+            return
+        self._last_check = now
+        try:
+            mtime = os.path.getmtime(self._json_path)
+        except OSError:
+            return
+        if mtime != self._loaded_mtime:
+            with self._lock:
+                self._load()
+
+    def count(self) -> int:
+        return len(self._records)
+
+    def upsert(self, ids: List[str], documents: List[str], metadatas: Optional[List[Dict[str, Any]]] = None):
+        vectors = _unit(np.asarray(self.embedding_function(documents), dtype=np.float32))
+        metadatas = metadatas or [{} for _ in ids]
+        with self._lock:
+            for record_id, document, metadata, vector in zip(ids, documents, metadatas, vectors):
+                self._records[record_id] = (document, metadata, vector)
+            self._index = None
+            self._dirty = True
+
+    add = upsert
+
+    def delete(self, ids: List[str]):
+        with self._lock:
+            for record_id in ids:
+                self._records.pop(record_id, None)
+            self._index = None
+            self._dirty = True
+
+    def get(self, ids: Optional[List[str]] = None, include: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Records by id (all if `ids` is None); `include` as in Chroma, default documents and metadatas."""
+        include = ["documents", "metadatas"] if include is None else include
+        with self._lock:
+            found = [i for i in (self._records if ids is None else ids) if i in self._records]
+            result: Dict[str, Any] = {"ids": found}
+            if "documents" in include:
+                result["documents"] = [self._records[i][0] for i in found]
+            if "metadatas" in include:
+                result["metadatas"] = [self._records[i][1] for i in found]
+            return result
+
+    def _ensure_index(self) -> NumpyVectorIndex:
+        if self._index is None:
+            self._index_ids = list(self._records)
+            index = NumpyVectorIndex(kind=self.kind, dtype=self.dtype)
+            if self._index_ids:
+                index.build(np.stack([self._records[i][2] for i in self._index_ids]))
+            self._index = index
+        return self._index
+
+    def query(self, query_texts: List[str], n_results: int = 10) -> Dict[str, List[List[Any]]]:
+        self._maybe_reload()
+        query_vectors = np.asarray(self.embedding_function(query_texts), dtype=np.float32)
+        results: Dict[str, List[List[Any]]] = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        with self._lock:
+            index = self._ensure_index()
+            for vector in query_vectors:
+                positions, scores = index.search(vector, n_results)
+                ids = [self._index_ids[p] for p in positions]
+                results["ids"].append(ids)
+                results["documents"].append([self._records[i][0] for i in ids])
+                results["metadatas"].append([self._records[i][1] for i in ids])
+                results["distances"].append([float(1 - score) for score in scores])
+        return results
+
+    def persist(self):
+        """Writes the collection to disk (atomically per file)."""
+        with self._lock:
+            ids = list(self._records)
+            records = [self._records[i] for i in ids]
+            dimensions = len(records[0][2]) if records else 0
+            vectors = np.stack([r[2] for r in records]) if records else np.empty((0, dimensions), dtype=np.float32)
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self._npy_path + ".tmp", "wb") as f:
+                np.save(f, vectors)
+            with open(self._json_path + ".tmp", "w") as f:
+                json.dump({"ids": ids, "documents": [r[0] for r in records], "metadatas": [r[1] for r in records]}, f)
+            os.replace(self._npy_path + ".tmp", self._npy_path)
+            os.replace(self._json_path + ".tmp", self._json_path)
+            self._loaded_mtime = os.path.getmtime(self._json_path)
+            self._dirty = False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            index = self._ensure_index()
+            return {
+                "vectors": len(index),
+                "kind": self.kind,
+                "dtype": self.dtype,
+                "ivf_lists": len(index._lists),
+                "memory_bytes": index.memory_bytes()
+            }
@@ -1,59 +1,405 @@
-import chromadb
-from chromadb.utils import embedding_functions
-from typing import List, Dict, Any
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
 from config.settings import settings
 from knowledge.document_loader import DocumentLoader
+from knowledge.manifest import IngestManifest, chunk_id, file_sha256
+from knowledge.embeddings import CachedEmbedder, EmbeddingProvider, OpenAIEmbeddingProvider, get_embedder
+from knowledge.numpy_index import NumpyCollection
+from knowledge.bm25_index import BM25Index
+
+try:
+    from chromadb.api.types import EmbeddingFunction
+except ImportError:
+    # ChromaDB is optional with VECTOR_BACKEND=numpy
+    EmbeddingFunction = object
+
+def kb_version_path() -> str:
+    return os.path.join(settings.CHROMA_PERSIST_DIRECTORY, "kb_version")
+
+
+def collection_name(provider: EmbeddingProvider) -> str:
+    """Each embedding provider gets its own collection: vector spaces (and sizes) differ."""
+    if isinstance(provider, OpenAIEmbeddingProvider):
+        return settings.COLLECTION_NAME
+    return f"{settings.COLLECTION_NAME}_{provider.name}"
+
+
+def manifest_path(name: Optional[str] = None) -> str:
+    return os.path.join(settings.CHROMA_PERSIST_DIRECTORY, f"{name or settings.COLLECTION_NAME}_manifest.json")
+
+
+def read_kb_version() -> str:
+    """Version stamp of the last ingestion ("" if nothing was ingested yet)."""
+    try:
+        with open(kb_version_path(), "r") as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+
+def bump_kb_version() -> str:
+    """Records a new ingestion so other processes drop answers built on the old content."""
+    version = f"{time.time():.6f}"
+    os.makedirs(settings.CHROMA_PERSIST_DIRECTORY, exist_ok=True)
+    tmp_path = kb_version_path() + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write(version)
+    os.replace(tmp_path, kb_version_path())
+    return version
+
+
+class CachedEmbeddingFunction(EmbeddingFunction):
+    """Chroma embedding function backed by a process-wide cached embedder."""
+    def __init__(self, embedder: CachedEmbedder):
+        self.embedder = embedder
+
+    def __call__(self, input: List[str]) -> List[List[float]]:
+        return self.embedder.embed(list(input))
+
+
+_client = None
+_store: Optional["VectorStore"] = None
+# One lock per singleton: building the store opens the client, so a shared
+# (non-reentrant) lock would deadlock
+_client_lock = threading.Lock()
+_store_lock = threading.Lock()
+_pool_lock = threading.Lock()
+# Runs the lexical half of hybrid searches while the caller runs the vector half
+_retrieval_pool: Optional[ThreadPoolExecutor] = None
+
+
+def get_chroma_client():
+    """One PersistentClient per process; opening one per call re-reads the whole database."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                import chromadb
+                _client = chromadb.PersistentClient(path=settings.CHROMA_PERSIST_DIRECTORY)
+    return _client
+
+
+def get_vector_store() -> "VectorStore":
+    """Process-wide VectorStore (client and collection are reused across tool calls)."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = VectorStore()
+    return _store
+
+
+def vector_store_stats() -> Optional[Dict[str, Any]]:
+    """Retrieval stats of the process-wide store, or None if it was never used."""
+    return _store.retrieval_stats() if _store is not None else None
+
+
+def _get_retrieval_pool() -> ThreadPoolExecutor:
+    global _retrieval_pool
+    if _retrieval_pool is None:
+        with _pool_lock:
+            if _retrieval_pool is None:
+                _retrieval_pool = ThreadPoolExecutor(max_workers=settings.CREW_MAX_WORKERS, thread_name_prefix="retrieval")
+    return _retrieval_pool
+
 
 class VectorStore:
     """
-    Manages the ChromaDB vector store for RAG.
+    Manages the vector store for RAG.
+
+    `provider` is an embedding provider name ("openai" or "local") and
+    `backend` is "chroma" or "numpy" (in-process flat/IVF index); both
+    default to settings. With EMBEDDING_FALLBACK, a local-embedding NumPy
+    index is kept alongside and searched when the provider is unreachable.
+    A BM25 index over the same chunk ids is maintained by ingestion and
+    fused with the vector results (see hybrid_search).
     """
-    def __init__(self):
-        self.client = chromadb.PersistentClient(path=settings.CHROMA_PERSIST_DIRECTORY)
+    def __init__(self, provider: Optional[str] = None, backend: Optional[str] = None, fallback: Optional[bool] = None):
+        embedder = get_embedder(provider)
+        self.provider = embedder.provider
+        self.backend = backend or settings.VECTOR_BACKEND
+        self.name = collection_name(self.provider)
         
-        # Use OpenAI embeddings by default
-        self.embedding_fn = embedding_functions.OpenAIEmbeddingFunction(
-            api_key=settings.OPENAI_API_KEY,
-            model_name="text-embedding-3-small"
-        )
+        # Embeddings are cached and batched (see knowledge/embeddings.py)
+        self.embedding_fn = CachedEmbeddingFunction(embedder)
         
-        self.collection = self.client.get_or_create_collection(
-            name=settings.COLLECTION_NAME,
-            embedding_function=self.embedding_fn
-        )
+        if self.backend == "chroma":
+            self.client = get_chroma_client()
+            self.collection = self.client.get_or_create_collection(
+                name=self.name,
+                embedding_function=self.embedding_fn
+            )
+        elif self.backend == "numpy":
+            self.collection = NumpyCollection(
+                os.path.join(settings.CHROMA_PERSIST_DIRECTORY, self.name),
+                self.embedding_fn,
+                kind=settings.VECTOR_INDEX_KIND,
+                dtype=settings.VECTOR_INDEX_DTYPE
+            )
+        else:
+            raise ValueError(f"Unknown vector backend: {self.backend}")
+
+        use_fallback = settings.EMBEDDING_FALLBACK if fallback is None else fallback
+        self.fallback: Optional["VectorStore"] = None
+        if use_fallback and self.provider.remote:
+            # Degraded mode needs no network: local embeddings in a local index
+            self.fallback = VectorStore(provider="local", backend="numpy", fallback=False)
 
-    def ingest_documents(self, directory_path: str):
+        self.lexical = BM25Index(os.path.join(settings.CHROMA_PERSIST_DIRECTORY, f"{self.name}_bm25.json"))
+        self._stats_lock = threading.Lock()
+        self._retrieval = {
+            "queries": 0, "vector_failures": 0,
+            "results_vector_only": 0, "results_bm25_only": 0, "results_both": 0
+        }
+
+    def ingest_documents(self, directory_path: str, batch_size: Optional[int] = None) -> Dict[str, Any]:
         """
-        Loads and indexes documents from a directory.
+        Incrementally indexes a directory tree. Only new or changed files are
+        parsed (in parallel), only chunks whose content changed are embedded
+        and upserted, and chunks of deleted files are removed. Returns what
+        was done, including per-file errors and the slowest files to parse.
         """
-        loader = DocumentLoader()
-        chunks = loader.load_documents(directory_path)
-        
-        if not chunks:
-            print("No documents found to ingest.")
-            return
+        batch_size = batch_size or settings.INGEST_BATCH_SIZE
+        root = os.path.abspath(directory_path)
+        manifest = IngestManifest(manifest_path(self.name))
+        if not manifest.exists:
+            self._drop_legacy_chunks(batch_size)
+        known = manifest.files(root)
+        if known and not self.lexical.count():
+            self._backfill_lexical()
+
+        loader = DocumentLoader(max_workers=settings.INGEST_WORKERS)
+        stats: Dict[str, Any] = {
+            "files_scanned": 0, "files_changed": 0, "files_deleted": 0, "files_failed": 0,
+            "chunks_upserted": 0, "chunks_unchanged": 0, "chunks_deleted": 0,
+            "parse_seconds": 0.0, "file_errors": {}, "slowest_files": []
+        }
+        pending_ids, pending_documents, pending_metadatas = [], [], []
+        stale_ids: List[str] = []
+
+        def flush():
+            if pending_ids:
+                self.collection.upsert(ids=pending_ids, documents=pending_documents, metadatas=pending_metadatas)
+                self.lexical.add(pending_ids, pending_documents)
+                stats["chunks_upserted"] += len(pending_ids)
+                pending_ids.clear()
+                pending_documents.clear()
+                pending_metadatas.clear()
+
+        # Cheap pass first: stat (and hash if needed) every file to find what must be parsed
+        seen = set()
+        to_parse: Dict[str, Tuple[str, os.stat_result, str]] = {}
+        for file_path in loader.list_files(directory_path):
+            relpath = os.path.relpath(file_path, root)
+            seen.add(relpath)
+            stats["files_scanned"] += 1
+            stat = os.stat(file_path)
+            record = known.get(relpath)
+            if record and record["mtime"] == stat.st_mtime and record["size"] == stat.st_size:
+                stats["chunks_unchanged"] += len(record["chunk_ids"])
+                continue
+            sha256 = file_sha256(file_path)
+            if record and record["sha256"] == sha256:
+                # Touched but not edited
+                manifest.record(root, relpath, stat.st_mtime, stat.st_size, sha256, record["chunk_ids"])
+                stats["chunks_unchanged"] += len(record["chunk_ids"])
+                continue
+            to_parse[file_path] = (relpath, stat, sha256)
+
+        # Changed files are parsed in parallel and written as they arrive
+        timings: List[Tuple[float, str]] = []
+        for result in loader.iter_files(to_parse):
+            relpath, stat, sha256 = to_parse[result.path]
+            stats["parse_seconds"] += result.seconds
+            timings.append((result.seconds, relpath))
+            if result.error:
+                # Keep whatever was indexed from the previous version
+                print(f"Error loading {relpath}: {result.error}")
+                stats["files_failed"] += 1
+                stats["file_errors"][relpath] = result.error
+                continue
 
-        ids = [f"doc_{i}" for i in range(len(chunks))]
-        documents = [chunk.page_content for chunk in chunks]
-        metadatas = [chunk.metadata for chunk in chunks]
+            record = known.get(relpath)
+            old_ids = set(record["chunk_ids"]) if record else set()
+            ids: List[str] = []
+            occurrences: Counter = Counter()
+            for chunk in result.chunks:
+                text = chunk.page_content
+                chunk_key = chunk_id(relpath, text, occurrences[text])
+                occurrences[text] += 1
+                ids.append(chunk_key)
+                if chunk_key in old_ids:
+                    stats["chunks_unchanged"] += 1
+                    continue
+                pending_ids.append(chunk_key)
+                pending_documents.append(text)
+                pending_metadatas.append(dict(chunk.metadata, source_path=relpath))
+                if len(pending_ids) >= batch_size:
+                    flush()
+            stale_ids.extend(old_ids.difference(ids))
+            manifest.record(root, relpath, stat.st_mtime, stat.st_size, sha256, ids)
+            stats["files_changed"] += 1
+        stats["parse_seconds"] = round(stats["parse_seconds"], 3)
+        stats["slowest_files"] = [
+            {"path": relpath, "seconds": round(seconds, 3)} for seconds, relpath in sorted(timings, reverse=True)[:5]
+        ]
 
-        self.collection.add(
-            ids=ids,
-            documents=documents,
-            metadatas=metadatas
+        for relpath in [relpath for relpath in known if relpath not in seen]:
+            stale_ids.extend(known[relpath]["chunk_ids"])
+            manifest.remove(root, relpath)
+            stats["files_deleted"] += 1
+
+        flush()
+        for start in range(0, len(stale_ids), batch_size):
+            self.collection.delete(ids=stale_ids[start:start + batch_size])
+        self.lexical.delete(stale_ids)
+        stats["chunks_deleted"] = len(stale_ids)
+        if isinstance(self.collection, NumpyCollection):
+            self.collection.persist()
+        self.lexical.persist()
+        manifest.save()
+        if self.fallback is not None:
+            stats["fallback"] = self.fallback.ingest_documents(directory_path, batch_size)
+
+        if not stats["files_scanned"] and not stats["files_deleted"]:
+            print("No documents found to ingest.")
+            return stats
+        print(
+            f"Ingested {stats['files_changed']} changed and {stats['files_deleted']} deleted of "
+            f"{stats['files_scanned']} files: {stats['chunks_upserted']} chunks upserted, "
+            f"{stats['chunks_deleted']} deleted, {stats['chunks_unchanged']} unchanged."
         )
-        print(f"Ingested {len(chunks)} document chunks.")
+        if stats["chunks_upserted"] or stats["chunks_deleted"]:
+            bump_kb_version()
+        return stats
+
+    def _backfill_lexical(self):
+        # Collections ingested before the BM25 index existed
+        existing = self.collection.get(include=["documents"])
+        self.lexical.add(existing["ids"], existing["documents"])
+        self.lexical.persist()
+
+    def _drop_legacy_chunks(self, batch_size: int):
+        # Collections built before the manifest used positional doc_<n> ids
+        legacy_ids = [i for i in self.collection.get(include=[])["ids"] if i.startswith("doc_")]
+        for start in range(0, len(legacy_ids), batch_size):
+            self.collection.delete(ids=legacy_ids[start:start + batch_size])
+
+    def _vector_candidates(self, query: str, n_results: int) -> List[Tuple[str, str, Dict[str, Any]]]:
+        try:
+            results = self.collection.query(query_texts=[query], n_results=n_results)
+        except Exception as e:
+            with self._stats_lock:
+                self._retrieval["vector_failures"] += 1
+            if self.fallback is not None:
+                print(f"Warning: vector search failed, answering from the local fallback index: {e}")
+                return self.fallback._vector_candidates(query, n_results)
+            if not settings.HYBRID_SEARCH_ENABLED:
+                raise
+            print(f"Warning: vector search failed, answering from the BM25 index only: {e}")
+            return []
+        if not results["ids"]:
+            return []
+        metadatas = (results.get("metadatas") or [None])[0] or [{} for _ in results["ids"][0]]
+        return list(zip(results["ids"][0], results["documents"][0], metadatas))
+
+    def hybrid_search(self, query: str, n_results: int = 3) -> List[Dict[str, Any]]:
+        """
+        Runs the vector and BM25 searches concurrently and merges them with
+        weighted reciprocal rank fusion: score = sum(weight / (RRF_K + rank)).
+        Each result has id, document, metadata, score and the rank it got
+        from each retriever (None if that retriever did not return it).
+        """
+        depth = max(n_results, settings.HYBRID_CANDIDATES)
+        lexical_future = _get_retrieval_pool().submit(self.lexical.search, query, depth)
+        vector_hits = self._vector_candidates(query, depth)
+        lexical_hits = lexical_future.result()
+
+        fused: Dict[str, Dict[str, Any]] = {}
+        for doc_id, document, metadata in vector_hits:
+            fused[doc_id] = {"id": doc_id, "document": document, "metadata": metadata, "ranks": {"vector": None, "bm25": None}}
+        for doc_id, _ in lexical_hits:
+            fused.setdefault(doc_id, {"id": doc_id, "document": None, "metadata": {}, "ranks": {"vector": None, "bm25": None}})
+        for rank, (doc_id, _, _) in enumerate(vector_hits, start=1):
+            fused[doc_id]["ranks"]["vector"] = rank
+        for rank, (doc_id, _) in enumerate(lexical_hits, start=1):
+            fused[doc_id]["ranks"]["bm25"] = rank
+
+        weights = {"vector": settings.HYBRID_VECTOR_WEIGHT, "bm25": settings.HYBRID_BM25_WEIGHT}
+        for result in fused.values():
+            result["score"] = round(sum(
+                weights[retriever] / (settings.RRF_K + rank)
+                for retriever, rank in result["ranks"].items() if rank is not None
+            ), 6)
+        top = sorted(fused.values(), key=lambda r: r["score"], reverse=True)[:n_results]
+
+        # BM25-only hits still need their text
+        missing = [r["id"] for r in top if r["document"] is None]
+        if missing:
+            found = self.collection.get(ids=missing, include=["documents", "metadatas"])
+            by_id = {doc_id: (document, metadata) for doc_id, document, metadata in zip(found["ids"], found["documents"], found["metadatas"])}
+            for result in top:
+                if result["document"] is None and result["id"] in by_id:
+                    result["document"], result["metadata"] = by_id[result["id"]]
+            top = [r for r in top if r["document"] is not None]
+
+        with self._stats_lock:
+            self._retrieval["queries"] += 1
+            for result in top:
+                ranks = result["ranks"]
+                if ranks["vector"] and ranks["bm25"]:
+                    self._retrieval["results_both"] += 1
+                elif ranks["vector"]:
+                    self._retrieval["results_vector_only"] += 1
+                else:
+                    self._retrieval["results_bm25_only"] += 1
+        return top
+
+    def retrieve(self, query: str, n_results: int = 3) -> List[Dict[str, Any]]:
+        """
+        Ranked results (id, document, metadata, score, ranks): hybrid search,
+        or vector only with HYBRID_SEARCH_ENABLED off.
+        """
+        if settings.HYBRID_SEARCH_ENABLED:
+            return self.hybrid_search(query, n_results)
+        return [
+            {
+                "id": doc_id, "document": document, "metadata": metadata,
+                "score": round(1 / (settings.RRF_K + rank), 6), "ranks": {"vector": rank, "bm25": None}
+            }
+            for rank, (doc_id, document, metadata) in enumerate(self._vector_candidates(query, n_results), start=1)
+        ]
 
     def search(self, query: str, n_results: int = 3) -> List[str]:
         """
-        Semantic search for relevant documents.
+        Relevant document texts, best first.
+        """
+        return [result["document"] for result in self.retrieve(query, n_results)]
+
+    def keyword_search(self, query: str, n_results: int = 3) -> List[str]:
         """
-        results = self.collection.query(
-            query_texts=[query],
-            n_results=n_results
+        Document texts of the best BM25 matches, best first. Makes no
+        embedding call, so it fits in what is left of a request's deadline.
+        """
+        ids = [doc_id for doc_id, _ in self.lexical.search(query, n_results)]
+        if not ids:
+            return []
+        found = self.collection.get(ids=ids, include=["documents"])
+        by_id = dict(zip(found["ids"], found["documents"]))
+        return [by_id[doc_id] for doc_id in ids if doc_id in by_id]
+
+    def retrieval_stats(self) -> Dict[str, Any]:
+        """How many returned results each retriever contributed (alone or together)."""
+        with self._stats_lock:
+            stats = dict(self._retrieval)
+        stats.update(
+            hybrid=settings.HYBRID_SEARCH_ENABLED,
+            vector_weight=settings.HYBRID_VECTOR_WEIGHT,
+            bm25_weight=settings.HYBRID_BM25_WEIGHT,
+            bm25_chunks=self.lexical.count()
         )
-        
-        # Flatten results
-        if results["documents"]:
-            return results["documents"][0]
-        return []
+        return stats
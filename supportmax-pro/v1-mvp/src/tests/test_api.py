@@ -0,0 +1,58 @@
+import asyncio
+import time
+from types import SimpleNamespace
+from agent.deadline import Deadline, record_result
+from agent.run_trace import RunTrace, active_trace
+from api import endpoints
+from api.response_cache import ResponseCache
+from tools.ticket_creator import TicketTools
+
+def test_paraphrased_ticket_answer_is_not_cached(monkeypatch):
+    cache = ResponseCache()
+    monkeypatch.setattr(endpoints, "response_cache", cache)
+    trace = RunTrace()
+    with active_trace(trace):
+        output = TicketTools.create_ticket.run("The export button is broken")
+    ticket_id = output.split("ID: ")[1].split(".")[0]
+    # The answer never says "Ticket created"
+    response = endpoints.build_response(f"I've opened ticket {ticket_id} for you.", trace)
+    assert response.action_taken == "create_ticket"
+    assert response.metadata["ticket_ids"] == [ticket_id]
+    endpoints.cache_response("The export button is broken", response, 1.0)
+    assert cache.get("The export button is broken") is None
+
+def test_slow_crew_is_answered_with_fallback_in_time(monkeypatch):
+    cache = ResponseCache()
+    monkeypatch.setattr(endpoints, "response_cache", cache)
+    def slow_crew(message, on_event, trace):
+        record_result("search_knowledge", "Passwords are reset from the login page.")
+        time.sleep(2)
+        return "too late"
+    monkeypatch.setattr(endpoints, "run_pooled_crew", slow_crew)
+    deadline = Deadline(0.5)
+    response = asyncio.run(endpoints.answer("How do I reset my password?", deadline))
+    assert deadline.elapsed() < 0.5 + 0.1
+    assert response.response == "Passwords are reset from the login page."
+    assert response.metadata["degraded"] is True
+    assert cache.get("How do I reset my password?") is None
+
+def test_coalesced_requests_get_their_own_ticket_despite_paraphrase(monkeypatch):
+    monkeypatch.setattr(endpoints, "response_cache", ResponseCache())
+    runs = []
+    def ticketing_crew(message, on_event, trace):
+        with active_trace(trace):
+            output = TicketTools.create_ticket.run(message)
+        runs.append(output)
+        # Long enough for the second request to join this run
+        time.sleep(0.3)
+        return f"I've opened ticket {output.split('ID: ')[1].split('.')[0]} for you."
+    monkeypatch.setattr(endpoints, "run_pooled_crew", ticketing_crew)
+    request = endpoints.ChatRequest(message="The export button is broken")
+    http_request = SimpleNamespace(state=SimpleNamespace())
+
+    async def both():
+        return await asyncio.gather(endpoints.chat(request, http_request), endpoints.chat(request, http_request))
+    first, second = asyncio.run(both())
+    assert len(runs) == 2
+    assert first.metadata["ticket_ids"] != second.metadata["ticket_ids"]
+    assert not second.metadata.get("coalesced")
@@ -1,16 +1,26 @@
 from langchain.tools import tool
-from knowledge.vector_store import VectorStore
+from agent.deadline import check_deadline, record_result
+from config.settings import settings
+from knowledge.context_builder import build_context
+from knowledge.vector_store import get_vector_store
 
 class RAGTool:
     @tool("Search Knowledge Base")
     def search_knowledge(query: str):
         """Useful to answer questions about product features, policies, troubleshooting, and documentation.
         Input should be a search query string."""
+        check_deadline("knowledge base search")
+        # Over-fetch, then merge overlapping chunks, drop duplicates and diversify
+        results = get_vector_store().retrieve(query, n_results=settings.RAG_CANDIDATES)
+        context = build_context(
+            results,
+            max_passages=settings.RAG_MAX_PASSAGES,
+            max_chars=settings.RAG_CONTEXT_MAX_CHARS,
+            mmr_lambda=settings.RAG_MMR_LAMBDA
+        )
         
-        store = VectorStore()
-        results = store.search(query)
-        
-        if not results:
+        if not context:
             return "No relevant information found in the knowledge base."
         
-        return f"Found relevant information:\n{results}"
+        record_result("search_knowledge", context)
+        return f"Found relevant information:\n{context}"
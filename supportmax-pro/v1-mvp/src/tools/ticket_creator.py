@@ -2,6 +2,8 @@ from langchain.tools import tool
 import uuid
 import datetime
 from typing import Dict, Any
+from agent.deadline import check_deadline, record_result
+from agent.run_trace import current_trace
 
 class TicketCreator:
     """
@@ -31,7 +33,7 @@ class TicketTools:
     def create_ticket(description: str):
         """Useful to create a support ticket when the user has an issue that cannot be solved by FAQs.
         Input should be a detailed description of the issue. The tool will automatically infer the subject."""
-        
+        check_deadline("ticket creation")
         creator = TicketCreator()
         # Infer subject from description (simple heuristic)
         subject = description[:50] + "..." if len(description) > 50 else description
@@ -42,4 +44,9 @@ class TicketTools:
             priority = "High"
             
         result = creator.create_ticket(subject=subject, description=description, priority=priority)
-        return f"Ticket created successfully. ID: {result['ticket_id']}. Priority: {result['priority']}"
+        trace = current_trace()
+        if trace is not None:
+            trace.record_ticket(result["ticket_id"])
+        response = f"Ticket created successfully. ID: {result['ticket_id']}. Priority: {result['priority']}"
+        record_result("create_ticket", response)
+        return response
@@ -1,16 +1,16 @@
 from crewai import Agent
-from langchain_openai import ChatOpenAI
+from typing import Optional
+from agent.llm import build_llm
 from config.settings import settings
 from tools.rag_tool import RAGTool
 from tools.ticket_creator import TicketTools
 
 class SupportAgents:
-    def __init__(self):
-        self.llm = ChatOpenAI(
-            model=settings.OPENAI_MODEL,
-            api_key=settings.OPENAI_API_KEY,
-            temperature=0
-        )
+    def __init__(self, model: Optional[str] = None):
+        # Per-crew wrappers over the gateway of each model (pooled clients, failover):
+        # `model` (default OPENAI_MODEL) answers, the fast model coordinates and reviews
+        self.llm = build_llm(model)
+        self.fast_llm = build_llm(settings.OPENAI_FAST_MODEL)
 
     def support_specialist(self):
         return Agent(
@@ -52,7 +52,7 @@ class SupportAgents:
             2. Tone (is it polite and professional?)
             3. Completeness (did we miss anything?)
             If the response is good, you approve it. If not, you provide feedback for improvement.""",
-            llm=self.llm,
+            llm=self.fast_llm,
             verbose=True,
             allow_delegation=False,
             memory=True
@@ -0,0 +1,123 @@
+"""
+Token-budgeted prompt assembly for crew runs.
+
+A triage prompt is made of sections in priority order: the task
+instructions, the user message, the conversation history (summary plus
+recent turns) and the knowledge base passages the agents retrieve while
+running. A ContextBudget is created per request with MAX_TOKENS_PER_QUERY;
+each section is fitted into what is left when it is added, and the usage
+per section is reported with the response.
+
+The RAG tool runs inside the crew, so the active budget is found through
+a context variable set by `active_budget()` around the run.
+"""
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+# Rough characters per token, for turning a token budget into a character limit
+CHARS_PER_TOKEN = 4
+TRUNCATION_MARKER = "..."
+
+# Letters, digit runs, and any other single non-space character
+_PIECE = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+
+
+def _piece_tokens(piece: str) -> int:
+    if piece.isalpha() and piece.isascii():
+        # Common words are one token, long ones split every ~6 letters
+        return (len(piece) + 5) // 6
+    if piece.isdigit():
+        return (len(piece) + 2) // 3
+    return 1
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Fast local estimate of the BPE token count (no tokenizer download):
+    words, digit groups of three, and one token per symbol or non-ASCII character.
+    """
+    return sum(_piece_tokens(piece) for piece in _PIECE.findall(text))
+
+
+def truncate_tokens(text: str, max_tokens: int, keep: str = "head") -> str:
+    """
+    Cuts `text` to at most `max_tokens` estimated tokens on a piece
+    boundary, keeping its start ("head") or its end ("tail").
+    """
+    pieces = list(_PIECE.finditer(text))
+    if sum(_piece_tokens(m.group()) for m in pieces) <= max_tokens:
+        return text
+    # Leave room for the marker
+    remaining = max_tokens - estimate_tokens(TRUNCATION_MARKER)
+    if remaining <= 0:
+        return ""
+    if keep == "tail":
+        start = len(text)
+        for match in reversed(pieces):
+            remaining -= _piece_tokens(match.group())
+            if remaining < 0:
+                break
+            start = match.start()
+        return TRUNCATION_MARKER + text[start:]
+    end = 0
+    for match in pieces:
+        remaining -= _piece_tokens(match.group())
+        if remaining < 0:
+            break
+        end = match.end()
+    return text[:end] + " " + TRUNCATION_MARKER
+
+
+class ContextBudget:
+    """Token budget of one request, shared by the sections of its prompt."""
+    def __init__(self, max_tokens: int):
+        self.max_tokens = max_tokens
+        self.usage: Dict[str, int] = {}
+        self.truncated: List[str] = []
+
+    @property
+    def used(self) -> int:
+        return sum(self.usage.values())
+
+    @property
+    def remaining(self) -> int:
+        return max(0, self.max_tokens - self.used)
+
+    def fit(self, section: str, text: str, max_tokens: Optional[int] = None, keep: str = "head") -> str:
+        """
+        Truncates `text` to the remaining budget (and `max_tokens`, if given),
+        charges it to `section` and returns it.
+        """
+        limit = self.remaining if max_tokens is None else max(0, min(max_tokens, self.remaining))
+        fitted = truncate_tokens(text, limit, keep=keep)
+        if fitted != text and section not in self.truncated:
+            self.truncated.append(section)
+        self.usage[section] = self.usage.get(section, 0) + estimate_tokens(fitted)
+        return fitted
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "budget": self.max_tokens,
+            "used": self.used,
+            "sections": dict(self.usage),
+            "truncated": list(self.truncated)
+        }
+
+
+_current_budget: ContextVar[Optional[ContextBudget]] = ContextVar("context_budget", default=None)
+
+
+@contextmanager
+def active_budget(budget: ContextBudget) -> Iterator[ContextBudget]:
+    """Makes `budget` visible to tools run by the crew in the current thread."""
+    token = _current_budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _current_budget.reset(token)
+
+
+def current_budget() -> Optional[ContextBudget]:
+    return _current_budget.get()
@@ -0,0 +1,210 @@
+"""
+Token and cost accounting for every LLM call.
+
+A LangChain callback (UsageRecorder) is attached to every callback manager
+in the process, so crew agents, the hierarchical manager, the QA review
+and the summarizer are all counted without wiring each LLM. Each response
+is charged from its `token_usage` (estimated locally when the provider
+does not report it, e.g. while streaming) at MODEL_PRICES_PER_1K, into:
+
+- the process-wide CostTracker: spend of the current UTC day against
+  MAX_DAILY_COST_USD, and totals per model;
+- the RequestUsage of the run, if one is active (`active_usage()`), so
+  each response can report what it cost.
+"""
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, Optional, Tuple
+from uuid import UUID
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from langchain_core.tracers.context import register_configure_hook
+from agent.context_packer import estimate_tokens
+from config.constraints import MAX_DAILY_COST_USD, MODEL_PRICES_PER_1K
+
+
+def model_price(model: str) -> Tuple[float, float]:
+    """USD per 1K (input, output) tokens of `model`."""
+    matches = [name for name in MODEL_PRICES_PER_1K if model.startswith(name)]
+    if not matches:
+        return max(MODEL_PRICES_PER_1K.values(), key=sum)
+    return MODEL_PRICES_PER_1K[max(matches, key=len)]
+
+
+def usage_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    input_price, output_price = model_price(model)
+    return prompt_tokens / 1000 * input_price + completion_tokens / 1000 * output_price
+
+
+class RequestUsage:
+    """LLM usage of one request, across all the calls of its crew run."""
+    def __init__(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost_usd = 0.0
+        self.models: Dict[str, int] = {}
+
+    def add(self, model: str, prompt_tokens: int, completion_tokens: int, cost: float):
+        self.calls += 1
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        self.cost_usd += cost
+        self.models[model] = self.models.get(model, 0) + 1
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "llm_calls": self.calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cost_usd": round(self.cost_usd, 6),
+            "models": dict(self.models)
+        }
+
+
+class CostTracker:
+    """Spend of the current UTC day against `daily_budget`, and per-model totals."""
+    def __init__(self, daily_budget: float = MAX_DAILY_COST_USD):
+        self.daily_budget = daily_budget
+        self._lock = threading.Lock()
+        self._day = self._today()
+        self._spent = 0.0
+        self._models: Dict[str, Dict[str, Any]] = {}
+
+    @staticmethod
+    def _today() -> str:
+        return datetime.now(timezone.utc).date().isoformat()
+
+    def _roll_over(self):
+        today = self._today()
+        if today != self._day:
+            self._day = today
+            self._spent = 0.0
+            self._models = {}
+
+    def record(self, model: str, prompt_tokens: int, completion_tokens: int, estimated: bool = False) -> float:
+        """Charges one LLM response and returns its cost in USD."""
+        cost = usage_cost(model, prompt_tokens, completion_tokens)
+        with self._lock:
+            self._roll_over()
+            self._spent += cost
+            totals = self._models.setdefault(
+                model, {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0, "estimated_calls": 0}
+            )
+            totals["calls"] += 1
+            totals["prompt_tokens"] += prompt_tokens
+            totals["completion_tokens"] += completion_tokens
+            totals["cost_usd"] += cost
+            if estimated:
+                totals["estimated_calls"] += 1
+        return cost
+
+    def spent_today(self) -> float:
+        with self._lock:
+            self._roll_over()
+            return self._spent
+
+    def budget_used(self) -> float:
+        """Share of the daily budget spent so far (above 1.0 once it is exceeded)."""
+        return self.spent_today() / self.daily_budget if self.daily_budget > 0 else 0.0
+
+    def seconds_until_reset(self) -> int:
+        """Seconds until the spend starts over, at the next UTC midnight."""
+        now = datetime.now(timezone.utc)
+        midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+        return max(1, int((midnight - now).total_seconds()))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._roll_over()
+            return {
+                "day": self._day,
+                "spent_usd": round(self._spent, 4),
+                "daily_budget_usd": self.daily_budget,
+                "budget_used": round(self._spent / self.daily_budget, 4) if self.daily_budget > 0 else 0.0,
+                "models": {
+                    model: dict(totals, cost_usd=round(totals["cost_usd"], 4))
+                    for model, totals in self._models.items()
+                }
+            }
+
+
+_tracker: Optional[CostTracker] = None
+_tracker_lock = threading.Lock()
+
+
+def get_cost_tracker() -> CostTracker:
+    """Process-wide tracker shared by every crew and request."""
+    global _tracker
+    with _tracker_lock:
+        if _tracker is None:
+            _tracker = CostTracker()
+        return _tracker
+
+
+_current_usage: ContextVar[Optional[RequestUsage]] = ContextVar("request_usage", default=None)
+
+
+@contextmanager
+def active_usage(usage: RequestUsage) -> Iterator[RequestUsage]:
+    """Charges LLM calls made in the current thread to `usage` as well."""
+    token = _current_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _current_usage.reset(token)
+
+
+class UsageRecorder(BaseCallbackHandler):
+    """Feeds the usage of every LLM response to the tracker and the active RequestUsage."""
+    def __init__(self):
+        # run_id -> (model, estimated prompt tokens), for responses without token_usage
+        self._started: Dict[UUID, Tuple[str, int]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _model(serialized: Dict[str, Any], kwargs: Dict[str, Any]) -> str:
+        params = kwargs.get("invocation_params") or {}
+        model = params.get("model_name") or params.get("model")
+        if not model:
+            model = (serialized or {}).get("kwargs", {}).get("model_name", "unknown")
+        return str(model)
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs):
+        with self._lock:
+            self._started[run_id] = (self._model(serialized, kwargs), sum(estimate_tokens(p) for p in prompts))
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs):
+        prompt_tokens = sum(estimate_tokens(str(m.content)) for batch in messages for m in batch)
+        with self._lock:
+            self._started[run_id] = (self._model(serialized, kwargs), prompt_tokens)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs):
+        with self._lock:
+            self._started.pop(run_id, None)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs):
+        with self._lock:
+            model, estimated_prompt = self._started.pop(run_id, ("unknown", 0))
+        llm_output = response.llm_output or {}
+        token_usage = llm_output.get("token_usage") or {}
+        model = llm_output.get("model_name") or model
+        if token_usage.get("prompt_tokens") is not None:
+            prompt_tokens = token_usage["prompt_tokens"]
+            completion_tokens = token_usage.get("completion_tokens", 0)
+            estimated = False
+        else:
+            prompt_tokens = estimated_prompt
+            completion_tokens = sum(estimate_tokens(g.text) for batch in response.generations for g in batch)
+            estimated = True
+        cost = get_cost_tracker().record(model, prompt_tokens, completion_tokens, estimated=estimated)
+        usage = _current_usage.get()
+        if usage is not None:
+            usage.add(model, prompt_tokens, completion_tokens, cost)
+
+
+# Always set: LangChain adds the recorder to every callback manager in the process
+_usage_recorder: ContextVar[Optional[UsageRecorder]] = ContextVar("usage_recorder", default=UsageRecorder())
+register_configure_hook(_usage_recorder, inheritable=True)
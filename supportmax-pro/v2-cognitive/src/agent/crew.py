@@ -1,37 +1,95 @@
 from crewai import Crew, Process
+import time
+from typing import Optional
 from agent.agents import SupportAgents
-from agent.tasks import SupportTasks
+from agent.context_packer import ContextBudget, active_budget
+from agent.cost_tracker import RequestUsage, active_usage
+from agent.crew_pool import reset_run_state
+from agent.events import forward_step, relay_events
+from agent.model_router import tier_model
+from agent.reflection import RunTrace, active_trace, get_reflection_policy
+from agent.tasks import SupportTasks, TRIAGE_DESCRIPTION
+from config.constraints import MAX_MESSAGE_TOKENS, MAX_TOKENS_PER_QUERY, MIN_KNOWLEDGE_TOKENS
+from config.settings import settings
 
 class SupportCrew:
-    def __init__(self):
-        agents = SupportAgents()
+    """
+    Agents, the Crew and its memory/embedder setup are built once and
+    reused; each run only binds its tasks. Not safe for concurrent runs:
+    borrow instances from a CrewPool.
+
+    `tier` is the model tier of the agents (see agent/model_router.py).
+    """
+    def __init__(self, tier: str = "standard"):
+        self.tier = tier
+        agents = SupportAgents(tier_model(tier))
         self.support_specialist = agents.support_specialist()
         self.technical_expert = agents.technical_expert()
         self.qa_specialist = agents.quality_assurance()
         
         self.tasks = SupportTasks()
 
-    def run(self, message: str, user_id: str = "default_user", chat_history: str = ""):
-        # Define tasks
-        triage_task = self.tasks.triage_and_resolve(self.support_specialist, message)
-        review_task = self.tasks.quality_review(self.qa_specialist, [triage_task])
-
-        # Create the crew with Memory enabled
-        crew = Crew(
+        # Create the crew with Memory enabled (tasks are bound per run)
+        self.crew = Crew(
             agents=[self.support_specialist, self.technical_expert, self.qa_specialist],
-            tasks=[triage_task, review_task],
+            tasks=[],
             verbose=2,
+            step_callback=forward_step, # Live step events for /chat/stream
             process=Process.hierarchical, # Enable delegation
-            manager_llm=self.support_specialist.llm,
-            memory=True, # Enable Global Memory
+            manager_llm=agents.fast_llm, # Delegation decisions don't need the large model
+            # Global Memory embeds through a hosted provider; with the offline
+            # "local" provider it is off and the MemoryStore history still applies
+            memory=settings.EMBEDDING_PROVIDER != "local",
             embedder={
                 "provider": "openai",
                 "config": {
-                    "model": "text-embedding-3-small"
+                    "model": settings.EMBEDDING_MODEL
                 }
             }
         )
 
+    def bind(self):
+        """
+        Attaches the per-request triage task to the pre-built crew and returns
+        the QA review task, which runs only when the reflection policy asks for it.
+        """
+        reset_run_state(self.crew)
+        # Define tasks
+        triage_task = self.tasks.triage_and_resolve(self.support_specialist)
+        self.crew.tasks = [triage_task]
+        return self.tasks.quality_review(self.qa_specialist, [triage_task])
+
+    def run(
+        self,
+        message: str,
+        user_id: str = "default_user",
+        chat_history: str = "",
+        on_event=None,
+        budget: Optional[ContextBudget] = None,
+        trace: Optional[RunTrace] = None,
+        usage: Optional[RequestUsage] = None
+    ):
+        """
+        Runs the crew on `message`. `on_event(event, data)`, if given, receives
+        live step/tool/token events (see agent/events.py) while it runs.
+        The prompt is packed into `budget` (a fresh MAX_TOKENS_PER_QUERY one by
+        default): instructions, message, history (oldest part cut first), and
+        what is left for knowledge base passages.
+
+        The draft then gets the review the reflection policy picks (see
+        agent/reflection.py); the decision is left in `trace.reflection`.
+        Tokens and cost of every LLM call of the run are added to `usage`.
+        """
+        budget = budget or ContextBudget(MAX_TOKENS_PER_QUERY)
+        trace = trace or RunTrace()
+        usage = usage or RequestUsage()
+        policy = get_reflection_policy()
+        review_task = self.bind()
+
+        budget.fit("instructions", TRIAGE_DESCRIPTION)
+        message = budget.fit("message", message, max_tokens=MAX_MESSAGE_TOKENS)
+        chat_history = budget.fit("history", chat_history, max_tokens=budget.remaining - MIN_KNOWLEDGE_TOKENS, keep="tail")
+
         # Pass inputs for memory context
         inputs = {
             "message": message,
@@ -39,5 +97,15 @@ class SupportCrew:
             "chat_history": chat_history
         }
         
-        result = crew.kickoff(inputs=inputs)
+        review_seconds = None
+        with active_budget(budget), active_trace(trace), active_usage(usage), relay_events(on_event):
+            result = self.crew.kickoff(inputs=inputs)
+            decision = policy.decide(message, str(result), trace)
+            if decision["tier"] == "full":
+                # The QA agent reviews the draft directly, without a manager round-trip
+                started = time.monotonic()
+                result = review_task.execute()
+                review_seconds = time.monotonic() - started
+        policy.record(decision, review_seconds)
+        trace.reflection = decision
         return result
@@ -0,0 +1,161 @@
+"""
+Request deadlines and per-stage timeouts.
+
+Each request gets a Deadline of MAX_RESPONSE_TIME_SECONDS when it arrives
+(queueing counts against it). `deadline_scope()` makes it the current
+deadline of the thread, and everything downstream reads it from there:
+
+- `run_stage()` runs a blocking stage (the crew) in a helper thread and
+  stops waiting for it after min(remaining time, TIMEOUT_SECONDS),
+  raising DeadlineExceeded so the caller can answer with a fallback
+  (what the tools already did, or an FAQ match) within the SLA.
+- A LangChain callback (DeadlineGuard) refuses to start an LLM call once
+  the deadline has passed or the request was given up on, and stops a
+  streaming one at its next token, so an abandoned crew gives its thread
+  and pooled instance back instead of running on in the background.
+- Tools call `check_deadline()` before doing work, and `record_result()`
+  what they did, so a fallback answer can still report e.g. a ticket id.
+"""
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.tracers.context import register_configure_hook
+from config.constraints import TIMEOUT_SECONDS
+from config.settings import settings
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a stage cannot finish within the request's remaining time."""
+    def __init__(self, stage: str):
+        super().__init__(f"Deadline exceeded during {stage}")
+        self.stage = stage
+
+
+class Deadline:
+    """Absolute deadline of one request, on the monotonic clock."""
+    def __init__(self, seconds: float):
+        self.started = time.monotonic()
+        self.expires_at = self.started + seconds
+        self._cancelled = False
+        # (stage, output) of the tool calls that completed in time
+        self.results: List[Tuple[str, str]] = []
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    @property
+    def expired(self) -> bool:
+        return self._cancelled or time.monotonic() >= self.expires_at
+
+    def cancel(self):
+        """Marks the request as given up on: in-flight stages stop at their next check."""
+        self._cancelled = True
+
+    def stage_timeout(self, reserve: float = 0.0) -> float:
+        """Seconds a stage may take: the remaining time minus `reserve`, at most TIMEOUT_SECONDS."""
+        return max(0.0, min(self.remaining() - reserve, TIMEOUT_SECONDS))
+
+
+class DeadlineGuard(BaseCallbackHandler):
+    """Aborts LLM calls that would start, or still be streaming, after the deadline."""
+    raise_error = True
+
+    def __init__(self, deadline: Deadline):
+        self.deadline = deadline
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        if self.deadline.expired:
+            raise DeadlineExceeded("llm call")
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        if self.deadline.expired:
+            raise DeadlineExceeded("llm call")
+
+    def on_llm_new_token(self, token: str, **kwargs):
+        if self.deadline.expired:
+            raise DeadlineExceeded("llm call")
+
+
+_current_deadline: ContextVar[Optional[Deadline]] = ContextVar("request_deadline", default=None)
+_current_guard: ContextVar[Optional[DeadlineGuard]] = ContextVar("deadline_guard", default=None)
+# LangChain adds the active guard to every callback manager configured in this context
+register_configure_hook(_current_guard, inheritable=True)
+
+
+@contextmanager
+def deadline_scope(deadline: Optional[Deadline]) -> Iterator[Optional[Deadline]]:
+    """Makes `deadline` the current one in this thread (no-op when None)."""
+    if deadline is None:
+        yield None
+        return
+    deadline_token = _current_deadline.set(deadline)
+    guard_token = _current_guard.set(DeadlineGuard(deadline))
+    try:
+        yield deadline
+    finally:
+        _current_guard.reset(guard_token)
+        _current_deadline.reset(deadline_token)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current_deadline.get()
+
+
+def check_deadline(stage: str):
+    """Raises DeadlineExceeded if the current request is out of time."""
+    deadline = _current_deadline.get()
+    if deadline is not None and deadline.expired:
+        raise DeadlineExceeded(stage)
+
+
+def record_result(stage: str, output: str):
+    """Notes a completed tool result on the current request, for fallback answers."""
+    deadline = _current_deadline.get()
+    if deadline is not None:
+        deadline.results.append((stage, output))
+
+
+# Threads for stages run under a timeout. An abandoned stage keeps its thread
+# until its LLM call streams its next token or a tool checks the deadline;
+# new stages queue behind, and that wait counts against their own deadline.
+_stage_pool: Optional[ThreadPoolExecutor] = None
+_stage_pool_lock = threading.Lock()
+
+
+def _get_stage_pool() -> ThreadPoolExecutor:
+    global _stage_pool
+    with _stage_pool_lock:
+        if _stage_pool is None:
+            _stage_pool = ThreadPoolExecutor(max_workers=settings.CREW_MAX_WORKERS * 2, thread_name_prefix="deadline-stage")
+        return _stage_pool
+
+
+def run_stage(stage: str, fn: Callable[..., Any], *args, reserve: float = 0.0, **kwargs) -> Any:
+    """
+    Runs `fn(*args, **kwargs)` as `stage` of the current request. Without a
+    current deadline it runs inline. Otherwise it runs in a helper thread
+    (with this thread's context) for at most `stage_timeout(reserve)`
+    seconds, and DeadlineExceeded is raised when that runs out.
+    """
+    deadline = _current_deadline.get()
+    if deadline is None:
+        return fn(*args, **kwargs)
+    timeout = deadline.stage_timeout(reserve)
+    if timeout <= 0:
+        raise DeadlineExceeded(stage)
+    context = contextvars.copy_context()
+    future = _get_stage_pool().submit(context.run, fn, *args, **kwargs)
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeout:
+        future.cancel()
+        deadline.cancel()
+        raise DeadlineExceeded(stage)
@@ -0,0 +1,552 @@
+"""
+LLM provider gateway.
+
+Every crew LLM call goes, through GatewayChatModel, to the LLMGateway of
+its model (one per OpenAI model, so each tier keeps its own latency
+samples and breakers), which:
+
+- uses the shared, pooled provider clients (see llm.py),
+- retries retryable errors (timeouts, connection errors, 429, 5xx) with
+  full-jitter backoff, at most MAX_RETRIES times per call,
+- optionally hedges: when a call takes longer than the provider's recent
+  p95 latency, a duplicate is sent and the first answer wins,
+- keeps a circuit breaker per provider and fails over, in LLM_PROVIDER
+  then LLM_FALLBACK_PROVIDERS order, to the next provider whose breaker
+  is closed,
+- respects the request deadline (agent/deadline.py): attempts are cut to
+  the remaining time and no retry starts once it has passed.
+
+`stream` yields the completion as the provider generates it; retries and
+failover apply until the first chunk arrives (a stream is never hedged).
+
+The "fake" provider answers locally with a canned reply, for tests and
+load runs without API keys.
+"""
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel, generate_from_stream
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from agent.deadline import DeadlineExceeded, current_deadline
+from agent.llm import get_anthropic_client, get_openai_clients
+from config.constraints import MAX_RETRIES, TIMEOUT_SECONDS
+from config.settings import settings
+
+# Backoff before retry n is uniform in [0, min(cap, base * 2**n)]
+RETRY_BACKOFF_BASE_SECONDS = 0.2
+RETRY_BACKOFF_CAP_SECONDS = 2.0
+# Latency samples kept per provider, and needed before hedging starts
+LATENCY_WINDOW = 200
+HEDGE_MIN_SAMPLES = 20
+
+
+class ProviderError(Exception):
+    """Error raised by a provider, saying whether a retry may succeed."""
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class LLMUnavailable(Exception):
+    """Raised when every provider failed or had its circuit open."""
+
+
+class Completion(NamedTuple):
+    text: str
+    provider: str
+    model: str
+    usage: Dict[str, int]
+    latency: float
+
+
+def is_retryable(error: Exception) -> bool:
+    retryable = getattr(error, "retryable", None)
+    if retryable is not None:
+        return retryable
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in (408, 409, 429) or status >= 500
+    return type(error).__name__ in ("APITimeoutError", "APIConnectionError")
+
+
+class LLMProvider:
+    """One backend. `complete` and `stream` make a single attempt (no retries)."""
+    name = "base"
+
+    def complete(self, messages: List[Dict[str, str]], max_tokens: int, timeout: float, stop: Optional[List[str]] = None) -> Completion:
+        raise NotImplementedError
+
+    def stream(self, messages: List[Dict[str, str]], max_tokens: int, timeout: float, stop: Optional[List[str]] = None) -> Iterator[str]:
+        """Yields the completion text in chunks; by default all at once."""
+        yield self.complete(messages, max_tokens, timeout, stop).text
+
+
+class OpenAIProvider(LLMProvider):
+    name = "openai"
+
+    def __init__(self, model: str):
+        self.model = model
+
+    def complete(self, messages, max_tokens, timeout, stop=None) -> Completion:
+        client = get_openai_clients()[0].with_options(timeout=timeout, max_retries=0)
+        started = time.monotonic()
+        response = client.chat.completions.create(model=self.model, messages=messages, max_tokens=max_tokens, stop=stop)
+        usage = response.usage
+        return Completion(
+            text=response.choices[0].message.content or "",
+            provider=self.name,
+            model=self.model,
+            usage={"prompt_tokens": usage.prompt_tokens, "completion_tokens": usage.completion_tokens} if usage else {},
+            latency=time.monotonic() - started
+        )
+
+    def stream(self, messages, max_tokens, timeout, stop=None) -> Iterator[str]:
+        client = get_openai_clients()[0].with_options(timeout=timeout, max_retries=0)
+        response = client.chat.completions.create(model=self.model, messages=messages, max_tokens=max_tokens, stop=stop, stream=True)
+        try:
+            for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            response.close()
+
+
+class AnthropicProvider(LLMProvider):
+    name = "anthropic"
+
+    def __init__(self, model: str):
+        self.model = model
+
+    @staticmethod
+    def _request(messages, stop) -> Tuple[List[Dict[str, str]], Dict[str, Any]]:
+        # Anthropic takes the system prompt separately
+        system = "\n\n".join(m["content"] for m in messages if m["role"] == "system")
+        turns = [m for m in messages if m["role"] != "system"]
+        kwargs = {"system": system} if system else {}
+        if stop:
+            kwargs["stop_sequences"] = stop
+        return turns, kwargs
+
+    def complete(self, messages, max_tokens, timeout, stop=None) -> Completion:
+        client = get_anthropic_client().with_options(timeout=timeout, max_retries=0)
+        turns, kwargs = self._request(messages, stop)
+        started = time.monotonic()
+        response = client.messages.create(model=self.model, max_tokens=max_tokens, messages=turns, **kwargs)
+        return Completion(
+            text="".join(block.text for block in response.content if getattr(block, "type", "text") == "text"),
+            provider=self.name,
+            model=self.model,
+            usage={"prompt_tokens": response.usage.input_tokens, "completion_tokens": response.usage.output_tokens},
+            latency=time.monotonic() - started
+        )
+
+    def stream(self, messages, max_tokens, timeout, stop=None) -> Iterator[str]:
+        client = get_anthropic_client().with_options(timeout=timeout, max_retries=0)
+        turns, kwargs = self._request(messages, stop)
+        response = client.messages.create(model=self.model, max_tokens=max_tokens, messages=turns, stream=True, **kwargs)
+        try:
+            for event in response:
+                if event.type == "content_block_delta" and getattr(event.delta, "text", None):
+                    yield event.delta.text
+        finally:
+            response.close()
+
+
+class FakeProvider(LLMProvider):
+    """
+    Local stand-in: sleeps `latency` seconds and fails with probability
+    `failure_rate`. Prompts asking for a ReAct "Final Answer:" get one, so
+    a crew can run end to end.
+    """
+    name = "fake"
+
+    def __init__(self, latency: float = 0.0, failure_rate: float = 0.0, reply: str = "This is a canned response from the fake LLM provider.", seed: Optional[int] = None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.reply = reply
+        self._random = random.Random(seed)
+
+    def complete(self, messages, max_tokens, timeout, stop=None) -> Completion:
+        started = time.monotonic()
+        if self.latency > timeout:
+            time.sleep(timeout)
+            raise ProviderError("fake provider timed out")
+        time.sleep(self.latency)
+        if self._random.random() < self.failure_rate:
+            raise ProviderError("fake provider failure")
+        prompt = "\n".join(m["content"] for m in messages)
+        text = f"Thought: I now know the final answer\nFinal Answer: {self.reply}" if "Final Answer:" in prompt else self.reply
+        return Completion(text=text, provider=self.name, model=self.name, usage={"prompt_tokens": len(prompt) // 4, "completion_tokens": len(text) // 4}, latency=time.monotonic() - started)
+
+    def stream(self, messages, max_tokens, timeout, stop=None) -> Iterator[str]:
+        text = self.complete(messages, max_tokens, timeout, stop).text
+        # Word by word, like a provider streaming tokens
+        for word in text.split(" ")[:-1]:
+            yield word + " "
+        yield text.split(" ")[-1]
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls
+    for `reset_seconds`; then lets one trial call through (half-open), which
+    closes it on success or re-opens it on failure.
+    """
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self.opened_count = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half_open" if time.monotonic() - self._opened_at >= self.reset_seconds else "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_seconds or self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def release_trial(self):
+        """Ends a trial call that was given up on without an outcome; the next call may try again."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                if self._opened_at is None or self._trial_in_flight:
+                    self.opened_count += 1
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+
+class _ProviderState:
+    def __init__(self, provider: LLMProvider, breaker: CircuitBreaker):
+        self.provider = provider
+        self.breaker = breaker
+        self.latencies: "deque[float]" = deque(maxlen=LATENCY_WINDOW)
+        self.counters = {"calls": 0, "failures": 0, "retries": 0, "hedges": 0, "hedge_wins": 0}
+
+    def p95(self) -> Optional[float]:
+        if len(self.latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+
+class LLMGateway:
+    """Routes completions over providers in order of preference; see the module docstring."""
+    def __init__(
+        self,
+        providers: List[LLMProvider],
+        max_retries: int = MAX_RETRIES,
+        hedge: bool = False,
+        breaker_failures: int = 5,
+        breaker_reset_seconds: float = 30.0,
+        max_workers: int = 16
+    ):
+        if not providers:
+            raise ValueError("LLMGateway needs at least one provider")
+        self.max_retries = max_retries
+        self.hedge = hedge
+        self._states = [_ProviderState(p, CircuitBreaker(breaker_failures, breaker_reset_seconds)) for p in providers]
+        self._lock = threading.Lock()
+        self._failovers = 0
+        # Hedged calls need a thread each for the original and the duplicate
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-hedge") if hedge else None
+
+    @property
+    def providers(self) -> List[str]:
+        return [state.provider.name for state in self._states]
+
+    def _attempt_timeout(self) -> float:
+        deadline = current_deadline()
+        if deadline is None:
+            return TIMEOUT_SECONDS
+        if deadline.expired:
+            raise DeadlineExceeded("llm call")
+        return min(TIMEOUT_SECONDS, deadline.remaining())
+
+    def _call(self, state: _ProviderState, messages, max_tokens, stop) -> Completion:
+        timeout = self._attempt_timeout()
+        p95 = state.p95() if self._pool is not None else None
+        if p95 is None or p95 >= timeout:
+            return state.provider.complete(messages, max_tokens, timeout, stop)
+
+        first = self._pool.submit(state.provider.complete, messages, max_tokens, timeout, stop)
+        done, _ = wait([first], timeout=p95)
+        if done:
+            return first.result()
+        # Slower than 95% of recent calls: race a duplicate against it
+        with self._lock:
+            state.counters["hedges"] += 1
+        second = self._pool.submit(state.provider.complete, messages, max_tokens, max(0.0, timeout - p95), stop)
+        pending = {first, second}
+        error: Optional[Exception] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is second:
+                        with self._lock:
+                            state.counters["hedge_wins"] += 1
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def _failover(self, call: Callable[[_ProviderState], Any], track_latency: bool = True) -> Tuple[_ProviderState, Any]:
+        """Runs `call` on the first healthy provider, with retries; returns (state, result)."""
+        retries_left = self.max_retries
+        errors = []
+        for index, state in enumerate(self._states):
+            if not state.breaker.allow():
+                errors.append(f"{state.provider.name}: circuit open")
+                continue
+            if index > 0 and errors:
+                with self._lock:
+                    self._failovers += 1
+            attempt = 0
+            while True:
+                started = time.monotonic()
+                try:
+                    with self._lock:
+                        state.counters["calls"] += 1
+                    result = call(state)
+                except DeadlineExceeded:
+                    # No verdict on the provider, but a half-open trial must not stay taken
+                    state.breaker.release_trial()
+                    raise
+                except Exception as e:
+                    with self._lock:
+                        state.counters["failures"] += 1
+                    state.breaker.record_failure()
+                    errors.append(f"{state.provider.name}: {type(e).__name__}: {e}")
+                    if not is_retryable(e) or retries_left <= 0 or not state.breaker.allow():
+                        break
+                    retries_left -= 1
+                    with self._lock:
+                        state.counters["retries"] += 1
+                    # Full jitter, never sleeping past the deadline
+                    delay = random.uniform(0, min(RETRY_BACKOFF_CAP_SECONDS, RETRY_BACKOFF_BASE_SECONDS * 2 ** attempt))
+                    deadline = current_deadline()
+                    if deadline is not None and delay >= deadline.remaining():
+                        raise DeadlineExceeded("llm retry")
+                    time.sleep(delay)
+                    attempt += 1
+                    continue
+                state.breaker.record_success()
+                if track_latency:
+                    with self._lock:
+                        state.latencies.append(time.monotonic() - started)
+                return state, result
+        raise LLMUnavailable("; ".join(errors) or "no LLM provider available")
+
+    def complete(self, messages: List[Dict[str, str]], max_tokens: int = 1024, stop: Optional[List[str]] = None) -> Completion:
+        """
+        Completes `messages` ([{"role", "content"}]) on the first healthy
+        provider. Raises LLMUnavailable when all fail, DeadlineExceeded when
+        the request runs out of time.
+        """
+        return self._failover(lambda state: self._call(state, messages, max_tokens, stop))[1]
+
+    def stream(self, messages: List[Dict[str, str]], max_tokens: int = 1024, stop: Optional[List[str]] = None) -> Iterator[str]:
+        """
+        Like `complete`, but yields the text as it is generated. A provider
+        that fails before its first chunk is retried or failed over; once
+        text has been yielded, an error reaches the caller.
+        """
+        def first_chunk(state: _ProviderState):
+            chunks = state.provider.stream(messages, max_tokens, self._attempt_timeout(), stop)
+            return next(chunks, ""), chunks
+
+        # Time to first chunk is not a completion latency, so it stays out of the hedging p95
+        state, (first, chunks) = self._failover(first_chunk, track_latency=False)
+        if first:
+            yield first
+        try:
+            yield from chunks
+        except Exception:
+            with self._lock:
+                state.counters["failures"] += 1
+            state.breaker.record_failure()
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            providers = {
+                state.provider.name: dict(
+                    state.counters,
+                    circuit=state.breaker.state,
+                    circuit_opened=state.breaker.opened_count,
+                    p95_ms=round(state.p95() * 1000, 1) if state.p95() is not None else None
+                )
+                for state in self._states
+            }
+            return {"hedging": self.hedge, "failovers": self._failovers, "providers": providers}
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+class GatewayChatModel(BaseChatModel):
+    """
+    LangChain chat model backed by the gateway, so CrewAI agents get its
+    retries and failover. With `streaming`, completions are streamed and
+    each chunk reaches the callbacks (on_llm_new_token) as it arrives.
+    """
+    gateway: Any
+    # Model of the preferred provider, reported to callbacks (cost tracking)
+    model_name: str = "unknown"
+    max_tokens: int = 1024
+    streaming: bool = False
+
+    @property
+    def _llm_type(self) -> str:
+        return "supportmax-gateway"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model_name": self.model_name, "max_tokens": self.max_tokens}
+
+    @staticmethod
+    def _payload(messages: List[BaseMessage]) -> List[Dict[str, str]]:
+        roles = {"human": "user", "ai": "assistant", "system": "system"}
+        return [{"role": roles.get(m.type, "user"), "content": str(m.content)} for m in messages]
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> Iterator[ChatGenerationChunk]:
+        # Providers that ignore stop sequences: hold back enough text that a
+        # marker split across chunks is still caught before it is emitted
+        hold = max((len(marker) for marker in stop or []), default=1) - 1
+        pending = ""
+        stopped = False
+        chunks = self.gateway.stream(self._payload(messages), max_tokens=self.max_tokens, stop=stop)
+        try:
+            for text in chunks:
+                pending += text
+                cuts = [pending.index(marker) for marker in stop or [] if marker in pending]
+                if cuts:
+                    pending, stopped = pending[:min(cuts)], True
+                ready = pending if stopped else pending[:max(0, len(pending) - hold)]
+                pending = pending[len(ready):]
+                if ready:
+                    chunk = ChatGenerationChunk(message=AIMessageChunk(content=ready))
+                    yield chunk
+                    if run_manager:
+                        # Raises once the request's deadline has passed (DeadlineGuard)
+                        run_manager.on_llm_new_token(ready, chunk=chunk)
+                if stopped:
+                    return
+        finally:
+            # Also ends the provider's stream when a callback aborts the call
+            chunks.close()
+        if pending:
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=pending))
+            yield chunk
+            if run_manager:
+                run_manager.on_llm_new_token(pending, chunk=chunk)
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        if self.streaming:
+            return generate_from_stream(self._stream(messages, stop=stop, run_manager=run_manager, **kwargs))
+        completion = self.gateway.complete(self._payload(messages), max_tokens=self.max_tokens, stop=stop)
+        text = completion.text
+        for marker in stop or []:
+            # Providers that ignore stop sequences
+            if marker in text:
+                text = text[:text.index(marker)]
+        usage = dict(completion.usage, total_tokens=sum(completion.usage.values()))
+        return ChatResult(
+            generations=[ChatGeneration(message=AIMessage(content=text))],
+            llm_output={"token_usage": usage, "model_name": completion.model}
+        )
+
+
+def _build_provider(name: str, model: str) -> Optional[LLMProvider]:
+    if name == "openai" and settings.OPENAI_API_KEY:
+        return OpenAIProvider(model)
+    if name == "anthropic" and settings.ANTHROPIC_API_KEY:
+        return AnthropicProvider(settings.ANTHROPIC_MODEL)
+    if name == "fake":
+        return FakeProvider(latency=settings.FAKE_LLM_LATENCY_MS / 1000, failure_rate=settings.FAKE_LLM_FAILURE_RATE)
+    return None
+
+
+_gateways: Dict[str, LLMGateway] = {}
+_gateway_lock = threading.Lock()
+
+
+def get_llm_gateway(model: Optional[str] = None) -> Optional[LLMGateway]:
+    """
+    The process-wide gateway of OpenAI `model` (default OPENAI_MODEL) over
+    LLM_PROVIDER and LLM_FALLBACK_PROVIDERS, skipping providers without an
+    API key. None when none is configured.
+    """
+    model = model or settings.OPENAI_MODEL
+    with _gateway_lock:
+        if model not in _gateways:
+            names = [settings.LLM_PROVIDER] + [n.strip() for n in settings.LLM_FALLBACK_PROVIDERS.split(",") if n.strip()]
+            providers = []
+            for name in dict.fromkeys(names):
+                provider = _build_provider(name, model)
+                if provider is not None:
+                    providers.append(provider)
+            if not providers:
+                return None
+            _gateways[model] = LLMGateway(
+                providers,
+                hedge=settings.LLM_HEDGE_ENABLED,
+                breaker_failures=settings.LLM_BREAKER_FAILURES,
+                breaker_reset_seconds=settings.LLM_BREAKER_RESET_SECONDS
+            )
+        return _gateways[model]
+
+
+def llm_gateway_stats() -> Dict[str, Any]:
+    """Stats of every gateway built so far, by model."""
+    with _gateway_lock:
+        return {model: gateway.stats() for model, gateway in _gateways.items()}
+
+
+def close_llm_gateways():
+    with _gateway_lock:
+        for gateway in _gateways.values():
+            gateway.close()
+        _gateways.clear()
@@ -0,0 +1,125 @@
+"""
+Load-aware model tiering.
+
+Two tiers of the same crew:
+- "standard": the agents answer with OPENAI_MODEL;
+- "economy":  everything runs on OPENAI_FAST_MODEL.
+The hierarchical manager and the QA review use OPENAI_FAST_MODEL in both
+tiers (see agent/agents.py).
+
+Once BUDGET_EXHAUSTED_RATIO of the daily budget is spent, no request is
+routed in any mode: `route` raises BudgetExhausted until the next UTC day.
+Otherwise, in "adaptive" mode each request is routed, in order of precedence:
+1. economy once BUDGET_DOWNGRADE_RATIO of the daily budget is spent,
+2. economy while the crew wait queue is QUEUE_DOWNGRADE_RATIO full,
+3. economy for simple intents (small talk, recall, general questions),
+4. standard for technical and sensitive messages.
+"""
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+from agent.cost_tracker import CostTracker, get_cost_tracker
+from agent.reflection import classify_intent
+from config.constraints import BUDGET_DOWNGRADE_RATIO, BUDGET_EXHAUSTED_RATIO, QUEUE_DOWNGRADE_RATIO
+from config.settings import settings
+
+MODEL_TIERS = ("standard", "economy")
+# Intents the economy model handles as well as the standard one
+SIMPLE_INTENTS = ("small_talk", "recall", "general")
+# Recent run times kept per tier for the latency percentiles
+LATENCY_WINDOW = 200
+
+
+class BudgetExhausted(Exception):
+    """Raised instead of a route once the daily LLM budget is spent."""
+    def __init__(self, retry_after: int):
+        super().__init__(f"Daily LLM budget exhausted, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+def tier_model(tier: str) -> str:
+    """Model the agents of `tier` answer with."""
+    if tier not in MODEL_TIERS:
+        raise ValueError(f"Unknown model tier: {tier}")
+    return settings.OPENAI_MODEL if tier == "standard" else settings.OPENAI_FAST_MODEL
+
+
+def _percentile(values, q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class ModelRouter:
+    """
+    Picks the model tier of each request and keeps per-tier counts and run times.
+
+    mode: "adaptive" routes per request, "standard" or "economy" pins the tier.
+    """
+    def __init__(self, tracker: Optional[CostTracker] = None, mode: str = "adaptive", max_queue: int = 16):
+        if mode not in ("adaptive",) + MODEL_TIERS:
+            raise ValueError(f"Unknown model routing mode: {mode}")
+        self.tracker = tracker or get_cost_tracker()
+        self.mode = mode
+        self.max_queue = max_queue
+        self._lock = threading.Lock()
+        self._routes: Dict[str, Dict[str, int]] = {tier: {} for tier in MODEL_TIERS}
+        self._latencies: Dict[str, Deque[float]] = {tier: deque(maxlen=LATENCY_WINDOW) for tier in MODEL_TIERS}
+        self._rejected = 0
+
+    def _pick(self, message: str, queue_depth: int):
+        intent = classify_intent(message)
+        if self.mode != "adaptive":
+            return self.mode, f"policy_{self.mode}", intent
+        if self.tracker.budget_used() >= BUDGET_DOWNGRADE_RATIO:
+            return "economy", "daily_budget", intent
+        if self.max_queue > 0 and queue_depth >= QUEUE_DOWNGRADE_RATIO * self.max_queue:
+            return "economy", "queue_depth", intent
+        if intent in SIMPLE_INTENTS:
+            return "economy", "simple_intent", intent
+        return "standard", f"{intent}_intent", intent
+
+    def budget_exhausted(self) -> bool:
+        return self.tracker.budget_used() >= BUDGET_EXHAUSTED_RATIO
+
+    def route(self, message: str, queue_depth: int = 0) -> Dict[str, Any]:
+        """
+        Routing decision for a message: tier, model, reason and intent.
+        Raises BudgetExhausted once the daily budget is spent.
+        """
+        if self.budget_exhausted():
+            with self._lock:
+                self._rejected += 1
+            raise BudgetExhausted(self.tracker.seconds_until_reset())
+        tier, reason, intent = self._pick(message, queue_depth)
+        with self._lock:
+            self._routes[tier][reason] = self._routes[tier].get(reason, 0) + 1
+        return {"tier": tier, "model": tier_model(tier), "reason": reason, "intent": intent}
+
+    def record(self, tier: str, seconds: float):
+        """Records the run time of a request served by `tier`."""
+        with self._lock:
+            self._latencies[tier].append(seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            tiers = {}
+            for tier in MODEL_TIERS:
+                latencies = list(self._latencies[tier])
+                p50, p95 = _percentile(latencies, 0.5), _percentile(latencies, 0.95)
+                tiers[tier] = {
+                    "model": tier_model(tier),
+                    "requests": sum(self._routes[tier].values()),
+                    "reasons": dict(self._routes[tier]),
+                    "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+                    "p95_ms": round(p95 * 1000, 1) if p95 is not None else None
+                }
+            rejected = self._rejected
+        return {
+            "mode": self.mode,
+            "budget_used": round(self.tracker.budget_used(), 4),
+            "budget_exhausted": self.budget_exhausted(),
+            "rejected_budget_exhausted": rejected,
+            "tiers": tiers
+        }
@@ -0,0 +1,218 @@
+"""
+Adaptive reflection: decides per request how much review a draft gets.
+
+Tiers, cheapest first:
+- "skip":  the draft is returned as is (small talk answered without tools).
+- "rules": cheap local checks (length, tone, forbidden content, ticket id);
+           a failing draft is escalated to the full review.
+- "full":  the QA agent reviews and refines the draft (one more LLM call).
+
+The decision uses what happened during the triage run: the tools whose
+output backs the draft (knowledge base, ticket), how strongly the
+retrievers agreed on the top passage, and the intent of the message.
+Tools report into the active RunTrace, found through a context variable
+like the token budget (see context_packer.py).
+"""
+import re
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+from config.constraints import MAX_DRAFT_CHARS, MIN_DRAFT_CHARS, RETRIEVAL_AGREEMENT_RANK
+from config.settings import settings
+
+TIERS = ("skip", "rules", "full")
+
+_SMALL_TALK = re.compile(
+    r"^\W*(hi|hello|hey|thanks|thank you|thx|ok(ay)?|great|cool|bye|goodbye|good (morning|afternoon|evening))\b[\w\s!.,]{0,20}$",
+    re.IGNORECASE
+)
+_RECALL = re.compile(r"\b(my name|who am i|what did i (say|ask)|remind me what|what was my)\b", re.IGNORECASE)
+# Topics where a wrong or careless answer is costly: always fully reviewed
+_SENSITIVE = re.compile(
+    r"\b(refund|charge[ds]?|billing|invoice|payment|cancel\w*|legal|lawyer|lawsuit|gdpr|privacy|"
+    r"security|breach|hacked|fraud|complain\w*|unacceptable|angry|furious|escalate)\b",
+    re.IGNORECASE
+)
+_TECHNICAL = re.compile(
+    r"\b(error|exception|crash\w*|bug|stack ?trace|not working|doesn'?t work|fails?|failed|failing|"
+    r"timeout|install\w*|configur\w*|api|sdk|integration|webhook)\b",
+    re.IGNORECASE
+)
+
+# Draft checks for the "rules" tier
+_LEAKED_SCAFFOLDING = re.compile(r"^\s*(Thought|Action|Action Input|Observation|Final Answer):", re.MULTILINE)
+_PLACEHOLDER = re.compile(r"\[(your|customer|user|insert)[^\]]*\]", re.IGNORECASE)
+_SECRET = re.compile(r"\b(sk-[A-Za-z0-9]{16,}|AKIA[0-9A-Z]{16})\b|(?i:api[_ ]?key\s*[:=]\s*\S{8,})")
+_SELF_REFERENCE = re.compile(r"\bas an ai\b|\blanguage model\b|\bmy (system )?prompt\b", re.IGNORECASE)
+_RUDE = re.compile(r"\b(stupid|idiot|dumb|shut up|obviously you|your fault)\b", re.IGNORECASE)
+_TOOL_FAILURE = re.compile(r"Traceback \(most recent call last\)|\bI encountered an error\b|\bcontext budget for this request is used up\b")
+
+
+def classify_intent(message: str) -> str:
+    """One of "small_talk", "recall", "sensitive", "technical", "general"."""
+    if _SMALL_TALK.match(message):
+        return "small_talk"
+    if _SENSITIVE.search(message):
+        return "sensitive"
+    if _RECALL.search(message):
+        return "recall"
+    if _TECHNICAL.search(message):
+        return "technical"
+    return "general"
+
+
+def check_draft(draft: str, ticket_ids: Optional[List[str]] = None) -> List[str]:
+    """Names of the rule checks the draft fails (empty when it passes)."""
+    text = draft.strip()
+    issues = []
+    if len(text) < MIN_DRAFT_CHARS:
+        issues.append("too_short")
+    if len(text) > MAX_DRAFT_CHARS:
+        issues.append("too_long")
+    if _LEAKED_SCAFFOLDING.search(text) or _PLACEHOLDER.search(text) or _TOOL_FAILURE.search(text):
+        issues.append("unfinished")
+    if _SECRET.search(text) or _SELF_REFERENCE.search(text):
+        issues.append("forbidden_content")
+    # Shouting: many all-caps words (ids like TICKET-1A2B and short acronyms don't count)
+    words = [w.strip(".,!?;:'\"()") for w in text.split()]
+    shouted = sum(1 for w in words if len(w) > 3 and w.isalpha() and w.isupper())
+    if _RUDE.search(text) or "!!" in text or (shouted >= 3 and shouted > 0.3 * len(words)):
+        issues.append("tone")
+    if ticket_ids and not any(ticket_id in text for ticket_id in ticket_ids):
+        issues.append("missing_ticket_id")
+    return issues
+
+
+class RunTrace:
+    """What the tools of one crew run did, and the reflection decision taken on it."""
+    def __init__(self):
+        self.sources: List[str] = []
+        self.ticket_ids: List[str] = []
+        # Per knowledge base search: ranks of the top passage in each retriever
+        self.retrievals: List[Dict[str, Optional[int]]] = []
+        self.reflection: Dict[str, Any] = {}
+
+    def record_retrieval(self, results: List[Dict[str, Any]]):
+        if "knowledge_base" not in self.sources:
+            self.sources.append("knowledge_base")
+        self.retrievals.append(dict(results[0]["ranks"]) if results else {"vector": None, "bm25": None})
+
+    def record_ticket(self, ticket_id: str):
+        if "ticket" not in self.sources:
+            self.sources.append("ticket")
+        self.ticket_ids.append(ticket_id)
+
+    @property
+    def retrieval_agreement(self) -> bool:
+        """Both retrievers ranked the top passage of some search highly."""
+        return any(
+            r.get("vector") is not None and r.get("bm25") is not None
+            and max(r["vector"], r["bm25"]) <= RETRIEVAL_AGREEMENT_RANK
+            for r in self.retrievals
+        )
+
+
+_current_trace: ContextVar[Optional[RunTrace]] = ContextVar("run_trace", default=None)
+
+
+@contextmanager
+def active_trace(trace: RunTrace) -> Iterator[RunTrace]:
+    """Makes `trace` visible to tools run by the crew in the current thread."""
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+def current_trace() -> Optional[RunTrace]:
+    return _current_trace.get()
+
+
+class ReflectionPolicy:
+    """
+    Picks the reflection tier of each draft and keeps per-tier counts and
+    the typical full review time, used to estimate the latency saved.
+
+    mode: "adaptive" decides per request, "always" reviews every draft
+          with the QA agent, "rules" never calls the QA agent.
+    """
+    def __init__(self, mode: str = "adaptive"):
+        if mode not in ("adaptive", "always", "rules"):
+            raise ValueError(f"Unknown reflection policy: {mode}")
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._counts = {tier: 0 for tier in TIERS}
+        self._escalations = 0
+        self._review_seconds: Optional[float] = None
+        self._saved_seconds = 0.0
+
+    def _initial_tier(self, intent: str, trace: RunTrace):
+        if self.mode == "always":
+            return "full", "policy_always"
+        if self.mode == "rules":
+            return "rules", "policy_rules"
+        if intent == "sensitive":
+            return "full", "sensitive_topic"
+        if "ticket" in trace.sources:
+            return "rules", "ticket_created"
+        if intent == "small_talk" and not trace.sources:
+            return "skip", "small_talk"
+        if intent == "recall" and not trace.sources:
+            return "rules", "answered_from_history"
+        if "knowledge_base" in trace.sources and trace.retrieval_agreement and intent != "technical":
+            return "rules", "retrieval_agreement"
+        return "full", "low_evidence" if intent != "technical" else "technical_issue"
+
+    def decide(self, message: str, draft: str, trace: RunTrace) -> Dict[str, Any]:
+        """Reflection decision for a draft: tier, reason, intent, sources and failed checks."""
+        intent = classify_intent(message)
+        tier, reason = self._initial_tier(intent, trace)
+        issues: List[str] = []
+        if tier == "rules":
+            issues = check_draft(draft, trace.ticket_ids)
+            if issues and self.mode != "rules":
+                tier, reason = "full", "rule_check_failed"
+        return {"tier": tier, "reason": reason, "intent": intent, "sources": list(trace.sources), "failed_checks": issues}
+
+    def record(self, decision: Dict[str, Any], review_seconds: Optional[float] = None):
+        """
+        Counts a decision. Pass the QA run time for "full" reviews; other
+        tiers get `saved_ms`, the typical review time they avoided.
+        """
+        with self._lock:
+            self._counts[decision["tier"]] += 1
+            if decision["reason"] == "rule_check_failed":
+                self._escalations += 1
+            if review_seconds is not None:
+                # Exponentially weighted, so the estimate follows model latency
+                previous = self._review_seconds
+                self._review_seconds = review_seconds if previous is None else 0.8 * previous + 0.2 * review_seconds
+                decision["review_ms"] = round(review_seconds * 1000, 1)
+            elif self._review_seconds is not None:
+                self._saved_seconds += self._review_seconds
+                decision["saved_ms"] = round(self._review_seconds * 1000, 1)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "tiers": dict(self._counts),
+                "escalations": self._escalations,
+                "avg_review_ms": round(self._review_seconds * 1000, 1) if self._review_seconds is not None else None,
+                "saved_seconds": round(self._saved_seconds, 2)
+            }
+
+
+_policy: Optional[ReflectionPolicy] = None
+_policy_lock = threading.Lock()
+
+
+def get_reflection_policy() -> ReflectionPolicy:
+    """Process-wide policy shared by the pooled crews."""
+    global _policy
+    with _policy_lock:
+        if _policy is None:
+            _policy = ReflectionPolicy(settings.REFLECTION_POLICY)
+        return _policy
@@ -1,10 +1,30 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
+from functools import partial
 from typing import Dict, Any, Optional
+from agent.context_packer import ContextBudget
+from agent.cost_tracker import RequestUsage, get_cost_tracker
 from agent.crew import SupportCrew
+from agent.crew_pool import CrewPool
+from agent.deadline import Deadline, DeadlineExceeded, deadline_scope, run_stage
+from agent.fallback import fallback_answer
+from agent.model_router import MODEL_TIERS, BudgetExhausted, ModelRouter
+from agent.reflection import RunTrace, get_reflection_policy
+from agent.llm import close_openai_clients
+from agent.llm_gateway import close_llm_gateways, llm_gateway_stats
+from config.constraints import FALLBACK_RESERVE_SECONDS, MAX_RESPONSE_TIME_SECONDS, MAX_TOKENS_PER_QUERY
 from config.settings import settings
+from api.executor import CrewExecutor, ExecutorSaturated
+from api.streaming import EventChannel, format_sse
+from api.response_cache import ResponseCache, is_session_dependent, references_session
+from api.singleflight import SingleFlight, flight_key
+from knowledge.vector_store import read_kb_version, vector_store_stats
+from knowledge.embeddings import close_embedder, get_embedder
 import uvicorn
 import logging
+import time
 import sys
 import os
 
@@ -40,51 +60,359 @@ class ChatResponse(BaseModel):
 
 @app.get(f"{settings.API_V1_STR}/health")
 async def health_check():
-    return {"status": "healthy", "version": "v2.0-cognitive"}
+    return {"status": "healthy", "version": "v2.0-cognitive", "memory": memory_store.stats()}
 
 from memory.memory_store import MemoryStore
 
 # Initialize Memory Store
 memory_store = MemoryStore()
 
+# Dedicated pool for blocking crew runs, with admission control
+crew_executor = CrewExecutor(max_workers=settings.CREW_MAX_WORKERS, max_queue=settings.CREW_MAX_QUEUE)
+# Pre-built crews (agents, memory, embedder) reused across requests, one per
+# worker and model tier; the router picks the tier of each request
+crew_pools = {
+    tier: CrewPool(partial(SupportCrew, tier), size=settings.CREW_MAX_WORKERS)
+    for tier in MODEL_TIERS
+}
+model_router = ModelRouter(mode=settings.MODEL_ROUTING, max_queue=settings.CREW_MAX_QUEUE)
+# Session-independent answers are shared across users through the cache
+response_cache = ResponseCache(
+    embed_fn=get_embedder().embed if settings.OPENAI_API_KEY or settings.EMBEDDING_PROVIDER == "local" else None,
+    similarity_threshold=settings.RESPONSE_CACHE_SIMILARITY,
+    max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.RESPONSE_CACHE_TTL_SECONDS,
+    version_fn=read_kb_version
+) if settings.RESPONSE_CACHE_ENABLED else None
+# Concurrent identical questions share one crew run
+singleflight = SingleFlight()
+
+@app.get(f"{settings.API_V1_STR}/metrics")
+async def metrics():
+    return {
+        "crew_executor": crew_executor.stats(),
+        "crew_pool": {tier: pool.stats() for tier, pool in crew_pools.items()},
+        "response_cache": response_cache.stats() if response_cache else None,
+        "singleflight": singleflight.stats(),
+        "embeddings": get_embedder().stats(),
+        "llm_gateway": llm_gateway_stats(),
+        "retrieval": vector_store_stats(),
+        "reflection": get_reflection_policy().stats(),
+        "cost": get_cost_tracker().stats(),
+        "model_routing": model_router.stats(),
+        "memory": memory_store.stats()
+    }
+
+@app.on_event("startup")
+def warm_crews():
+    # Build the pooled crews before the first request rather than during it
+    try:
+        for tier, pool in crew_pools.items():
+            if settings.MODEL_ROUTING in ("adaptive", tier):
+                pool.warm()
+    except Exception as e:
+        logger.warning(f"Could not pre-build crews, they will be built on first use: {e}")
+
+@app.on_event("shutdown")
+def on_shutdown():
+    # Persist any write-behind backlog before the worker exits
+    crew_executor.shutdown()
+    memory_store.close()
+    close_embedder()
+    close_llm_gateways()
+    close_openai_clients()
+
+def request_deadline() -> Optional[Deadline]:
+    """Deadline of a request, started on arrival so queueing time counts against it."""
+    return Deadline(MAX_RESPONSE_TIME_SECONDS) if settings.DEADLINE_ENFORCED else None
+
+def run_crew(
+    message: str,
+    user_id: str,
+    chat_history: str,
+    on_event=None,
+    budget: Optional[ContextBudget] = None,
+    trace: Optional[RunTrace] = None,
+    route: Optional[Dict[str, Any]] = None,
+    usage: Optional[RequestUsage] = None,
+    deadline: Optional[Deadline] = None
+):
+    """
+    Runs a pooled crew of the routed tier within `deadline` (see
+    agent/deadline.py), keeping FALLBACK_RESERVE_SECONDS for the fallback.
+    Raises DeadlineExceeded when the crew can't finish in time.
+    """
+    tier = route["tier"] if route else "standard"
+
+    def run_pooled():
+        with crew_pools[tier].checkout() as crew:
+            started = time.monotonic()
+            result = crew.run(message, user_id=user_id, chat_history=chat_history, on_event=on_event, budget=budget, trace=trace, usage=usage)
+        model_router.record(tier, time.monotonic() - started)
+        return result
+
+    with deadline_scope(deadline):
+        return run_stage("crew", run_pooled, reserve=FALLBACK_RESERVE_SECONDS)
+
+def route_request(message: str) -> Dict[str, Any]:
+    """Model tier for a new request, from its intent, the daily spend and the crew queue."""
+    return model_router.route(message, queue_depth=crew_executor.stats()["queue_depth"])
+
+def remember_turn(user_id: str, message: str, response_text: str):
+    # Save interaction to memory
+    memory_store.add_message(user_id, "user", message)
+    memory_store.add_message(user_id, "assistant", response_text)
+
+def record_turn(
+    user_id: str,
+    message: str,
+    result,
+    budget: ContextBudget,
+    trace: RunTrace,
+    route: Dict[str, Any],
+    usage: RequestUsage
+) -> ChatResponse:
+    result_str = str(result)
+    remember_turn(user_id, message, result_str)
+    
+    # Tickets come from what the tool did (trace): the answer may word them any way
+    action_taken = "general_response"
+    if trace.ticket_ids or "Ticket created" in result_str:
+        action_taken = "create_ticket"
+    elif "Found relevant information" in result_str:
+        action_taken = "answer_rag"
+
+    context_tokens = budget.report()
+    logger.info(f"Prompt tokens for {user_id}: {context_tokens['used']}/{context_tokens['budget']} {context_tokens['sections']}")
+    llm_usage = usage.report()
+    logger.info(
+        f"LLM usage for {user_id}: {llm_usage['llm_calls']} calls, ${llm_usage['cost_usd']:.4f} "
+        f"({route['tier']} tier, {route['reason']})"
+    )
+        
+    return ChatResponse(
+        response=result_str,
+        action_taken=action_taken,
+        metadata={
+            "engine": "crewai-v2-cognitive",
+            "memory_enabled": True,
+            "reflection_enabled": trace.reflection.get("tier") == "full",
+            "reflection": trace.reflection,
+            "ticket_ids": list(trace.ticket_ids),
+            "history_length": len(memory_store.get_history(user_id)),
+            "context_tokens": context_tokens,
+            "model_tier": route,
+            "usage": llm_usage
+        }
+    )
+
+def fallback_turn(
+    user_id: str,
+    message: str,
+    deadline: Deadline,
+    stage: str,
+    trace: RunTrace,
+    route: Dict[str, Any],
+    usage: RequestUsage
+) -> ChatResponse:
+    """Degraded answer for a turn whose crew run missed the deadline, recorded in memory."""
+    logger.warning(f"Deadline exceeded during {stage} for {user_id}, answered with a fallback")
+    answer = fallback_answer(message, deadline, stage)
+    remember_turn(user_id, message, answer["text"])
+    return ChatResponse(
+        response=answer["text"],
+        action_taken=answer["action_taken"],
+        metadata=dict(
+            answer["metadata"],
+            engine="fallback",
+            memory_enabled=True,
+            ticket_ids=list(trace.ticket_ids),
+            history_length=len(memory_store.get_history(user_id)),
+            model_tier=route,
+            usage=usage.report()
+        )
+    )
+
+def cached_turn(user_id: str, message: str) -> Optional[ChatResponse]:
+    """
+    Serves a cached answer and records the turn in the user's memory.
+    Messages that refer back to the conversation always go to the crew.
+    """
+    if response_cache is None or references_session(message):
+        return None
+    cached = response_cache.get(message)
+    if not cached:
+        return None
+    remember_turn(user_id, message, cached["response"])
+    cached["metadata"]["history_length"] = len(memory_store.get_history(user_id))
+    return ChatResponse(**cached)
+
+def created_ticket(response: ChatResponse) -> bool:
+    """True when the run behind `response` created a ticket (a side effect for its requester only)."""
+    return bool(response.metadata.get("ticket_ids")) or response.action_taken == "create_ticket"
+
+def cache_turn(message: str, chat_history: str, response: ChatResponse, compute_seconds: float):
+    # Skip side effects (tickets), degraded answers and answers built from this user's session
+    if response_cache is None or created_ticket(response) or response.metadata.get("degraded"):
+        return
+    if is_session_dependent(message, response.response, chat_history):
+        return
+    response_cache.put(message, response.model_dump(), compute_seconds)
+
+async def answer_turn(user_id: str, message: str, chat_history: str, deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+    """Runs the crew for one turn within `deadline`, then records and caches it."""
+    started = time.monotonic()
+    budget = ContextBudget(MAX_TOKENS_PER_QUERY)
+    trace = RunTrace()
+    usage = RequestUsage()
+    route = route_request(message)
+    # Run Crew on the worker pool so the event loop stays free
+    try:
+        result = await crew_executor.run(
+            run_crew, message, user_id, chat_history, budget=budget, trace=trace, route=route, usage=usage, deadline=deadline
+        )
+    except DeadlineExceeded as e:
+        response = await run_in_threadpool(fallback_turn, user_id, message, deadline, e.stage, trace, route, usage)
+        return {"user_id": user_id, "chat_history": chat_history, "response": response}
+    response = record_turn(user_id, message, result, budget, trace, route, usage)
+    await run_in_threadpool(cache_turn, message, chat_history, response, time.monotonic() - started)
+    return {"user_id": user_id, "chat_history": chat_history, "response": response}
+
+def shared_turn(user_id: str, message: str, shared: Dict[str, Any]) -> Optional[ChatResponse]:
+    """
+    A waiting request's copy of the answer computed for an identical one,
+    recorded in its own memory. None when another user's answer can't be
+    reused: it created a ticket or relies on that user's session.
+    """
+    leader = shared["response"]
+    if shared["user_id"] != user_id and (
+        created_ticket(leader) or is_session_dependent(message, leader.response, shared["chat_history"])
+    ):
+        return None
+    remember_turn(user_id, message, leader.response)
+    response = leader.model_copy(deep=True)
+    response.metadata["coalesced"] = True
+    response.metadata["history_length"] = len(memory_store.get_history(user_id))
+    return response
+
+def saturated_error(e: ExecutorSaturated) -> HTTPException:
+    logger.warning(str(e))
+    return HTTPException(
+        status_code=503,
+        detail="All agents are busy. Please retry shortly.",
+        headers={"Retry-After": str(e.retry_after)}
+    )
+
+def budget_error(e: BudgetExhausted) -> HTTPException:
+    logger.warning(str(e))
+    return HTTPException(
+        status_code=503,
+        detail="The daily usage limit has been reached. Please retry later.",
+        headers={"Retry-After": str(e.retry_after)}
+    )
+
 @app.post(f"{settings.API_V1_STR}/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, background_tasks: BackgroundTasks):
+    deadline = request_deadline()
     try:
         user_id = request.user_id if request.user_id else "default_user"
         
-        # Get history
-        chat_history = memory_store.get_formatted_history(user_id)
-        
-        # Run Crew
-        crew = SupportCrew()
-        result = crew.run(request.message, user_id=user_id, chat_history=chat_history)
+        # Lookups may call the embedding API: keep them off the event loop
+        cached = await run_in_threadpool(cached_turn, user_id, request.message)
+        if cached:
+            background_tasks.add_task(memory_store.summarize_pending, user_id)
+            return cached
         
-        result_str = str(result)
+        # Get history (a session that is not resident is read from disk)
+        chat_history = await run_in_threadpool(memory_store.get_formatted_history, user_id)
         
-        # Save interaction to memory
-        memory_store.add_message(user_id, "user", request.message)
-        memory_store.add_message(user_id, "assistant", result_str)
-        
-        # Heuristic for action taken
-        action_taken = "general_response"
-        if "Ticket created" in result_str:
-            action_taken = "create_ticket"
-        elif "Found relevant information" in result_str:
-            action_taken = "answer_rag"
-            
-        return ChatResponse(
-            response=result_str,
-            action_taken=action_taken,
-            metadata={
-                "engine": "crewai-v2-cognitive",
-                "memory_enabled": True,
-                "reflection_enabled": True,
-                "history_length": len(memory_store.get_history(user_id))
-            }
-        )
+        # Identical questions already in flight share one crew run; messages
+        # that refer back to the conversation only coalesce within the session
+        key = flight_key(request.message, user_id if references_session(request.message) else None)
+        shared, coalesced = await singleflight.do(key, lambda: answer_turn(user_id, request.message, chat_history, deadline))
+        response = shared_turn(user_id, request.message, shared) if coalesced else shared["response"]
+        if response is None:
+            # The shared answer was specific to another user: answer this one separately
+            response = (await answer_turn(user_id, request.message, chat_history, deadline))["response"]
+        # Fold turns that left the recent window into the summary after responding
+        background_tasks.add_task(memory_store.summarize_pending, user_id)
+        return response
             
+    except ExecutorSaturated as e:
+        raise saturated_error(e)
+    except BudgetExhausted as e:
+        raise budget_error(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post(f"{settings.API_V1_STR}/chat/stream")
+async def chat_stream(request: ChatRequest, background_tasks: BackgroundTasks):
+    """
+    Streaming chat over server-sent events. Emits "start" immediately, then
+    live agent events (step, tool_call, tool_result, answer_start, token) for
+    both the triage and the QA review, and finally "final" with the same
+    fields as /chat (or "error").
+    """
+    deadline = request_deadline()
+    user_id = request.user_id if request.user_id else "default_user"
+    cached = await run_in_threadpool(cached_turn, user_id, request.message)
+    if cached:
+        async def cached_events():
+            yield format_sse("start", {"status": "accepted"})
+            yield format_sse("final", cached.model_dump())
+        background_tasks.add_task(memory_store.summarize_pending, user_id)
+        return StreamingResponse(cached_events(), media_type="text/event-stream")
+
+    chat_history = await run_in_threadpool(memory_store.get_formatted_history, user_id)
+    channel = EventChannel()
+    # Routed on arrival, before this request itself joins the queue
+    try:
+        route = route_request(request.message)
+    except BudgetExhausted as e:
+        raise budget_error(e)
+
+    def job():
+        try:
+            started = time.monotonic()
+            budget = ContextBudget(MAX_TOKENS_PER_QUERY)
+            trace = RunTrace()
+            usage = RequestUsage()
+            try:
+                result = run_crew(
+                    request.message, user_id, chat_history, on_event=channel.emit,
+                    budget=budget, trace=trace, route=route, usage=usage, deadline=deadline
+                )
+            except DeadlineExceeded as e:
+                response = fallback_turn(user_id, request.message, deadline, e.stage, trace, route, usage)
+                channel.emit("final", response.model_dump())
+                return
+            response = record_turn(user_id, request.message, result, budget, trace, route, usage)
+            channel.emit("final", response.model_dump())
+            cache_turn(request.message, chat_history, response, time.monotonic() - started)
+        except Exception as e:
+            logger.error(f"Error processing streamed request: {e}")
+            channel.emit("error", {"detail": str(e)})
+        finally:
+            channel.close()
+
+    try:
+        # Admission happens before the response starts, so overload is still a plain 503
+        crew_executor.submit(job)
+    except ExecutorSaturated as e:
+        raise saturated_error(e)
+
+    async def events():
+        yield format_sse("start", {"status": "accepted"})
+        async for chunk in channel.stream():
+            yield chunk
+
+    # Runs once the stream has been fully sent
+    background_tasks.add_task(memory_store.summarize_pending, user_id)
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 if __name__ == "__main__":
     uvicorn.run("api.endpoints:app", host="0.0.0.0", port=8002, reload=True)
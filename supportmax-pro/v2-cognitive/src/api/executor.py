@@ -0,0 +1,121 @@
+import asyncio
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+
+class ExecutorSaturated(Exception):
+    """Raised when every worker is busy and the wait queue is full."""
+    def __init__(self, retry_after: int):
+        super().__init__(f"Crew executor saturated, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class CrewExecutor:
+    """
+    Runs blocking crew/agent calls on a dedicated thread pool so the event
+    loop (and /health) stays responsive while an LLM call is in flight.
+
+    At most `max_workers` jobs run and `max_queue` wait; anything beyond that
+    is rejected immediately with ExecutorSaturated instead of piling up.
+    """
+    def __init__(self, max_workers: int = 4, max_queue: int = 16):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="crew-worker")
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._cancelled = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._total_service = 0.0
+
+    def _retry_after(self) -> int:
+        """Seconds until a slot is likely free, from the observed service time."""
+        with self._lock:
+            avg_service = self._total_service / self._completed if self._completed else 1.0
+            backlog = self._queued + self._running
+        return max(1, math.ceil(avg_service * backlog / self.max_workers))
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Runs `fn(*args, **kwargs)` on the pool and awaits its result."""
+        return await self.submit(fn, *args, **kwargs)
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs) -> "asyncio.Future[Any]":
+        """
+        Admits `fn` immediately (raising ExecutorSaturated if there is no room)
+        and returns a future for its result. Must be called on the event loop.
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise ExecutorSaturated(self._retry_after())
+
+        enqueued_at = time.monotonic()
+        with self._lock:
+            self._queued += 1
+        # Claimed under the lock by whichever comes first: the job starting,
+        # or the caller cancelling while it still waits in the queue
+        state = {"started": False, "abandoned": False}
+
+        def job():
+            started_at = time.monotonic()
+            wait = started_at - enqueued_at
+            with self._lock:
+                if state["abandoned"]:
+                    return None
+                state["started"] = True
+                self._queued -= 1
+                self._running += 1
+                self._total_wait += wait
+                self._max_wait = max(self._max_wait, wait)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._completed += 1
+                    self._total_service += time.monotonic() - started_at
+                self._slots.release()
+
+        def release_if_cancelled(future: "asyncio.Future[Any]"):
+            # A job cancelled before it started never reaches its finally:
+            # give its slot back here (client disconnects, shutdown)
+            if not future.cancelled():
+                return
+            with self._lock:
+                if state["started"]:
+                    return
+                state["abandoned"] = True
+                self._queued -= 1
+                self._cancelled += 1
+            self._slots.release()
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._pool, job)
+        future.add_done_callback(release_if_cancelled)
+        return future
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            started = self._completed + self._running
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "queue_depth": self._queued,
+                "running": self._running,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "cancelled": self._cancelled,
+                "avg_wait_ms": round(1000 * self._total_wait / started, 2) if started else 0.0,
+                "max_wait_ms": round(1000 * self._max_wait, 2),
+            }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,45 @@
+import asyncio
+import json
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+# Comment line sent when nothing happened for a while, so proxies keep the stream open
+KEEPALIVE_SECONDS = 15.0
+
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class EventChannel:
+    """
+    Carries events from a crew worker thread to an SSE response running on
+    the event loop. `emit` and `close` are thread-safe; `stream` yields the
+    formatted events until the channel is closed.
+    """
+    def __init__(self):
+        self._loop = asyncio.get_running_loop()
+        self._queue: "asyncio.Queue[Optional[Tuple[str, Dict[str, Any]]]]" = asyncio.Queue()
+
+    def _put(self, item: Optional[Tuple[str, Dict[str, Any]]]):
+        try:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, item)
+        except RuntimeError:
+            # Event loop already closed (server shutting down); nobody is listening
+            pass
+
+    def emit(self, event: str, data: Dict[str, Any]):
+        self._put((event, data))
+
+    def close(self):
+        self._put(None)
+
+    async def stream(self) -> AsyncIterator[str]:
+        while True:
+            try:
+                item = await asyncio.wait_for(self._queue.get(), timeout=KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if item is None:
+                return
+            yield format_sse(*item)
@@ -0,0 +1,54 @@
+"""
+Production Constraints Definition for v2 Cognitive Agent.
+These constraints are enforced to ensure the agent meets production standards.
+"""
+
+# Latency Constraints (in seconds)
+# Each request's deadline (see agent/deadline.py), and the time kept back
+# from the crew for answering with a fallback instead
+MAX_RESPONSE_TIME_SECONDS = 2.0
+FALLBACK_RESERVE_SECONDS = 0.2
+
+# Cost Constraints
+# Token budget of the triage prompt: instructions, message, history and
+# knowledge base passages together (see agent/context_packer.py)
+MAX_TOKENS_PER_QUERY = 2000
+MAX_MESSAGE_TOKENS = 400
+# LLM spend per UTC day, measured from the usage of every LLM response
+# (see agent/cost_tracker.py)
+MAX_DAILY_COST_USD = 5.0
+# USD per 1K (input, output) tokens, matched on the longest model name prefix;
+# unknown models are charged at the most expensive rate
+MODEL_PRICES_PER_1K = {
+    "gpt-4-turbo": (0.01, 0.03),
+    "gpt-4o-mini": (0.00015, 0.0006),
+    "gpt-4o": (0.005, 0.015),
+    "gpt-4": (0.03, 0.06),
+    "gpt-3.5-turbo": (0.0005, 0.0015),
+}
+
+# Reliability Constraints
+# Retries of a failed LLM call, and the longest any one stage (a crew run,
+# an LLM call) may take, even when the request deadline leaves more
+MAX_RETRIES = 3
+TIMEOUT_SECONDS = 5.0
+
+# Model Tiering (see agent/model_router.py)
+# Every request goes to the economy tier once this share of the daily budget
+# is spent, or while this share of the crew wait queue is occupied
+BUDGET_DOWNGRADE_RATIO = 0.8
+QUEUE_DOWNGRADE_RATIO = 0.5
+# Once this share is spent, requests that would run a crew are refused (503)
+# until the next UTC day, in every routing mode; cached answers are still served
+BUDGET_EXHAUSTED_RATIO = 1.0
+
+# Knowledge Constraints
+# Tokens kept free for retrieved passages however long the history is
+MIN_KNOWLEDGE_TOKENS = 500
+
+# Reflection Constraints (see agent/reflection.py)
+# Drafts outside these lengths always get the full QA review
+MIN_DRAFT_CHARS = 20
+MAX_DRAFT_CHARS = 3000
+# Retrievers "agree" when both rank the top passage within this many places
+RETRIEVAL_AGREEMENT_RANK = 3
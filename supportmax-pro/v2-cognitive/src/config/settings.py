@@ -17,14 +17,107 @@ class Settings(BaseSettings):
     # Model Selection
     LLM_PROVIDER: str = os.getenv("LLM_PROVIDER", "openai")
     OPENAI_MODEL: str = "gpt-4-turbo-preview"
+    # Economy tier: the manager, QA review, summaries, and requests the
+    # router downgrades (simple intents, budget or queue pressure)
+    OPENAI_FAST_MODEL: str = os.getenv("OPENAI_FAST_MODEL", "gpt-3.5-turbo")
+    # "adaptive" picks the tier per request; "standard" or "economy" pins it
+    MODEL_ROUTING: str = os.getenv("MODEL_ROUTING", "adaptive")
     ANTHROPIC_MODEL: str = "claude-3-sonnet-20240229"
     
+    # LLM Gateway (agent/llm_gateway.py)
+    # Providers tried, in order, when LLM_PROVIDER fails or its circuit is open
+    LLM_FALLBACK_PROVIDERS: str = os.getenv("LLM_FALLBACK_PROVIDERS", "openai,anthropic")
+    # Send a duplicate request when a call exceeds the provider's p95 latency
+    LLM_HEDGE_ENABLED: bool = os.getenv("LLM_HEDGE_ENABLED", "false").lower() == "true"
+    # Consecutive failures that open a provider's circuit, and how long it stays open
+    LLM_BREAKER_FAILURES: int = 5
+    LLM_BREAKER_RESET_SECONDS: float = 30.0
+    FAKE_LLM_LATENCY_MS: int = int(os.getenv("FAKE_LLM_LATENCY_MS", "0"))
+    FAKE_LLM_FAILURE_RATE: float = float(os.getenv("FAKE_LLM_FAILURE_RATE", "0"))
+    
+    # Deadlines: stop crew runs at MAX_RESPONSE_TIME_SECONDS and answer with
+    # a fallback (see agent/deadline.py)
+    DEADLINE_ENFORCED: bool = os.getenv("DEADLINE_ENFORCED", "true").lower() == "true"
+
+    # Crew Execution (off the event loop)
+    # Worker threads running crews, and how many requests may wait for one
+    # before /chat answers 503 with Retry-After
+    CREW_MAX_WORKERS: int = int(os.getenv("CREW_MAX_WORKERS", "4"))
+    CREW_MAX_QUEUE: int = int(os.getenv("CREW_MAX_QUEUE", "16"))
+    # Shared OpenAI HTTP pool: connections are kept alive and reused across
+    # requests instead of opening a new pool per crew
+    LLM_MAX_CONNECTIONS: int = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+    LLM_KEEPALIVE_SECONDS: float = 30.0
+    # Embedding provider: "openai" (EMBEDDING_MODEL) or "local" (deterministic
+    # hashed n-grams, no network; for CI, load tests and air-gapped installs)
+    EMBEDDING_PROVIDER: str = os.getenv("EMBEDDING_PROVIDER", "openai")
+    EMBEDDING_MODEL: str = "text-embedding-3-small"
+    LOCAL_EMBEDDING_DIMENSIONS: int = 384
+    # Also keep a local-embedding index and search it when the provider is down
+    EMBEDDING_FALLBACK: bool = os.getenv("EMBEDDING_FALLBACK", "false").lower() == "true"
+    # Embedding cache (LRU, plus an SQLite file when EMBEDDING_CACHE_PATH is set)
+    # and the window in which concurrent embed requests share one API call
+    EMBEDDING_CACHE_SIZE: int = int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))
+    EMBEDDING_CACHE_PATH: Optional[str] = os.getenv("EMBEDDING_CACHE_PATH")
+    EMBEDDING_BATCH_WINDOW_MS: float = float(os.getenv("EMBEDDING_BATCH_WINDOW_MS", "5"))
+    EMBEDDING_BATCH_MAX: int = 128
+    
+    # Response Cache (in front of the crew)
+    # Exact match on the normalized message, then embedding similarity at or
+    # above RESPONSE_CACHE_SIMILARITY. Cleared when the knowledge base is re-ingested.
+    RESPONSE_CACHE_ENABLED: bool = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+    RESPONSE_CACHE_MAX_ENTRIES: int = 1000
+    RESPONSE_CACHE_TTL_SECONDS: int = 3600
+    RESPONSE_CACHE_SIMILARITY: float = 0.92
+    
     # Vector DB Configuration (Long-term Memory)
     CHROMA_PERSIST_DIRECTORY: str = "../../../db/chroma_db_v2"
     COLLECTION_NAME: str = "support_docs_v2"
+    # Options: "chroma", or "numpy" (in-process index, no ChromaDB needed)
+    VECTOR_BACKEND: str = os.getenv("VECTOR_BACKEND", "chroma")
+    # NumPy index: "flat" (exact) or "ivf" (clustered), stored as "float32" or "int8"
+    VECTOR_INDEX_KIND: str = os.getenv("VECTOR_INDEX_KIND", "flat")
+    VECTOR_INDEX_DTYPE: str = os.getenv("VECTOR_INDEX_DTYPE", "float32")
+    # Hybrid retrieval: BM25 and vector results (HYBRID_CANDIDATES each)
+    # merged by reciprocal rank fusion, sum(weight / (RRF_K + rank))
+    HYBRID_SEARCH_ENABLED: bool = os.getenv("HYBRID_SEARCH_ENABLED", "true").lower() == "true"
+    HYBRID_VECTOR_WEIGHT: float = float(os.getenv("HYBRID_VECTOR_WEIGHT", "1.0"))
+    HYBRID_BM25_WEIGHT: float = float(os.getenv("HYBRID_BM25_WEIGHT", "1.0"))
+    HYBRID_CANDIDATES: int = 10
+    RRF_K: int = 60
+    # Results fetched per knowledge base search, then merged, de-duplicated
+    # and reduced by MMR to RAG_MAX_PASSAGES within RAG_CONTEXT_MAX_CHARS
+    RAG_CANDIDATES: int = 8
+    RAG_MAX_PASSAGES: int = int(os.getenv("RAG_MAX_PASSAGES", "3"))
+    RAG_CONTEXT_MAX_CHARS: int = int(os.getenv("RAG_CONTEXT_MAX_CHARS", "4000"))
+    # MMR trade-off: 1.0 ranks by relevance only, lower values favour diversity
+    RAG_MMR_LAMBDA: float = float(os.getenv("RAG_MMR_LAMBDA", "0.7"))
+    # Chunks per Chroma upsert/delete call during ingestion
+    INGEST_BATCH_SIZE: int = 256
+    # Processes parsing documents during ingestion (default: one per core)
+    INGEST_WORKERS: Optional[int] = int(os.getenv("INGEST_WORKERS")) if os.getenv("INGEST_WORKERS") else None
     
     # Memory Configuration
     MEMORY_STORAGE_PATH: str = "memory_storage"
+    # Durability of session writes: "always" (sync + fsync per message),
+    # "interval" (background flush every MEMORY_FLUSH_INTERVAL_MS) or "shutdown"
+    MEMORY_DURABILITY: str = os.getenv("MEMORY_DURABILITY", "interval")
+    MEMORY_FLUSH_INTERVAL_MS: int = 200
+    MEMORY_WRITE_QUEUE_SIZE: int = 10000
+    # Residency: sessions load lazily, live in an LRU capped by total bytes,
+    # and are evicted after being idle for the TTL
+    MEMORY_MAX_RESIDENT_BYTES: int = 64 * 1024 * 1024
+    MEMORY_SESSION_TTL_SECONDS: int = 1800
+    MEMORY_MAX_TURNS_PER_SESSION: int = 50
+    # Prompt history: last MEMORY_RECENT_TURNS turns verbatim, older turns folded
+    # into a rolling summary ("extractive" or "llm"), all within the token budget
+    MEMORY_RECENT_TURNS: int = 5
+    MEMORY_CONTEXT_TOKEN_BUDGET: int = 600
+    MEMORY_SUMMARIZER: str = os.getenv("MEMORY_SUMMARIZER", "extractive")
+    
+    # QA review of drafts: "adaptive" (skip / rule checks / QA agent per
+    # request), "always" (QA agent every time) or "rules" (never the QA agent)
+    REFLECTION_POLICY: str = os.getenv("REFLECTION_POLICY", "adaptive")
     
     # Logging
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
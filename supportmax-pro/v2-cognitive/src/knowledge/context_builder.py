@@ -0,0 +1,151 @@
+"""
+Post-retrieval processing: turns ranked chunks into a compact prompt context.
+
+Chunks are split with a 200 character overlap, so a search often returns
+neighbours that repeat each other. Before anything reaches the prompt:
+
+1. neighbouring chunks of the same source whose text overlaps are merged,
+2. near-duplicates (MinHash estimate of word-shingle Jaccard) are dropped,
+3. MMR picks passages that are relevant but not redundant with each other,
+4. the passages are formatted with their source under a character budget.
+"""
+import re
+import zlib
+from typing import Any, Dict, List
+import numpy as np
+
+# Shortest suffix/prefix match treated as chunk overlap rather than coincidence
+MIN_OVERLAP_CHARS = 30
+SHINGLE_WORDS = 5
+MINHASH_PERMUTATIONS = 64
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = np.random.default_rng(1)
+# a < 2**32 keeps a * crc32 within uint64
+_HASH_A = _rng.integers(1, 1 << 32, size=MINHASH_PERMUTATIONS, dtype=np.uint64)
+_HASH_B = _rng.integers(0, _MERSENNE_PRIME, size=MINHASH_PERMUTATIONS, dtype=np.uint64)
+_WORD = re.compile(r"\w+")
+
+
+def _source(result: Dict[str, Any]) -> str:
+    metadata = result.get("metadata") or {}
+    return str(metadata.get("source_path") or metadata.get("source") or "knowledge base")
+
+
+def _overlap(left: str, right: str, max_overlap: int) -> int:
+    """Length of the longest suffix of `left` that is a prefix of `right`."""
+    for size in range(min(len(left), len(right), max_overlap), MIN_OVERLAP_CHARS - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def merge_neighbours(results: List[Dict[str, Any]], max_overlap: int = 400) -> List[Dict[str, Any]]:
+    """
+    Joins chunks of the same source (and page) whose texts overlap, keeping
+    the best rank of the pair. Order follows the best-ranked member.
+    """
+    merged: List[Dict[str, Any]] = []
+    for result in results:
+        page = (result.get("metadata") or {}).get("page")
+        text = result["document"]
+        for passage in merged:
+            if passage["source"] != _source(result) or passage["page"] != page:
+                continue
+            if text in passage["text"]:
+                break
+            after = _overlap(passage["text"], text, max_overlap)
+            if after:
+                passage["text"] += text[after:]
+                break
+            before = _overlap(text, passage["text"], max_overlap)
+            if before:
+                passage["text"] = text + passage["text"][before:]
+                break
+        else:
+            merged.append({"source": _source(result), "page": page, "text": text, "score": result.get("score", 0.0)})
+    return merged
+
+
+def minhash_signature(text: str) -> np.ndarray:
+    words = _WORD.findall(text.lower())
+    shingles = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(max(1, len(words) - SHINGLE_WORDS + 1))}
+    hashes = np.array([zlib.crc32(s.encode("utf-8")) for s in shingles], dtype=np.uint64)
+    # (a * x + b) mod p for every permutation and shingle; min over shingles
+    return ((np.outer(_HASH_A, hashes) + _HASH_B[:, None]) % np.uint64(_MERSENNE_PRIME)).min(axis=1)
+
+
+def estimated_jaccard(left: np.ndarray, right: np.ndarray) -> float:
+    return float(np.mean(left == right))
+
+
+def select_passages(
+    results: List[Dict[str, Any]],
+    max_passages: int = 3,
+    duplicate_threshold: float = 0.8,
+    mmr_lambda: float = 0.7
+) -> List[Dict[str, Any]]:
+    """
+    Merges neighbours, drops near-duplicates and picks up to `max_passages`
+    by maximal marginal relevance: lambda * relevance - (1 - lambda) *
+    (highest similarity to an already picked passage). Relevance is the
+    retrieval score scaled to [0, 1]; similarity is estimated Jaccard.
+    """
+    passages = merge_neighbours(results)
+    for passage in passages:
+        passage["signature"] = minhash_signature(passage["text"])
+
+    unique: List[Dict[str, Any]] = []
+    for passage in passages:
+        if all(estimated_jaccard(passage["signature"], kept["signature"]) < duplicate_threshold for kept in unique):
+            unique.append(passage)
+
+    top_score = max((p["score"] for p in unique), default=0.0) or 1.0
+    selected: List[Dict[str, Any]] = []
+    candidates = list(unique)
+    while candidates and len(selected) < max_passages:
+        def mmr(passage: Dict[str, Any]) -> float:
+            redundancy = max((estimated_jaccard(passage["signature"], s["signature"]) for s in selected), default=0.0)
+            return mmr_lambda * passage["score"] / top_score - (1 - mmr_lambda) * redundancy
+        best = max(candidates, key=mmr)
+        candidates.remove(best)
+        selected.append(best)
+    for passage in selected:
+        del passage["signature"]
+    return selected
+
+
+def _truncate(text: str, limit: int) -> str:
+    if len(text) <= limit:
+        return text
+    cut = text[:limit]
+    sentence_end = max(cut.rfind(". "), cut.rfind(".\n"))
+    if sentence_end >= limit // 2:
+        cut = cut[:sentence_end + 1]
+    return cut.rstrip() + " ..."
+
+
+def format_context(passages: List[Dict[str, Any]], max_chars: int = 4000) -> str:
+    """
+    Numbered, source-attributed passages, whitespace collapsed, within
+    `max_chars` in total. The last passage that fits partly is truncated
+    at a sentence boundary; passages that would get under 200 chars are left out.
+    """
+    blocks: List[str] = []
+    used = 0
+    for number, passage in enumerate(passages, start=1):
+        header = f"[{number}] {passage['source']}"
+        if passage.get("page") is not None:
+            header += f" (page {int(passage['page']) + 1})"
+        budget = max_chars - used - len(header) - 2
+        if budget < 200:
+            break
+        text = _truncate(" ".join(passage["text"].split()), budget)
+        block = f"{header}\n{text}"
+        blocks.append(block)
+        used += len(block) + 2
+    return "\n\n".join(blocks)
+
+
+def build_context(results: List[Dict[str, Any]], max_passages: int = 3, max_chars: int = 4000, mmr_lambda: float = 0.7) -> str:
+    """Retrieval results (see VectorStore.retrieve) to a prompt-ready context block."""
+    return format_context(select_passages(results, max_passages=max_passages, mmr_lambda=mmr_lambda), max_chars=max_chars)
@@ -1,38 +1,129 @@
-from typing import List
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from langchain_community.document_loaders import PyPDFLoader, TextLoader
 from langchain.docstore.document import Document
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 import os
+import time
+
+SUPPORTED_EXTENSIONS = (".pdf", ".txt", ".md")
+
+# One splitter per (chunk_size, chunk_overlap) in each worker process
+_splitters: Dict[Tuple[int, int], RecursiveCharacterTextSplitter] = {}
+
+
+class FileResult(NamedTuple):
+    """Outcome of parsing one file: its chunks, or the error that stopped it."""
+    path: str
+    chunks: List[Document]
+    error: Optional[str]
+    seconds: float
+
+
+def _splitter(chunk_size: int, chunk_overlap: int) -> RecursiveCharacterTextSplitter:
+    key = (chunk_size, chunk_overlap)
+    if key not in _splitters:
+        _splitters[key] = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    return _splitters[key]
+
+
+def _parse_file(file_path: str, chunk_size: int, chunk_overlap: int) -> FileResult:
+    # Module-level so it can run in a worker process; never raises
+    started = time.monotonic()
+    try:
+        loader = PyPDFLoader(file_path) if file_path.endswith(".pdf") else TextLoader(file_path)
+        chunks = _splitter(chunk_size, chunk_overlap).split_documents(loader.load())
+        return FileResult(file_path, chunks, None, time.monotonic() - started)
+    except Exception as e:
+        return FileResult(file_path, [], f"{type(e).__name__}: {e}", time.monotonic() - started)
+
 
 class DocumentLoader:
     """
     Loads and chunks documents for the knowledge base.
+
+    Files are parsed and chunked in a process pool and streamed back as
+    they finish, so ingestion uses every core and only holds the chunks of
+    a few files in memory at a time.
     """
-    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200):
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap
-        )
+    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200, max_workers: Optional[int] = None):
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.max_workers = max_workers or os.cpu_count() or 1
 
-    def load_documents(self, directory_path: str) -> List[Document]:
+    def list_files(self, directory_path: str) -> List[str]:
         """
-        Loads all supported files from a directory.
+        Paths of the supported files under a directory (recursively), sorted.
+        Hidden files and directories are skipped.
         """
-        documents = []
         if not os.path.exists(directory_path):
             os.makedirs(directory_path)
             return []
+        paths = []
+        for dirpath, dirnames, filenames in os.walk(directory_path):
+            dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+            paths.extend(
+                os.path.join(dirpath, filename)
+                for filename in filenames
+                if filename.endswith(SUPPORTED_EXTENSIONS) and not filename.startswith(".")
+            )
+        return sorted(paths)
+
+    def load_file(self, file_path: str) -> List[Document]:
+        """
+        Loads and chunks a single file. Raises on parse errors.
+        """
+        result = _parse_file(file_path, self.chunk_size, self.chunk_overlap)
+        if result.error:
+            raise RuntimeError(result.error)
+        return result.chunks
 
-        for filename in os.listdir(directory_path):
-            file_path = os.path.join(directory_path, filename)
-            try:
-                if filename.endswith(".pdf"):
-                    loader = PyPDFLoader(file_path)
-                    documents.extend(loader.load())
-                elif filename.endswith(".txt") or filename.endswith(".md"):
-                    loader = TextLoader(file_path)
-                    documents.extend(loader.load())
-            except Exception as e:
-                print(f"Error loading {filename}: {e}")
-
-        return self.text_splitter.split_documents(documents)
+    def iter_files(self, file_paths: Iterable[str]) -> Iterator[FileResult]:
+        """
+        Parses files in the process pool and yields a FileResult per file in
+        completion order. At most twice `max_workers` files are in flight.
+        """
+        file_paths = list(file_paths)
+        if self.max_workers == 1 or len(file_paths) <= 1:
+            for file_path in file_paths:
+                yield _parse_file(file_path, self.chunk_size, self.chunk_overlap)
+            return
+
+        with ProcessPoolExecutor(max_workers=min(self.max_workers, len(file_paths))) as pool:
+            remaining = iter(file_paths)
+            in_flight = set()
+            for file_path in remaining:
+                in_flight.add(pool.submit(_parse_file, file_path, self.chunk_size, self.chunk_overlap))
+                if len(in_flight) >= self.max_workers * 2:
+                    break
+            while in_flight:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+                    next_path = next(remaining, None)
+                    if next_path is not None:
+                        in_flight.add(pool.submit(_parse_file, next_path, self.chunk_size, self.chunk_overlap))
+
+    def iter_batches(self, directory_path: str, batch_size: int = 256) -> Iterator[List[Document]]:
+        """
+        Streams the chunks of every file under a directory in batches of at
+        most `batch_size`. Files that fail to parse are reported and skipped.
+        """
+        batch: List[Document] = []
+        for result in self.iter_files(self.list_files(directory_path)):
+            if result.error:
+                print(f"Error loading {result.path}: {result.error}")
+                continue
+            for chunk in result.chunks:
+                batch.append(chunk)
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
+
+    def load_documents(self, directory_path: str) -> List[Document]:
+        """
+        Loads all supported files from a directory.
+        """
+        return [chunk for batch in self.iter_batches(directory_path) for chunk in batch]
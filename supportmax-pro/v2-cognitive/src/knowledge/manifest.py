@@ -0,0 +1,67 @@
+"""
+Ingestion manifest: what was indexed from each source file.
+
+Stored as JSON next to the Chroma database. For every ingested directory
+it records, per file (relative path), the mtime, size and SHA-256 of the
+bytes plus the ids of the chunks it produced, so a re-run only parses
+changed files and can delete the chunks of files that disappeared.
+"""
+import hashlib
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+MANIFEST_VERSION = 1
+
+
+def file_sha256(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_id(source: str, text: str, occurrence: int = 0) -> str:
+    """
+    Content-addressed chunk id: the same text from the same file always gets
+    the same id. `occurrence` tells apart identical chunks within one file.
+    """
+    digest = hashlib.sha256(f"{source}\0{occurrence}\0{text}".encode("utf-8")).hexdigest()
+    return f"chunk_{digest[:32]}"
+
+
+class IngestManifest:
+    """
+    Per-directory file records, loaded from and saved (atomically) to `path`.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.exists = os.path.exists(path)
+        self._roots: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        if self.exists:
+            with open(path, "r") as f:
+                data = json.load(f)
+            if data.get("version") == MANIFEST_VERSION:
+                self._roots = data.get("roots", {})
+
+    def files(self, root: str) -> Dict[str, Dict[str, Any]]:
+        """Records of `root` (an absolute directory path), keyed by relative file path."""
+        return self._roots.setdefault(root, {})
+
+    def get(self, root: str, relpath: str) -> Optional[Dict[str, Any]]:
+        return self.files(root).get(relpath)
+
+    def record(self, root: str, relpath: str, mtime: float, size: int, sha256: str, chunk_ids: List[str]):
+        self.files(root)[relpath] = {"mtime": mtime, "size": size, "sha256": sha256, "chunk_ids": chunk_ids}
+
+    def remove(self, root: str, relpath: str):
+        self.files(root).pop(relpath, None)
+
+    def save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"version": MANIFEST_VERSION, "roots": self._roots}, f)
+        os.replace(tmp_path, self.path)
+        self.exists = True
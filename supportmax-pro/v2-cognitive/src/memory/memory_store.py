@@ -1,55 +1,290 @@
 import json
 import os
-from typing import Dict, List
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
 from config.settings import settings
+from memory.session_persistence import SessionFileStore, WriteBehindFlusher
+from agent.context_packer import estimate_tokens
+from memory.summarizer import ConversationSummarizer
+
+# Rough per-message bookkeeping overhead (dict + strings) on top of content length
+MESSAGE_OVERHEAD_BYTES = 200
+# Locks serializing summary folds and clears per session (striped by session id)
+FOLD_LOCK_STRIPES = 64
+
+
+class _ResidentSession:
+    """A session held in memory, with the bookkeeping needed for eviction."""
+    __slots__ = ("messages", "size_bytes", "last_access", "disk_records", "first_index", "summary", "folded_through")
+
+    def __init__(
+        self,
+        messages: List[Dict[str, str]],
+        disk_records: int,
+        first_index: int = 0,
+        summary: str = "",
+        folded_through: int = 0
+    ):
+        self.messages = messages
+        self.size_bytes = sum(_message_size(m) for m in messages) + len(summary)
+        self.last_access = time.monotonic()
+        self.disk_records = disk_records
+        # Position of messages[0] in the whole conversation (older ones were trimmed)
+        self.first_index = first_index
+        # Rolling summary of turns older than the verbatim window, and the
+        # position of the first turn it does not cover yet
+        self.summary = summary
+        self.folded_through = folded_through
+
+    def fold_range(self, recent_turns: int) -> Tuple[int, int]:
+        """Positions [start, end) of the turns that left the verbatim window but are not folded in yet."""
+        end = self.first_index + len(self.messages) - recent_turns
+        return max(self.folded_through, self.first_index), end
+
+
+def _message_size(message: Dict[str, str]) -> int:
+    return len(message.get("content", "")) + MESSAGE_OVERHEAD_BYTES
+
 
 class MemoryStore:
     """
-    Manages Short-term (Session) memory with JSON persistence.
+    Manages Short-term (Session) memory.
+
+    Sessions are loaded lazily on first access and kept in an LRU bounded by
+    MEMORY_MAX_RESIDENT_BYTES; sessions idle for MEMORY_SESSION_TTL_SECONDS
+    are evicted. Only the last MEMORY_MAX_TURNS_PER_SESSION turns are kept.
+    Writes go to per-session append-only files through a background
+    write-behind flusher (see session_persistence.py), so evicting a session
+    never needs to write anything.
+
+    Turns older than the last MEMORY_RECENT_TURNS are folded into a persisted
+    rolling summary by summarize_pending(), which the API schedules after the
+    response is sent.
     """
     def __init__(self):
-        self.file_path = os.path.join(settings.MEMORY_STORAGE_PATH, "session_memory.json")
+        self.legacy_file_path = os.path.join(settings.MEMORY_STORAGE_PATH, "session_memory.json")
         self._ensure_storage()
-        self.session_memory = self._load_memory()
+        self.files = SessionFileStore(settings.MEMORY_STORAGE_PATH)
+        self.flusher = WriteBehindFlusher(
+            self.files,
+            durability=settings.MEMORY_DURABILITY,
+            flush_interval_ms=settings.MEMORY_FLUSH_INTERVAL_MS,
+            max_queue_size=settings.MEMORY_WRITE_QUEUE_SIZE
+        )
+        self.max_resident_bytes = settings.MEMORY_MAX_RESIDENT_BYTES
+        self.session_ttl = settings.MEMORY_SESSION_TTL_SECONDS
+        self.max_turns = settings.MEMORY_MAX_TURNS_PER_SESSION
+        self.recent_turns = settings.MEMORY_RECENT_TURNS
+        self.context_token_budget = settings.MEMORY_CONTEXT_TOKEN_BUDGET
+        self.summarizer = ConversationSummarizer(
+            strategy=settings.MEMORY_SUMMARIZER,
+            max_summary_tokens=self.context_token_budget // 2,
+            llm=self._summarizer_llm() if settings.MEMORY_SUMMARIZER == "llm" else None
+        )
+
+        self._lock = threading.RLock()
+        self._fold_locks = [threading.Lock() for _ in range(FOLD_LOCK_STRIPES)]
+        self._sessions: "OrderedDict[str, _ResidentSession]" = OrderedDict()
+        self._resident_bytes = 0
+        self._counters = {"hits": 0, "misses": 0, "evictions_lru": 0, "evictions_ttl": 0}
+        self._migrate_legacy_file()
+
+    @staticmethod
+    def _summarizer_llm():
+        from agent.llm import build_llm
+        return build_llm(settings.OPENAI_FAST_MODEL)
 
     def _ensure_storage(self):
         if not os.path.exists(settings.MEMORY_STORAGE_PATH):
             os.makedirs(settings.MEMORY_STORAGE_PATH)
-        if not os.path.exists(self.file_path):
-            with open(self.file_path, 'w') as f:
-                json.dump({}, f)
 
-    def _load_memory(self) -> Dict[str, List[Dict[str, str]]]:
+    def _migrate_legacy_file(self):
+        """One-time split of the old single session_memory.json into per-session files."""
+        if not os.path.exists(self.legacy_file_path):
+            return
         try:
-            with open(self.file_path, 'r') as f:
-                return json.load(f)
+            with open(self.legacy_file_path, 'r') as f:
+                legacy = json.load(f)
         except Exception:
-            return {}
+            legacy = {}
+        for session_id, messages in legacy.items():
+            kept = messages[-self.max_turns:]
+            self.files.rewrite(session_id, kept, first_index=len(messages) - len(kept))
+        os.replace(self.legacy_file_path, self.legacy_file_path + ".migrated")
+
+    def _load_session(self, session_id: str) -> _ResidentSession:
+        # Disk plus this session's still-queued writes; nothing is flushed here
+        messages, corrupt, first_index, summary, folded_through = self.flusher.read_session(session_id)
+        kept = messages[-self.max_turns:]
+        first_index += len(messages) - len(kept)
+        if folded_through is None:
+            # Summaries from before fold positions were recorded cover every
+            # turn outside the window; without a summary nothing is folded yet
+            folded_through = first_index + max(0, len(kept) - self.recent_turns) if summary else first_index
+        session = _ResidentSession(kept, len(messages), first_index, summary, folded_through)
+        if corrupt or len(messages) > self.max_turns:
+            # Drop torn lines / over-cap history; done by the flusher, off the request path
+            self.flusher.submit("rewrite", session_id, (list(session.messages), session.first_index))
+            session.disk_records = len(session.messages)
+        return session
+
+    def _get_session(self, session_id: str, create: bool = False) -> Optional[_ResidentSession]:
+        with self._lock:
+            self._expire_idle()
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._counters["hits"] += 1
+                self._sessions.move_to_end(session_id)
+            else:
+                self._counters["misses"] += 1
+                session = self._load_session(session_id)
+                if not session.messages and not create:
+                    return None
+                self._sessions[session_id] = session
+                self._resident_bytes += session.size_bytes
+                self._enforce_budget(keep=session_id)
+            session.last_access = time.monotonic()
+            return session
 
-    def _save_memory(self):
-        with open(self.file_path, 'w') as f:
-            json.dump(self.session_memory, f, indent=2)
+    def _evict(self, session_id: str, reason: str):
+        session = self._sessions.pop(session_id)
+        self._resident_bytes -= session.size_bytes
+        self._counters[f"evictions_{reason}"] += 1
+
+    def _expire_idle(self):
+        # The LRU is ordered by last access, so expired sessions are at the front
+        cutoff = time.monotonic() - self.session_ttl
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if session.last_access > cutoff:
+                break
+            self._evict(session_id, "ttl")
+
+    def _enforce_budget(self, keep: str):
+        while self._resident_bytes > self.max_resident_bytes and len(self._sessions) > 1:
+            session_id = next(iter(self._sessions))
+            if session_id == keep:
+                break
+            self._evict(session_id, "lru")
 
     def add_message(self, session_id: str, role: str, content: str):
-        if session_id not in self.session_memory:
-            self.session_memory[session_id] = []
-        self.session_memory[session_id].append({"role": role, "content": content})
-        self._save_memory()
+        message = {"role": role, "content": content}
+        with self._lock:
+            session = self._get_session(session_id, create=True)
+            session.messages.append(message)
+            session.size_bytes += _message_size(message)
+            self._resident_bytes += _message_size(message)
+            session.disk_records += 1
+            self.flusher.submit("append", session_id, message)
+
+            if len(session.messages) > self.max_turns:
+                dropped = session.messages[:-self.max_turns]
+                del session.messages[:-self.max_turns]
+                session.first_index += len(dropped)
+                freed = sum(_message_size(m) for m in dropped)
+                session.size_bytes -= freed
+                self._resident_bytes -= freed
+            # Let the file run to twice the cap before compacting it
+            if session.disk_records > 2 * self.max_turns:
+                self.flusher.submit("rewrite", session_id, (list(session.messages), session.first_index))
+                session.disk_records = len(session.messages)
+
+            self._enforce_budget(keep=session_id)
+
+    def _fold_lock(self, session_id: str) -> threading.Lock:
+        return self._fold_locks[hash(session_id) % FOLD_LOCK_STRIPES]
+
+    def summarize_pending(self, session_id: str):
+        """
+        Folds turns that left the verbatim window into the session summary
+        and persists it with the position folded up to, so turns still
+        waiting survive eviction and restarts. Meant to run after the
+        response has been sent.
+        """
+        # One fold (or clear) per session at a time: a second fold starts from
+        # the first one's summary instead of racing it
+        with self._fold_lock(session_id):
+            with self._lock:
+                session = self._get_session(session_id)
+                if session is None:
+                    return
+                start, end = session.fold_range(self.recent_turns)
+                if end <= start:
+                    return
+                turns = session.messages[start - session.first_index:end - session.first_index]
+                summary = session.summary
+
+            # May call an LLM: run without holding the store lock
+            new_summary = self.summarizer.fold(summary, turns)
+
+            with self._lock:
+                # Folds and clears are serialized, so whichever copy is resident is current
+                current = self._sessions.get(session_id)
+                if current is not None:
+                    self._resident_bytes += len(new_summary) - len(current.summary)
+                    current.size_bytes += len(new_summary) - len(current.summary)
+                    current.summary = new_summary
+                    current.folded_through = end
+                self.flusher.submit("summary", session_id, (new_summary, end))
 
     def get_history(self, session_id: str) -> List[Dict[str, str]]:
-        return self.session_memory.get(session_id, [])
+        session = self._get_session(session_id)
+        return list(session.messages) if session else []
+
+    def get_summary(self, session_id: str) -> str:
+        session = self._get_session(session_id)
+        return session.summary if session else ""
     
-    def get_formatted_history(self, session_id: str) -> str:
-        history = self.get_history(session_id)
-        if not history:
+    def get_formatted_history(self, session_id: str, token_budget: Optional[int] = None) -> str:
+        """
+        Summary of earlier turns plus the most recent turns verbatim, kept
+        under `token_budget` (defaults to MEMORY_CONTEXT_TOKEN_BUDGET).
+        """
+        session = self._get_session(session_id)
+        if session is None or not session.messages:
             return "No previous conversation history."
-        
-        formatted = ""
-        for msg in history[-5:]: # Keep last 5 turns to avoid context overflow
-            formatted += f"{msg['role'].capitalize()}: {msg['content']}\n"
-        return formatted
+        budget = token_budget or self.context_token_budget
+
+        summary_block = ""
+        if session.summary:
+            summary_block = f"Summary of earlier conversation:\n{session.summary}\n\nRecent turns:\n"
+        remaining = budget - estimate_tokens(summary_block)
+
+        # Newest turns first until the budget runs out
+        recent = []
+        for msg in reversed(session.messages[-self.recent_turns:]):
+            line = f"{msg['role'].capitalize()}: {msg['content']}\n"
+            cost = estimate_tokens(line)
+            if cost > remaining:
+                break
+            recent.append(line)
+            remaining -= cost
+        return summary_block + "".join(reversed(recent))
 
     def clear_history(self, session_id: str):
-        if session_id in self.session_memory:
-            del self.session_memory[session_id]
-            self._save_memory()
+        # Waits for a fold in progress, so its summary can't outlive the clear
+        with self._fold_lock(session_id), self._lock:
+            session = self._sessions.pop(session_id, None)
+            if session is not None:
+                self._resident_bytes -= session.size_bytes
+            self.flusher.submit("clear", session_id)
+
+    def stats(self) -> Dict[str, int]:
+        """Residency counters: hits/misses/evictions plus current footprint."""
+        with self._lock:
+            return dict(
+                self._counters,
+                resident_sessions=len(self._sessions),
+                resident_bytes=self._resident_bytes,
+                pending_writes=self.flusher.pending()
+            )
+
+    def flush(self):
+        """Blocks until every queued write is on disk."""
+        self.flusher.flush()
+
+    def close(self):
+        """Flushes pending writes and stops the background flusher."""
+        self.flusher.close()
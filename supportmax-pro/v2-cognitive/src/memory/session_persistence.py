@@ -0,0 +1,272 @@
+"""
+Sharded, append-only persistence for session memory.
+
+Each session lives in its own JSONL file under
+    <MEMORY_STORAGE_PATH>/sessions/<2-char shard>/<sha1(session_id)>.jsonl
+The first line records the session id (and, once the file has been
+compacted, the position of its first message in the whole conversation) and
+every following line is one message ({"role", "content"}). Appending a message therefore costs one small
+write instead of re-serializing every session's history.
+
+All disk I/O is done by a background WriteBehindFlusher fed from a bounded
+queue, so the request path only touches memory. Durability modes:
+- "always":   write (and fsync) synchronously on every message
+- "interval": flush every `flush_interval_ms`
+- "shutdown": flush only when the queue fills up or on close()
+"""
+import atexit
+import hashlib
+import json
+import os
+import queue
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+
+DURABILITY_MODES = ("always", "interval", "shutdown")
+
+
+class SessionFileStore:
+    """
+    Reads and writes per-session JSONL files. Not thread-safe on its own;
+    the flusher serializes all writes.
+    """
+    def __init__(self, root_dir: str):
+        self.root_dir = os.path.join(root_dir, "sessions")
+        os.makedirs(self.root_dir, exist_ok=True)
+
+    def path_for(self, session_id: str) -> str:
+        digest = hashlib.sha1(session_id.encode("utf-8")).hexdigest()
+        return os.path.join(self.root_dir, digest[:2], f"{digest}.jsonl")
+
+    def append(self, session_id: str, records: List[Dict], fsync: bool = False) -> None:
+        path = self.path_for(session_id)
+        is_new = not os.path.exists(path)
+        if is_new:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        lines = []
+        if is_new:
+            lines.append(json.dumps({"session_id": session_id}))
+        lines.extend(json.dumps(record) for record in records)
+        with open(path, "a") as f:
+            f.write("\n".join(lines) + "\n")
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+
+    def read(self, session_id: str) -> Tuple[List[Dict[str, str]], int, int]:
+        """
+        Returns (messages, corrupt line count, position of the first message).
+        Corrupt lines are torn writes from a crash; compacting the session drops them.
+        """
+        return self._read_path(self.path_for(session_id))[1:]
+
+    def _read_path(self, path: str) -> Tuple[Optional[str], List[Dict[str, str]], int, int]:
+        if not os.path.exists(path):
+            return None, [], 0, 0
+        session_id = None
+        messages: List[Dict[str, str]] = []
+        corrupt = 0
+        first_index = 0
+        with open(path, "r") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    corrupt += 1
+                    continue
+                if "session_id" in record:
+                    session_id = record["session_id"]
+                    first_index = record.get("first_index", 0)
+                else:
+                    messages.append(record)
+        return session_id, messages, corrupt, first_index
+
+    def rewrite(self, session_id: str, messages: List[Dict[str, str]], first_index: int = 0) -> None:
+        """
+        Atomically replaces a session file with just its live messages;
+        `first_index` is the position of the first one in the conversation.
+        """
+        path = self.path_for(session_id)
+        if not messages:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        tmp_path = path + ".tmp"
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, "w") as f:
+            f.write(json.dumps({"session_id": session_id, "first_index": first_index}) + "\n")
+            for message in messages:
+                f.write(json.dumps(message) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def summary_path_for(self, session_id: str) -> str:
+        return self.path_for(session_id)[:-len(".jsonl")] + ".summary.json"
+
+    def read_summary(self, session_id: str) -> Tuple[str, Optional[int]]:
+        """
+        Returns (summary, folded_through): the rolling summary and the position
+        of the first message it does not cover yet (None for summaries
+        written before positions were recorded).
+        """
+        path = self.summary_path_for(session_id)
+        if not os.path.exists(path):
+            return "", None
+        try:
+            with open(path, "r") as f:
+                record = json.load(f)
+            return record.get("summary", ""), record.get("folded_through")
+        except ValueError:
+            return "", None
+
+    def write_summary(self, session_id: str, summary: str, folded_through: int = 0) -> None:
+        """Atomically replaces the session's rolling summary."""
+        path = self.summary_path_for(session_id)
+        if not summary and not folded_through:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"session_id": session_id, "summary": summary, "folded_through": folded_through}, f)
+        os.replace(tmp_path, path)
+
+    def iter_sessions(self) -> Iterator[Tuple[str, List[Dict[str, str]], int]]:
+        """Yields (session_id, messages, corrupt line count) for every session file."""
+        for shard in sorted(os.listdir(self.root_dir)):
+            shard_dir = os.path.join(self.root_dir, shard)
+            if not os.path.isdir(shard_dir):
+                continue
+            for name in sorted(os.listdir(shard_dir)):
+                if not name.endswith(".jsonl"):
+                    continue
+                session_id, messages, corrupt, _ = self._read_path(os.path.join(shard_dir, name))
+                if session_id is not None:
+                    yield session_id, messages, corrupt
+
+
+class WriteBehindFlusher:
+    """
+    Background writer for SessionFileStore. Operations are queued as
+    ("append", session_id, message), ("rewrite", session_id, (messages, first_index)),
+    ("summary", session_id, (text, folded_through)) or ("clear", session_id, None)
+    and applied in order by a single daemon
+    thread, so compaction and deletes never run on the request path.
+    """
+    def __init__(
+        self,
+        files: SessionFileStore,
+        durability: str = "interval",
+        flush_interval_ms: int = 200,
+        max_queue_size: int = 10000
+    ):
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"Unknown durability mode '{durability}'. Expected one of {DURABILITY_MODES}")
+        self.files = files
+        self.durability = durability
+        self.flush_interval = flush_interval_ms / 1000.0
+
+        self._queue: "queue.Queue[Tuple[str, str, object]]" = queue.Queue(maxsize=max_queue_size)
+        self._write_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        if durability != "always":
+            self._thread = threading.Thread(target=self._run, name="memory-flusher", daemon=True)
+            self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, op: str, session_id: str, payload: object = None) -> None:
+        if self.durability == "always":
+            with self._write_lock:
+                self._apply([(op, session_id, payload)], fsync=True)
+            return
+        try:
+            self._queue.put_nowait((op, session_id, payload))
+        except queue.Full:
+            # Backpressure: drain the backlog on the caller rather than drop writes
+            self.flush()
+            self._queue.put((op, session_id, payload))
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def read_session(self, session_id: str) -> Tuple[List[Dict[str, str]], int, int, str, Optional[int]]:
+        """
+        Returns (messages, corrupt line count, first_index, summary,
+        folded_through) of a session as they will be once its queued writes
+        land: the files, then this session's pending operations replayed in
+        order. Other sessions' writes stay queued.
+        """
+        # The write lock keeps a batch from being half-applied while we read
+        with self._write_lock:
+            messages, corrupt, first_index = self.files.read(session_id)
+            summary, folded_through = self.files.read_summary(session_id)
+            with self._queue.mutex:
+                pending = [item for item in self._queue.queue if item[1] == session_id]
+        for op, _, payload in pending:
+            if op == "append":
+                messages.append(payload)
+            elif op == "rewrite":
+                messages, first_index = list(payload[0]), payload[1]
+                corrupt = 0
+            elif op == "summary":
+                summary, folded_through = payload
+            elif op == "clear":
+                messages, corrupt, first_index, summary, folded_through = [], 0, 0, "", None
+        return messages, corrupt, first_index, summary, folded_through
+
+    def _drain(self) -> List[Tuple[str, str, object]]:
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                return batch
+
+    def _apply(self, batch: List[Tuple[str, str, object]], fsync: bool = False) -> None:
+        # Coalesce consecutive appends per session so each file is opened once per batch
+        appends: Dict[str, List[Dict]] = {}
+
+        def write_appends(session_id: str):
+            records = appends.pop(session_id, None)
+            if records:
+                self.files.append(session_id, records, fsync=fsync)
+
+        for op, session_id, payload in batch:
+            if op == "append":
+                appends.setdefault(session_id, []).append(payload)
+                continue
+            write_appends(session_id)
+            if op == "rewrite":
+                self.files.rewrite(session_id, *payload)
+            elif op == "summary":
+                self.files.write_summary(session_id, *payload)
+            elif op == "clear":
+                self.files.rewrite(session_id, [])
+                self.files.write_summary(session_id, "")
+        for session_id in list(appends):
+            write_appends(session_id)
+
+    def flush(self) -> None:
+        """Writes everything queued so far."""
+        with self._write_lock:
+            batch = self._drain()
+            if batch:
+                self._apply(batch, fsync=True)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            if self.durability == "interval":
+                self._stop.wait(self.flush_interval)
+                self.flush()
+            else:
+                # "shutdown" mode: nothing to do until close() or a full queue
+                self._stop.wait(1.0)
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        self.flush()
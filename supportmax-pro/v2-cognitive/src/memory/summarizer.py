@@ -0,0 +1,82 @@
+"""
+Incremental conversation summarization for session memory.
+
+Turns that scroll out of the verbatim window are folded into a running
+per-session summary, so the prompt carries "summary + recent turns" at a
+roughly constant size no matter how long the conversation gets.
+
+Two strategies:
+- "extractive" (default): keeps the sentences that state user facts
+  (name, contact details, environment, ticket ids, errors). No LLM call.
+- "llm": asks the configured chat model to merge the new turns into the
+  summary, falling back to the extractive fold on any error.
+"""
+import logging
+import re
+from typing import Dict, List
+from agent.context_packer import estimate_tokens, truncate_tokens
+
+logger = logging.getLogger(__name__)
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\n+")
+
+# Sentences worth remembering once they leave the recent window
+_FACT_PATTERN = re.compile(
+    r"\b(my name|i am|i'm|call me|i use|i'm using|i have|i need|my (?:email|account|order|plan|company|"
+    r"os|operating system|device|browser|phone)|ticket|error|version|subscription|invoice)\b"
+    r"|\b[A-Z]+-[A-Z0-9]{4,}\b|\S+@\S+\.\w+",
+    re.IGNORECASE
+)
+
+# Facts that should survive even when the summary is over budget
+_PINNED_PATTERN = re.compile(r"\b(my name|i am|i'm|call me)\b|\S+@\S+\.\w+", re.IGNORECASE)
+
+
+class ConversationSummarizer:
+    """Folds old turns into a bounded running summary."""
+    def __init__(self, strategy: str = "extractive", max_summary_tokens: int = 200, llm=None):
+        self.strategy = strategy
+        self.max_summary_tokens = max_summary_tokens
+        self.llm = llm
+
+    def fold(self, summary: str, turns: List[Dict[str, str]]) -> str:
+        if not turns:
+            return summary
+        if self.strategy == "llm" and self.llm is not None:
+            try:
+                return self._fold_llm(summary, turns)
+            except Exception as e:
+                logger.warning(f"LLM summarization failed, using extractive fold: {e}")
+        return self._fold_extractive(summary, turns)
+
+    def _fold_extractive(self, summary: str, turns: List[Dict[str, str]]) -> str:
+        facts = [line[2:] for line in summary.splitlines() if line.startswith("- ")]
+        seen = set(facts)
+        for msg in turns:
+            speaker = msg["role"].capitalize()
+            for sentence in _SENTENCE_SPLIT.split(msg["content"]):
+                sentence = sentence.strip()
+                if not sentence or not _FACT_PATTERN.search(sentence):
+                    continue
+                fact = f"{speaker}: {sentence[:200]}"
+                if fact not in seen:
+                    seen.add(fact)
+                    facts.append(fact)
+
+        # Over budget: drop the oldest unpinned facts first
+        while facts and estimate_tokens("\n".join(f"- {fact}" for fact in facts)) > self.max_summary_tokens:
+            unpinned = [i for i, f in enumerate(facts) if not _PINNED_PATTERN.search(f)]
+            facts.pop(unpinned[0] if unpinned else 0)
+        return "\n".join(f"- {fact}" for fact in facts)
+
+    def _fold_llm(self, summary: str, turns: List[Dict[str, str]]) -> str:
+        transcript = "\n".join(f"{m['role'].capitalize()}: {m['content']}" for m in turns)
+        prompt = (
+            "Update the running summary of a customer support conversation.\n"
+            "Keep every fact about the user (name, contact details, environment, "
+            "ticket ids, unresolved issues). Use short bullet points starting with '- '. "
+            f"Stay under {self.max_summary_tokens} tokens.\n\n"
+            f"Current summary:\n{summary or '(empty)'}\n\nNew turns:\n{transcript}\n\nUpdated summary:"
+        )
+        result = self.llm.invoke(prompt)
+        return truncate_tokens(str(getattr(result, "content", result)).strip(), self.max_summary_tokens)
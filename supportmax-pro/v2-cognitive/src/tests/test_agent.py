@@ -0,0 +1,36 @@
+import pytest
+from agent import llm_gateway
+from agent.cost_tracker import CostTracker, get_cost_tracker
+from agent.llm import build_llm
+from agent.model_router import BudgetExhausted, ModelRouter
+
+def test_build_llm_routes_each_tier_through_its_gateway(monkeypatch):
+    monkeypatch.setattr(llm_gateway.settings, "LLM_PROVIDER", "fake")
+    monkeypatch.setattr(llm_gateway.settings, "LLM_FALLBACK_PROVIDERS", "")
+    llm_gateway.close_llm_gateways()
+    try:
+        before = get_cost_tracker().stats()["models"].get("gpt-3.5-turbo", {}).get("calls", 0)
+        reply = build_llm("gpt-3.5-turbo").invoke("How do I reset my password?")
+        assert reply.content == "This is a canned response from the fake LLM provider."
+        stats = llm_gateway.llm_gateway_stats()
+        assert list(stats) == ["gpt-3.5-turbo"]
+        assert stats["gpt-3.5-turbo"]["providers"]["fake"]["calls"] == 1
+        # Charged to the tier's model, not to the provider
+        assert get_cost_tracker().stats()["models"]["gpt-3.5-turbo"]["calls"] == before + 1
+    finally:
+        llm_gateway.close_llm_gateways()
+
+@pytest.mark.parametrize("mode", ["adaptive", "standard"])
+def test_router_refuses_requests_once_daily_budget_is_spent(mode):
+    tracker = CostTracker(daily_budget=0.01)
+    router = ModelRouter(tracker=tracker, mode=mode)
+    tracker.record("gpt-3.5-turbo", 18000, 0)
+    assert 0.8 <= tracker.budget_used() < 1.0
+    assert router.route("Hello there")["tier"] == ("economy" if mode == "adaptive" else "standard")
+    tracker.record("gpt-3.5-turbo", 18000, 0)
+    with pytest.raises(BudgetExhausted) as error:
+        router.route("Hello there")
+    assert 0 < error.value.retry_after <= 24 * 3600
+    stats = router.stats()
+    assert stats["budget_exhausted"] is True
+    assert stats["rejected_budget_exhausted"] == 1
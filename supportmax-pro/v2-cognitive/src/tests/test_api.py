@@ -0,0 +1,18 @@
+import asyncio
+import pytest
+from fastapi import BackgroundTasks, HTTPException
+from agent.cost_tracker import CostTracker
+from agent.model_router import ModelRouter
+from api import endpoints
+
+def test_chat_is_refused_once_daily_budget_is_spent(monkeypatch):
+    tracker = CostTracker(daily_budget=0.01)
+    tracker.record("gpt-3.5-turbo", 40000, 0)
+    monkeypatch.setattr(endpoints, "model_router", ModelRouter(tracker=tracker))
+    monkeypatch.setattr(endpoints, "response_cache", None)
+    request = endpoints.ChatRequest(message="My invoice is wrong", user_id="budget_test_user")
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(endpoints.chat(request, BackgroundTasks()))
+    assert error.value.status_code == 503
+    assert int(error.value.headers["Retry-After"]) > 0
+    assert endpoints.model_router.stats()["budget_exhausted"] is True
@@ -0,0 +1,33 @@
+import sys
+import threading
+from types import ModuleType
+from config.settings import settings
+from knowledge import vector_store
+
+def test_default_vector_store_builds_without_deadlock(tmp_path, monkeypatch):
+    opened = []
+
+    class FakeClient:
+        def __init__(self, path):
+            opened.append(path)
+        def get_or_create_collection(self, name, embedding_function):
+            return name
+
+    chromadb = ModuleType("chromadb")
+    chromadb.PersistentClient = FakeClient
+    monkeypatch.setitem(sys.modules, "chromadb", chromadb)
+    monkeypatch.setattr(settings, "VECTOR_BACKEND", "chroma")
+    monkeypatch.setattr(settings, "EMBEDDING_PROVIDER", "local")
+    monkeypatch.setattr(settings, "CHROMA_PERSIST_DIRECTORY", str(tmp_path))
+    monkeypatch.setattr(vector_store, "_client", None)
+    monkeypatch.setattr(vector_store, "_store", None)
+
+    # Building the store opens the shared client: both must not share a lock
+    built = []
+    thread = threading.Thread(target=lambda: built.append(vector_store.get_vector_store()), daemon=True)
+    thread.start()
+    thread.join(timeout=5)
+    assert not thread.is_alive(), "get_vector_store() deadlocked"
+    assert built[0].collection == built[0].name
+    assert opened == [str(tmp_path)]
+    assert vector_store.get_vector_store() is built[0]
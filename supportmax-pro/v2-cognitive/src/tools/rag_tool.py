@@ -1,16 +1,40 @@
 from langchain.tools import tool
-from knowledge.vector_store import VectorStore
+from agent.context_packer import CHARS_PER_TOKEN, current_budget
+from agent.deadline import check_deadline, record_result
+from agent.reflection import current_trace
+from config.settings import settings
+from knowledge.context_builder import build_context
+from knowledge.vector_store import get_vector_store
 
 class RAGTool:
     @tool("Search Knowledge Base")
     def search_knowledge(query: str):
         """Useful to answer questions about product features, policies, troubleshooting, and documentation.
         Input should be a search query string."""
+        check_deadline("knowledge base search")
+        # Passages share the request's token budget with the rest of the prompt
+        budget = current_budget()
+        max_chars = settings.RAG_CONTEXT_MAX_CHARS
+        if budget is not None:
+            max_chars = min(max_chars, budget.remaining * CHARS_PER_TOKEN)
+            if max_chars < 200:
+                return "The knowledge base context budget for this request is used up. Answer from the information already found."
+
+        # Over-fetch, then merge overlapping chunks, drop duplicates and diversify
+        results = get_vector_store().retrieve(query, n_results=settings.RAG_CANDIDATES)
+        trace = current_trace()
+        if trace is not None:
+            trace.record_retrieval(results)
+        context = build_context(
+            results,
+            max_passages=settings.RAG_MAX_PASSAGES,
+            max_chars=max_chars,
+            mmr_lambda=settings.RAG_MMR_LAMBDA
+        )
         
-        store = VectorStore()
-        results = store.search(query)
-        
-        if not results:
+        if not context:
             return "No relevant information found in the knowledge base."
-        
-        return f"Found relevant information:\n{results}"
+        if budget is not None:
+            context = budget.fit("knowledge", context)
+        record_result("search_knowledge", context)
+        return f"Found relevant information:\n{context}"